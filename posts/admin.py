@@ -1,6 +1,6 @@
 from django.contrib import admin
 
-from .models import Post, Group, Comment, Follow
+from .models import ArchivedPost, Post, Group, Comment, Follow, Profile
 
 
 class PostAdmin(admin.ModelAdmin):
@@ -10,6 +10,10 @@ class PostAdmin(admin.ModelAdmin):
     empty_value_display = '-пусто-'
 
 
+class ArchivedPostAdmin(PostAdmin):
+    readonly_fields = ('id', 'pub_date', 'author', 'group', 'image')
+
+
 class GroupAdmin(admin.ModelAdmin):
     list_display = ('pk', 'slug', 'title')
     empty_value_display = '-пусто-'
@@ -25,7 +29,16 @@ class FollowAdmin(admin.ModelAdmin):
     empty_value_display = '-пусто-'
 
 
+class ProfileAdmin(admin.ModelAdmin):
+    list_display = (
+        'pk', 'user', 'post_count', 'follower_count', 'following_count'
+    )
+    empty_value_display = '-пусто-'
+
+
 admin.site.register(Post, PostAdmin)
+admin.site.register(ArchivedPost, ArchivedPostAdmin)
 admin.site.register(Group, GroupAdmin)
 admin.site.register(Comment, CommentAdmin)
 admin.site.register(Follow, FollowAdmin)
+admin.site.register(Profile, ProfileAdmin)
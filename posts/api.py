@@ -0,0 +1,244 @@
+"""JSON API лент, постов, комментариев и подписок.
+
+Ленты берут те же querysets, что и HTML-страницы, но читаются через
+values(): объекты моделей не создаются, из базы выбираются только
+запрошенные ?fields= поля. Списки листаются курсором (?after=/?before=),
+ответы несут ETag, и повторный запрос с If-None-Match получает 304.
+Запись — по сессии пользователя, с обычной проверкой CSRF.
+"""
+import hashlib
+import json
+from functools import wraps
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.serializers.json import DjangoJSONEncoder
+from django.http import HttpResponse, JsonResponse
+from django.shortcuts import get_object_or_404
+from django.utils.cache import get_conditional_response
+from django.utils.http import quote_etag
+from django.views.decorators.http import require_http_methods
+
+from . import thumbnails
+from .forms import CommentForm, PostForm
+from .models import Comment, Follow, Group, Post
+from .paginator import CursorPaginator
+from .timeline import follow_feed
+
+User = get_user_model()
+
+# Поле API: путь для values().
+POST_FIELDS = {
+    'id': 'id',
+    'text': 'text',
+    'pub_date': 'pub_date',
+    'author': 'author__username',
+    'group': 'group__slug',
+    'comment_count': 'comment_count',
+    'thumbnail': 'thumbnail',
+}
+COMMENT_FIELDS = {
+    'id': 'id',
+    'post': 'post_id',
+    'text': 'text',
+    'created': 'created',
+    'author': 'author__username',
+}
+
+
+class FieldError(ValueError):
+    pass
+
+
+def error(message, status):
+    return JsonResponse({'detail': message}, status=status,
+                        json_dumps_params={'ensure_ascii': False})
+
+
+def api_response(request, data, status=200):
+    """JSON-ответ с ETag по содержимому; 304, если он не изменился."""
+    content = json.dumps(data, cls=DjangoJSONEncoder, ensure_ascii=False,
+                         separators=(',', ':')).encode()
+    response = HttpResponse(content, content_type='application/json',
+                            status=status)
+    if status != 200:
+        return response
+    etag = quote_etag(hashlib.md5(content).hexdigest())
+    response['ETag'] = etag
+    response['Vary'] = 'Cookie'
+    return get_conditional_response(request, etag=etag, response=response)
+
+
+def api_view(methods, login=False):
+    """require_http_methods, 401 вместо редиректа и ошибки полей — в 400."""
+    def decorator(view):
+        @require_http_methods(methods)
+        @wraps(view)
+        def wrapper(request, *args, **kwargs):
+            if login and not request.user.is_authenticated:
+                return error('Нужна авторизация', 401)
+            try:
+                return view(request, *args, **kwargs)
+            except FieldError as exception:
+                return error(str(exception), 400)
+        return wrapper
+    return decorator
+
+
+def selected(request, mapping):
+    """Поля из ?fields=a,b или все поля mapping."""
+    raw = request.GET.get('fields')
+    if not raw:
+        return list(mapping)
+    fields = [field.strip() for field in raw.split(',') if field.strip()]
+    unknown = sorted(set(fields) - set(mapping))
+    if unknown:
+        raise FieldError(f'Неизвестные поля: {", ".join(unknown)}')
+    return fields
+
+
+def values(queryset, fields, mapping, extra=()):
+    """queryset.values() только с нужными колонками.
+
+    extra — служебные колонки, например поля курсора.
+    """
+    lookups = [mapping[field] for field in fields]
+    return queryset.values(*dict.fromkeys(lookups + list(extra)))
+
+
+def serialize(row, fields, mapping):
+    return {field: row[mapping[field]] for field in fields}
+
+
+def page_url(request, **params):
+    query = request.GET.copy()
+    for key in ('after', 'before'):
+        query.pop(key, None)
+    query.update(params)
+    return f'{request.path}?{query.urlencode()}'
+
+
+def cursor_list(request, queryset, mapping):
+    """Страница курсорной пагинации в виде словаря для JSON."""
+    fields = selected(request, mapping)
+    try:
+        limit = min(int(request.GET.get('limit', settings.PAGE_NUMBER)),
+                    settings.API_MAX_PAGE_SIZE)
+    except ValueError:
+        raise FieldError('limit должен быть числом')
+    paginator = CursorPaginator(queryset, max(limit, 1))
+    # Порядок уже разобран из queryset, дальше читаем словари.
+    paginator.object_list = values(queryset, fields, mapping,
+                                   paginator.ordering)
+    page = paginator.get_page(after=request.GET.get('after'),
+                              before=request.GET.get('before'))
+    return {
+        'results': [serialize(row, fields, mapping) for row in page],
+        'next': page_url(request, after=page.next_cursor)
+        if page.has_next() else None,
+        'previous': page_url(request, before=page.previous_cursor)
+        if page.has_previous() else None,
+    }
+
+
+def feed(request, queryset):
+    return api_response(request, cursor_list(request, queryset, POST_FIELDS))
+
+
+def post_data(post_id, fields):
+    row = values(Post.objects.filter(pk=post_id), fields, POST_FIELDS).first()
+    return row and serialize(row, fields, POST_FIELDS)
+
+
+def request_data(request):
+    if request.content_type == 'application/json':
+        try:
+            data = json.loads(request.body or b'{}')
+        except ValueError:
+            raise FieldError('Тело запроса — не JSON')
+        if not isinstance(data, dict):
+            raise FieldError('Тело запроса должно быть JSON-объектом')
+        return data
+    return request.POST
+
+
+@api_view(['GET', 'POST'])
+def index(request):
+    if request.method == 'GET':
+        return feed(request, Post.objects.for_feed())
+    if not request.user.is_authenticated:
+        return error('Нужна авторизация', 401)
+    # Поля ответа проверяются до записи: на 400 клиент повторит запрос.
+    fields = selected(request, POST_FIELDS)
+    form = PostForm(request_data(request), files=request.FILES or None)
+    if not form.is_valid():
+        return api_response(request, form.errors.get_json_data(), 400)
+    instance = form.save(commit=False)
+    instance.author = request.user
+    instance.save()
+    thumbnails.schedule(instance)
+    return api_response(request, post_data(instance.pk, fields), 201)
+
+
+@api_view(['GET'])
+def group(request, slug):
+    current_group = get_object_or_404(Group, slug=slug)
+    return feed(request, current_group.group_post.for_feed())
+
+
+@api_view(['GET'])
+def profile(request, username):
+    author = get_object_or_404(User, username=username)
+    return feed(request, author.posts.for_feed())
+
+
+@api_view(['GET'], login=True)
+def follow_index(request):
+    return feed(request, follow_feed(request.user))
+
+
+@api_view(['GET'])
+def post(request, post_id):
+    data = post_data(post_id, selected(request, POST_FIELDS))
+    if data is None:
+        return error('Пост не найден', 404)
+    return api_response(request, data)
+
+
+@api_view(['GET', 'POST'])
+def comments(request, post_id):
+    current_post = get_object_or_404(Post.objects.only('id'), pk=post_id)
+    if request.method == 'GET':
+        queryset = Comment.objects.filter(post=current_post).order_by(
+            '-created', '-id'
+        )
+        return api_response(
+            request, cursor_list(request, queryset, COMMENT_FIELDS)
+        )
+    if not request.user.is_authenticated:
+        return error('Нужна авторизация', 401)
+    fields = selected(request, COMMENT_FIELDS)
+    form = CommentForm(request_data(request))
+    if not form.is_valid():
+        return api_response(request, form.errors.get_json_data(), 400)
+    comment = form.save(commit=False)
+    comment.post = current_post
+    comment.author = request.user
+    comment.save()
+    row = values(Comment.objects.filter(pk=comment.pk), fields,
+                 COMMENT_FIELDS).get()
+    return api_response(request, serialize(row, fields, COMMENT_FIELDS), 201)
+
+
+@api_view(['POST', 'DELETE'], login=True)
+def follow(request, username):
+    author = get_object_or_404(User, username=username)
+    if request.method == 'DELETE':
+        Follow.objects.filter(user=request.user, author=author).delete()
+        return api_response(request, {'following': False})
+    if author == request.user:
+        return error('Нельзя подписаться на себя', 400)
+    _, created = Follow.objects.get_or_create(user=request.user,
+                                              author=author)
+    return api_response(request, {'following': True},
+                        201 if created else 200)
@@ -0,0 +1,95 @@
+"""Архив старых постов.
+
+archive() переносит посты старше заданной даты вместе с комментариями
+из posts_post и posts_comment в ArchivedPost и ArchivedComment. Основная
+таблица и её индексы остаются небольшими и помещаются в кэш страниц
+SQLite, а ленты доходят до архива, только когда листают дальше конца
+основной таблицы (paginator.Chain).
+
+Id постов и комментариев сохраняются, поэтому адреса постов не
+меняются. Счётчик постов в профиле по-прежнему включает архивные.
+Строки удаляются без сигналов: счётчики трогать не нужно, а поисковый
+индекс и кэш обновляются сразу для всей пачки. Архивные посты не
+ищутся поиском и не попадают в материализованные ленты подписок.
+"""
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connection, transaction
+from django.utils import timezone
+
+from . import search
+from .cache import SITE, bump
+from .comment_buffer import author_key
+from .models import (ArchivedComment, ArchivedPost, Comment, Post,
+                     TimelineEntry)
+
+POST_FIELDS = ('id', 'text', 'pub_date', 'author_id', 'group_id', 'image',
+               'thumbnail', 'image_variants', 'comment_count')
+COMMENT_FIELDS = ('id', 'post_id', 'author_id', 'text', 'created')
+
+
+def cutoff(days=None):
+    """Дата, старше которой посты уходят в архив."""
+    if days is None:
+        days = settings.ARCHIVE_AFTER_DAYS
+    return timezone.now() - timedelta(days=days)
+
+
+def copy(model, rows, fields):
+    return [
+        model(**{field: getattr(row, field) for field in fields})
+        for row in rows
+    ]
+
+
+def delete_rows(model, field, ids):
+    placeholders = ', '.join(['%s'] * len(ids))
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f'DELETE FROM {model._meta.db_table} '
+            f'WHERE {field} IN ({placeholders})',
+            ids
+        )
+
+
+def archive_batch(before, batch_size):
+    """Переносит до batch_size самых старых постов; возвращает их число."""
+    with transaction.atomic():
+        posts = list(Post.objects.filter(pub_date__lt=before).order_by(
+            'pub_date', 'id'
+        )[:batch_size])
+        if not posts:
+            return 0
+        ids = [post.id for post in posts]
+        ArchivedPost.objects.bulk_create(
+            copy(ArchivedPost, posts, POST_FIELDS)
+        )
+        ArchivedComment.objects.bulk_create(copy(
+            ArchivedComment,
+            Comment.objects.filter(post_id__in=ids).order_by(),
+            COMMENT_FIELDS
+        ))
+        delete_rows(TimelineEntry, 'post_id', ids)
+        delete_rows(Comment, 'post_id', ids)
+        delete_rows(Post, 'id', ids)
+        search.remove_posts(ids)
+    cache.delete_many([author_key(pk) for pk in ids])
+    return len(ids)
+
+
+def archive(before, batch_size=500):
+    """Переносит все посты старше before; возвращает их число.
+
+    Каждая пачка переносится в своей транзакции, так что запись в базу
+    не блокируется надолго.
+    """
+    moved = 0
+    while True:
+        done = archive_batch(before, batch_size)
+        if not done:
+            break
+        moved += done
+        bump(SITE)
+    return moved
@@ -0,0 +1,442 @@
+"""Синтетические данные и замеры лент для нагрузочных тестов.
+
+seed() быстро заливает пользователей, сообщества, посты, подписки и
+комментарии через bulk_create. Популярность авторов распределена по
+степенному закону: немногие авторы пишут и собирают подписчиков больше
+всех. Сигналы при этом не срабатывают, поэтому после заливки счётчики,
+ленты подписок и поисковый индекс пересобираются целиком.
+
+run() прогоняет страницы из posts/urls.py через тестовый клиент и
+считает перцентили времени ответа, число запросов и размер ответа.
+render_pages() замеряет только рендер ленты с кэширующим загрузчиком
+шаблонов и без него, comment_rate() — сколько комментариев в секунду
+принимает один горячий пост, sqlite_rate() — пропускную способность
+файла SQLite под параллельными чтениями и записями.
+"""
+import os
+import random
+import shutil
+import statistics
+import tempfile
+import time
+from contextlib import contextmanager
+from datetime import timedelta
+from itertools import accumulate, islice
+from threading import Thread
+from urllib.parse import urlencode
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import make_password
+from django.contrib.auth.models import AnonymousUser
+from django.core.cache import cache
+from django.db import DatabaseError, connection, transaction
+from django.core.paginator import Paginator
+from django.db.models import Max
+from django.template.backends.django import DjangoTemplates
+from django.test import Client, RequestFactory, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+
+from . import comment_buffer, counters, search, timeline
+from yatube.sqlite.base import DatabaseWrapper
+
+from .models import Comment, Follow, Group, Post
+
+User = get_user_model()
+
+WORDS = (
+    'город утро кофе дорога книга море лето зима друг работа музыка '
+    'фильм кошка собака поезд небо дождь солнце дом окно вечер чай '
+    'идея код проект встреча новость фото прогулка лес река горы'
+).split()
+
+
+@contextmanager
+def manual_dates(*fields):
+    """Временно отключает auto_now_add, чтобы задать даты вручную."""
+    saved = [(field, field.auto_now_add) for field in fields]
+    for field, _ in saved:
+        field.auto_now_add = False
+    try:
+        yield
+    finally:
+        for field, value in saved:
+            field.auto_now_add = value
+
+
+def power_law(ids, alpha):
+    """Выбирает id с весом 1 / rank ** alpha. Порядок ids перемешан."""
+    ids = list(ids)
+    random.shuffle(ids)
+    weights = list(accumulate(1 / rank ** alpha
+                              for rank in range(1, len(ids) + 1)))
+    return lambda k: random.choices(ids, cum_weights=weights, k=k)
+
+
+def batches(iterable, size):
+    iterator = iter(iterable)
+    while True:
+        batch = list(islice(iterator, size))
+        if not batch:
+            return
+        yield batch
+
+
+def last_id(model):
+    return model.objects.aggregate(last=Max('id'))['last'] or 0
+
+
+def text(min_words=5, max_words=60):
+    return ' '.join(random.choices(WORDS, k=random.randint(min_words,
+                                                          max_words)))
+
+
+def seed(users=1000, posts=20000, groups=20, follows=30, comments=20000,
+         days=365, alpha=1.1, batch_size=5000, prefix='bench', log=None):
+    """Заливает синтетические данные и возвращает число созданных строк.
+
+    follows — среднее число подписок на пользователя. Авторы для них
+    выбираются по степенному закону, так что на больших объёмах у самых
+    популярных подписчиков больше TIMELINE_FANOUT_LIMIT.
+    """
+    log = log or (lambda message: None)
+    now = timezone.now()
+    password = make_password(None)
+    created = {}
+
+    def insert(model, rows, **kwargs):
+        count = 0
+        for batch in batches(rows, batch_size):
+            model.objects.bulk_create(batch, **kwargs)
+            count += len(batch)
+        created[model.__name__] = count
+        log(f'{model.__name__}: {count}')
+
+    def moment():
+        return now - timedelta(seconds=random.randint(0, days * 86400))
+
+    first = last_id(User) + 1
+    insert(User, (
+        User(username=f'{prefix}{i}', password=password,
+             date_joined=now)
+        for i in range(users)
+    ))
+    user_ids = range(first, last_id(User) + 1)
+    insert(Group, (
+        Group(title=f'Сообщество {i}', slug=f'{prefix}-{i}',
+              description=text(3, 10))
+        for i in range(groups)
+    ))
+    group_ids = list(Group.objects.filter(
+        slug__startswith=f'{prefix}-'
+    ).values_list('id', flat=True))
+
+    authors = power_law(user_ids, alpha)
+    first = last_id(Post) + 1
+    with manual_dates(Post._meta.get_field('pub_date'),
+                      Comment._meta.get_field('created')):
+        insert(Post, (
+            Post(text=text(), author_id=author_id, pub_date=moment(),
+                 group_id=random.choice(group_ids)
+                 if group_ids and random.random() < 0.3 else None)
+            for author_id in authors(posts)
+        ))
+        post_ids = range(first, last_id(Post) + 1)
+        insert(Comment, (
+            Comment(post_id=random.choice(post_ids),
+                    author_id=random.choice(user_ids),
+                    text=text(1, 20), created=moment())
+            for _ in range(comments)
+        ))
+
+    def follow_rows():
+        for user_id in user_ids:
+            wanted = min(int(random.paretovariate(1.5) * follows / 3) + 1,
+                         len(user_ids) - 1)
+            for author_id in set(authors(wanted)) - {user_id}:
+                yield Follow(user_id=user_id, author_id=author_id)
+    insert(Follow, follow_rows(), ignore_conflicts=True)
+
+    with transaction.atomic():
+        counters.recount()
+        log(f'TimelineEntry: {timeline.rebuild()}')
+        log(f'Поисковый индекс: {search.rebuild()}')
+    return created
+
+
+# Маршруты, которые меняют данные, в замеры не входят.
+SKIP_ROUTES = {'profile_follow', 'profile_unfollow', 'add_comment',
+               'api_follow'}
+
+
+def percentile(values, q):
+    if len(values) == 1:
+        return values[0]
+    return statistics.quantiles(values, n=100, method='inclusive')[q - 1]
+
+
+def sample_targets():
+    """Аргументы маршрутов: самый популярный автор и его последний пост."""
+    post = Post.objects.select_related('author').order_by(
+        '-author__profile__follower_count', '-pub_date'
+    ).first()
+    reader = Follow.objects.filter(author=post.author).values_list(
+        'user', flat=True
+    ).first() if post else None
+    group = Group.objects.order_by('-id').first()
+    return {
+        'username': post.author.username if post else '',
+        'post_id': post.id if post else 0,
+        'slug': group.slug if group else '',
+    }, post and post.author, User.objects.filter(pk=reader).first()
+
+
+def routes(targets):
+    """(имя, url, нужен ли автор) для страниц из posts/urls.py."""
+    from . import urls
+    found = []
+    for pattern in urls.urlpatterns:
+        name = pattern.name
+        if name in SKIP_ROUTES:
+            continue
+        kwargs = {key: targets[key] for key in pattern.pattern.converters}
+        url = reverse(f'{urls.app_name}:{name}', kwargs=kwargs)
+        if name in ('search', 'search_api'):
+            url += '?' + urlencode({'q': WORDS[0]})
+        found.append((name, url, name in ('post_edit', 'new_post')))
+    found.append(('index_deep', reverse('posts:index') + '?page=50', False))
+    return found
+
+
+def measure(client, url, runs, cold):
+    timings, queries, size, status = [], 0, 0, None
+    for _ in range(runs):
+        if cold:
+            cache.clear()
+        with CaptureQueriesContext(connection) as captured:
+            started = time.perf_counter()
+            response = client.get(url)
+            timings.append((time.perf_counter() - started) * 1000)
+        queries, size, status = (len(captured), len(response.content),
+                                 response.status_code)
+    return {
+        'url': url,
+        'status': status,
+        'runs': runs,
+        'p50_ms': round(percentile(timings, 50), 2),
+        'p95_ms': round(percentile(timings, 95), 2),
+        'p99_ms': round(percentile(timings, 99), 2),
+        'mean_ms': round(statistics.mean(timings), 2),
+        'queries': queries,
+        'bytes': size,
+    }
+
+
+def run(runs=20, cold=False):
+    """Замеряет страницы и возвращает отчёт, готовый для json.dump."""
+    targets, author, reader = sample_targets()
+    guest, as_author, as_reader = Client(), Client(), Client()
+    if author:
+        as_author.force_login(author)
+    if reader:
+        as_reader.force_login(reader)
+    results = []
+    with override_settings(ALLOWED_HOSTS=['testserver',
+                                          *settings.ALLOWED_HOSTS]):
+        for name, url, needs_author in routes(targets):
+            client = as_author if needs_author else (
+                as_reader if name.endswith('follow_index') else guest
+            )
+            results.append({'name': name, **measure(client, url, runs, cold)})
+    return {
+        'started': timezone.now().isoformat(),
+        'database': connection.vendor,
+        'cache': settings.CACHES['shared']['BACKEND'],
+        'cold_cache': cold,
+        'rows': {
+            model.__name__: model.objects.count()
+            for model in (User, Post, Follow, Comment)
+        },
+        'results': results,
+    }
+
+
+def sample_page(size):
+    """Страница ленты из size несохранённых постов: рендер без базы."""
+    author = User(id=1, username='bench')
+    group = Group(id=1, title='Сообщество', slug='bench')
+    posts = [
+        Post(id=pk, text=text(), author=author, pub_date=timezone.now(),
+             group=group if pk % 3 == 0 else None, comment_count=pk % 5)
+        for pk in range(size, 0, -1)
+    ]
+    paginator = Paginator(posts, size)
+    return paginator.page(1), paginator
+
+
+def template_backends():
+    """Движки шаблонов проекта с кэширующим загрузчиком и без него."""
+    config = settings.TEMPLATES[0]
+    options = {key: value for key, value in config['OPTIONS'].items()
+               if key != 'loaders'}
+    loaders = {
+        'uncached': settings.TEMPLATE_LOADERS,
+        'cached': [('django.template.loaders.cached.Loader',
+                    settings.TEMPLATE_LOADERS)],
+    }
+    return {
+        name: DjangoTemplates({
+            'NAME': f'bench-{name}', 'DIRS': config['DIRS'],
+            'APP_DIRS': False,
+            'OPTIONS': {**options, 'loaders': value},
+        })
+        for name, value in loaders.items()
+    }
+
+
+def render_pages(sizes=(10, 100), runs=50):
+    """Время рендера index.html на страницах из sizes постов, мс."""
+    request = RequestFactory().get('/')
+    request.user = AnonymousUser()
+    results = []
+    for name, backend in template_backends().items():
+        for size in sizes:
+            page, paginator = sample_page(size)
+            context = {'page': page, 'paginator': paginator}
+            timings = []
+            for _ in range(runs):
+                started = time.perf_counter()
+                # get_template() на каждом шаге, как в render().
+                backend.get_template('index.html').render(context, request)
+                timings.append((time.perf_counter() - started) * 1000)
+            results.append({
+                'loader': name,
+                'posts': size,
+                'p50_ms': round(percentile(timings, 50), 2),
+                'p95_ms': round(percentile(timings, 95), 2),
+            })
+    return results
+
+
+def comment_rate(comments=2000, threads=8, buffer_size=0, prefix='bench'):
+    """Комментарии в секунду к одному посту через add_comment.
+
+    threads клиентов одновременно шлют AJAX-запросы от одного
+    пользователя; буфер сбрасывается до остановки секундомера. Пост
+    с комментариями после замера удаляется.
+    """
+    author, _ = User.objects.get_or_create(username=f'{prefix}-hot')
+    post = Post.objects.create(text=text(), author=author)
+    url = reverse('posts:add_comment', kwargs={
+        'username': author.username, 'post_id': post.id
+    })
+    login = Client()
+    login.force_login(author)
+    failed = []
+
+    def worker(count):
+        client = Client()
+        client.cookies = login.cookies
+        try:
+            for _ in range(count):
+                try:
+                    client.post(url, {'text': text(1, 20)},
+                                HTTP_X_REQUESTED_WITH='XMLHttpRequest')
+                except DatabaseError:
+                    failed.append(1)
+        finally:
+            connection.close()
+
+    with override_settings(COMMENT_BUFFER_SIZE=buffer_size,
+                           ALLOWED_HOSTS=['testserver',
+                                          *settings.ALLOWED_HOSTS]):
+        workers = [Thread(target=worker, args=(comments // threads,))
+                   for _ in range(threads)]
+        started = time.perf_counter()
+        for thread in workers:
+            thread.start()
+        for thread in workers:
+            thread.join()
+        comment_buffer.buffer.flush()
+        seconds = time.perf_counter() - started
+    saved = Comment.objects.filter(post=post).count()
+    post.delete()
+    return {
+        'buffer_size': buffer_size,
+        'threads': threads,
+        'saved': saved,
+        'failed': len(failed),
+        'seconds': round(seconds, 2),
+        'per_second': round(saved / seconds, 1),
+    }
+
+
+def sqlite_rate(tuned=True, readers=4, writers=2, seconds=3.0, rows=10000):
+    """Чтения и записи в секунду к файлу SQLite из нескольких потоков.
+
+    tuned=False — как без настройки: соединение на каждую операцию
+    и журнал по умолчанию. tuned=True — постоянное соединение на поток
+    и PRAGMA из DATABASES['default']. Замер идёт на временном файле.
+    """
+    directory = tempfile.mkdtemp()
+    settings_dict = {
+        **connection.settings_dict,
+        'NAME': os.path.join(directory, 'bench.sqlite3'),
+        'OPTIONS': connection.settings_dict['OPTIONS'] if tuned else {},
+    }
+    setup = DatabaseWrapper(settings_dict, alias='bench')
+    with setup.cursor() as cursor:
+        cursor.execute('CREATE TABLE item (id INTEGER PRIMARY KEY, '
+                       'text TEXT NOT NULL)')
+        cursor.executemany('INSERT INTO item (text) VALUES (%s)',
+                           [(text(5, 20),) for _ in range(rows)])
+    setup.close()
+    results = []
+
+    def worker(write, deadline):
+        db = None
+        done = failed = 0
+        while time.perf_counter() < deadline:
+            if db is None:
+                db = DatabaseWrapper(settings_dict, alias='bench')
+            try:
+                with db.cursor() as cursor:
+                    if write:
+                        cursor.execute('INSERT INTO item (text) VALUES (%s)',
+                                       [text(5, 20)])
+                    else:
+                        cursor.execute('SELECT text FROM item WHERE id = %s',
+                                       [random.randint(1, rows)])
+                        cursor.fetchone()
+                done += 1
+            except DatabaseError:
+                failed += 1
+            if not tuned:
+                db.close()
+                db = None
+        if db is not None:
+            db.close()
+        results.append((write, done, failed))
+
+    deadline = time.perf_counter() + seconds
+    workers = [Thread(target=worker, args=(write, deadline))
+               for write in [False] * readers + [True] * writers]
+    for thread in workers:
+        thread.start()
+    for thread in workers:
+        thread.join()
+    shutil.rmtree(directory)
+    return {
+        'tuned': tuned,
+        'readers': readers,
+        'writers': writers,
+        'reads_per_second': round(
+            sum(done for write, done, _ in results if not write) / seconds, 1
+        ),
+        'writes_per_second': round(
+            sum(done for write, done, _ in results if write) / seconds, 1
+        ),
+        'failed': sum(failed for _, _, failed in results),
+    }
@@ -0,0 +1,170 @@
+"""Кэш фрагментов лент с инвалидацией через счётчики поколений.
+
+У каждой области (вся лента, сообщество, автор, лента подписок
+пользователя) есть номер поколения. Ключ фрагмента включает номера всех
+областей, от которых зависит страница. Сигналы Post/Comment/Follow
+увеличивают поколение, и старые фрагменты просто перестают читаться,
+пока не истечёт их срок.
+
+Те же поколения служат валидатором HTTP: conditional_page() отвечает
+304 по ETag страницы, не выполняя запросов к базе и не рендеря шаблон.
+"""
+import hashlib
+import time
+from functools import wraps
+
+from django.conf import settings
+from django.core.cache import cache
+from django.utils.cache import patch_cache_control
+from django.views.decorators.http import condition
+
+SITE = ('site',)
+INDEX = ('index',)
+
+
+def group_scope(slug):
+    return ('group', slug)
+
+
+def author_scope(username):
+    return ('author', username)
+
+
+def follow_scope(username):
+    return ('follow', username)
+
+
+def generation_key(scope):
+    return 'gen:' + ':'.join(str(part) for part in scope)
+
+
+def rebump_key(scope):
+    return 'rebump:' + generation_key(scope)
+
+
+def generations(*scopes):
+    keys = [generation_key(scope) for scope in scopes]
+    deadlines = {}
+    if settings.DATABASE_REPLICAS:
+        deadlines = {rebump_key(scope): scope for scope in scopes}
+    found = cache.get_many([*keys, *deadlines])
+    due = [
+        scope for key, scope in deadlines.items()
+        if found.get(key, float('inf')) <= time.time()
+    ]
+    if due:
+        # Повторный сдвиг, назначенный bump(): его делает первое чтение
+        # после срока. Два процесса могут сдвинуть дважды — это лишь
+        # лишний промах кэша.
+        cache.delete_many([rebump_key(scope) for scope in due])
+        increment(due)
+        found.update(
+            cache.get_many([generation_key(scope) for scope in due])
+        )
+    for key in keys:
+        if key not in found:
+            # add(), а не set(): другой процесс мог успеть создать ключ.
+            value = fresh_generation()
+            cache.add(key, value, None)
+            found[key] = cache.get(key, value)
+    return [found[key] for key in keys]
+
+
+def fresh_generation():
+    # Начальное значение — время в мс, а не 1: если ключ вытеснят из
+    # кэша, новое поколение не совпадёт ни с одним из старых.
+    return int(time.time() * 1000)
+
+
+def increment(scopes):
+    for scope in scopes:
+        key = generation_key(scope)
+        try:
+            cache.incr(key)
+        except ValueError:
+            cache.add(key, fresh_generation(), None)
+
+
+def bump(*scopes):
+    increment(scopes)
+    if settings.DATABASE_REPLICAS:
+        # Пока запись не дошла до реплик, страницы собираются по старым
+        # данным, но уже с новым поколением; второй сдвиг их сбрасывает.
+        # Срок без таймаута: истёкший ключ потерял бы этот сдвиг.
+        deadline = time.time() + settings.REPLICA_MAX_LAG
+        cache.set_many(
+            {rebump_key(scope): deadline for scope in scopes}, None
+        )
+
+
+def viewer_class(request):
+    if request.user.is_authenticated:
+        return f'user{request.user.pk}'
+    return 'anon'
+
+
+def page_token(request):
+    return '&'.join(
+        f'{name}={request.GET.get(name, "")}'
+        for name in ('page', 'after', 'before')
+    )
+
+
+def page_key(request, *scopes):
+    """Версия страницы: поколения областей, страница и класс зрителя.
+
+    Запоминается в запросе, чтобы ETag и ключ фрагмента не читали
+    поколения из кэша дважды.
+    """
+    keys = request.__dict__.setdefault('_page_keys', {})
+    if scopes not in keys:
+        gens = generations(SITE, *scopes)
+        keys[scopes] = ':'.join(
+            [*map(str, gens), page_token(request), viewer_class(request)]
+        )
+    return keys[scopes]
+
+
+def feed_cache(request, *scopes):
+    """Контекст для {% cache feed_cache_timeout feed_page feed_cache_key %}.
+
+    Ключ зависит от поколений областей ленты, страницы или курсора и
+    класса зрителя: разметка поста зависит от того, автор ли зритель.
+    """
+    return {
+        'feed_cache_key': page_key(request, *scopes),
+        'feed_cache_timeout': settings.FEED_CACHE_TIMEOUT,
+    }
+
+
+def conditional_page(scopes):
+    """ETag из поколений и Cache-Control по зрителю для GET-страницы.
+
+    scopes(request, *args, **kwargs) возвращает области, от которых зависит
+    страница. ETag слабый: токен CSRF в разметке меняется от рендера к
+    рендеру, а смысл страницы — нет. Страницы гостей публичны и могут
+    храниться прокси PAGE_CACHE_MAX_AGE секунд, страницы пользователей —
+    только в браузере и с проверкой при каждом показе.
+    """
+    def etag(request, *args, **kwargs):
+        key = page_key(request, *scopes(request, *args, **kwargs))
+        return 'W/"%s"' % hashlib.md5(key.encode()).hexdigest()
+
+    def decorator(view):
+        conditional_view = condition(etag_func=etag)(view)
+
+        @wraps(view)
+        def wrapper(request, *args, **kwargs):
+            response = conditional_view(request, *args, **kwargs)
+            if request.method not in ('GET', 'HEAD'):
+                return response
+            if request.user.is_authenticated:
+                patch_cache_control(response, private=True, no_cache=True)
+            else:
+                patch_cache_control(
+                    response, public=True,
+                    max_age=settings.PAGE_CACHE_MAX_AGE
+                )
+            return response
+        return wrapper
+    return decorator
@@ -0,0 +1,179 @@
+"""Разметка карточек постов в лентах без шаблонизатора.
+
+Делает то же, что includes/post_item.html, но склеивает строки: адреса
+собираются из заготовок, один раз полученных через reverse(), а готовая
+карточка кэшируется. Ключ кэша — хэш всех полей, которые попадают в
+разметку, поэтому правка поста, новый комментарий или готовая миниатюра
+сами дают новый ключ, и сбрасывать ничего не нужно.
+
+В карточке остаётся метка {% punch %} для кнопки автора: она одна для
+всех зрителей и заполняется в pagecache.fill(). Разметка обязана
+совпадать с post_item.html, это проверяют тесты.
+"""
+import hashlib
+from urllib.parse import quote
+
+from django.conf import settings
+from django.core.cache import cache
+from django.template import Context
+from django.template.base import render_value_in_context
+from django.template.defaultfilters import linebreaksbr
+from django.urls import get_script_prefix, reverse
+from django.utils import timezone, translation
+from django.utils.html import escape
+
+from .pagecache import marker
+
+# Значения-заглушки для reverse(): в готовом адресе их место занимает
+# поле поста.
+PLACEHOLDERS = {
+    'username': 'zqusernameqz',
+    'post_id': 987654321,
+    'slug': 'zqslugqz',
+}
+# Так же, как кодирует аргументы reverse().
+URL_SAFE = "!$&'()*+,;=/~:@"
+
+SIZES = 'sizes="(max-width: 1000px) 100vw, 960px"'
+
+_routes = {}
+
+
+def routes():
+    """Заготовки адресов карточки для текущего префикса скрипта."""
+    prefix = get_script_prefix()
+    if prefix not in _routes:
+        found = {}
+        for name, params in (('profile', ('username',)),
+                             ('post', ('username', 'post_id')),
+                             ('group', ('slug',))):
+            url = reverse(f'posts:{name}', kwargs={
+                param: PLACEHOLDERS[param] for param in params
+            })
+            for param in params:
+                url = url.replace(str(PLACEHOLDERS[param]), f'{{{param}}}')
+            found[name] = url
+        _routes[prefix] = found
+    return _routes[prefix]
+
+
+def url(route, **params):
+    return escape(route.format(**{
+        key: quote(str(value), safe=URL_SAFE)
+        for key, value in params.items()
+    }))
+
+
+def image_html(post):
+    if post.thumbnail:
+        sources = ''.join(
+            f'\n    <source type="{escape(mime)}" srcset="{escape(srcset)}" '
+            f'{SIZES} />\n    '
+            for mime, srcset in post.image_sources
+        )
+        srcset = (
+            f' srcset="{escape(post.image_srcset)}" {SIZES}'
+            if post.image_srcset else ''
+        )
+        return (
+            f'\n  <picture>\n    {sources}\n    <img class="card-img" '
+            f'src="{escape(post.thumbnail)}"{srcset} width="960" '
+            f'height="339" loading="lazy" alt="" />\n  </picture>\n  '
+        )
+    if post.image:
+        return (f'\n  <img class="card-img" '
+                f'src="{escape(post.image.url)}" />\n  ')
+    return ''
+
+
+def render_card(post, context=None):
+    """Разметка карточки, как у includes/post_item.html с метками."""
+    urls = routes()
+    username = post.author.username
+    group = ''
+    if post.group_id:
+        group = (
+            f'\n    <a class="card-link muted" href="'
+            f'{url(urls["group"], slug=post.group.slug)}">\n'
+            f'      <strong class="d-block text-gray-dark">'
+            f'#{escape(post.group.title)}</strong>\n    </a>\n    '
+        )
+    comments = ''
+    if post.comment_count:
+        comments = (
+            f'\n        <div>\n          Комментариев: '
+            f'{post.comment_count}\n        </div>\n        '
+        )
+    actions = '' if post.archived else marker(
+        'post_actions', {'author': username, 'post_id': str(post.id)}
+    )
+    pub_date = render_value_in_context(post.pub_date, context or Context())
+    return (
+        '\n<div class="card mb-3 mt-1 shadow-sm">\n\n'
+        '  <!-- Отображение картинки -->\n  '
+        f'{image_html(post)}'
+        '\n  <!-- Отображение текста поста -->\n'
+        '  <div class="card-body">\n'
+        '    <p class="card-text">\n'
+        '      <!-- Ссылка на автора через @ -->\n'
+        f'      <a name="post_{post.id}" '
+        f'href="{url(urls["profile"], username=username)}">\n'
+        f'        <strong class="d-block text-gray-dark">'
+        f'@{escape(post.author)}</strong>\n'
+        '      </a>\n'
+        f'      {linebreaksbr(post.text, autoescape=True)}\n'
+        '    </p>\n\n'
+        '    <!-- Если пост относится к какому-нибудь сообществу, '
+        'то отобразим ссылку на него через # -->\n    '
+        f'{group}'
+        '\n\n    <!-- Отображение ссылки на комментарии -->\n'
+        '    <div class="d-flex justify-content-between '
+        'align-items-center">\n'
+        '      <div class="btn-group">\n        '
+        f'{comments}'
+        '\n      <p>\n'
+        '        <a class="btn btn-sm btn-primary" '
+        f'href="{url(urls["post"], username=username, post_id=post.id)}" '
+        'role="button">\n'
+        '          Добавить комментарий\n'
+        '        </a>\n\n'
+        '        <!-- Ссылка на редактирование поста для автора; '
+        'архив не правится -->\n'
+        f'        {actions}\n'
+        '      </p>\n'
+        '      </div>\n'
+        '      <!-- Дата публикации поста -->\n'
+        f'      <small class="text-muted">{pub_date}</small>\n'
+        '    </div>\n'
+        '  </div>\n'
+        '</div>'
+    )
+
+
+def card_key(post):
+    parts = (
+        post.id, post.text, post.author.username, post.pub_date.isoformat(),
+        post.group_id and post.group.slug, post.group_id and post.group.title,
+        post.comment_count, post.thumbnail, post.image.name or '',
+        post.image_variants, post.archived, get_script_prefix(),
+        timezone.get_current_timezone_name(), translation.get_language(),
+    )
+    digest = hashlib.md5(
+        '\x1f'.join(map(str, parts)).encode()
+    ).hexdigest()
+    return f'card:{post.id}:{digest}'
+
+
+def render(posts):
+    """Разметка карточек по порядку: кэш читается одним get_many()."""
+    posts = list(posts)
+    keys = [card_key(post) for post in posts]
+    found = cache.get_many(keys)
+    missing = {}
+    context = Context()
+    for key, post in zip(keys, posts):
+        if key not in found:
+            found[key] = missing[key] = render_card(post, context)
+    if missing:
+        cache.set_many(missing, settings.CARD_CACHE_TIMEOUT)
+    return [found[key] for key in keys]
@@ -0,0 +1,209 @@
+"""Буферизованная запись комментариев для горячих постов.
+
+При COMMENT_BUFFER_SIZE > 0 add_comment не вставляет комментарий сразу,
+а кладёт его в буфер процесса. Фоновый поток сбрасывает буфер одним
+bulk_create, когда в нём набралось COMMENT_BUFFER_SIZE комментариев или
+прошло COMMENT_FLUSH_INTERVAL секунд: SQLite берёт блокировку записи
+один раз на пачку, а не на каждый комментарий. Счётчики постов и
+поколения кэша тоже обновляются один раз на пачку. Пачка, которую
+занятая база не приняла, возвращается в начало буфера до следующего
+сброса; пачка с нарушением ограничений пишется по одному комментарию.
+
+Комментарий появляется на странице с задержкой до интервала сброса.
+При штатной остановке процесса буфер сбрасывается в atexit, при падении
+несброшенные комментарии теряются.
+"""
+import atexit
+import logging
+import os
+import time
+from collections import Counter
+from itertools import islice
+from threading import Event, Lock, Thread
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import (IntegrityError, OperationalError, close_old_connections,
+                       transaction)
+
+from . import counters
+from .cache import INDEX, author_scope, bump, group_scope
+from .models import Comment, Post
+
+logger = logging.getLogger(__name__)
+
+# Автор поста не меняется, так что ключ живёт долго и удаляется
+# только вместе с постом.
+AUTHOR_TIMEOUT = 60 * 60 * 24
+
+# Сколько пачек буфер держит, пока база не принимает запись.
+BACKLOG = 10
+
+
+def author_key(post_id):
+    return f'post:author:{post_id}'
+
+
+def is_post_of(post_id, username):
+    """Принадлежит ли пост автору username; без запроса, если есть в кэше.
+
+    Промах сверяется с базой: кэш мог устареть, если id поста занят
+    заново.
+    """
+    if cache.get(author_key(post_id)) == username:
+        return True
+    author = Post.objects.filter(pk=post_id).values_list(
+        'author__username', flat=True
+    ).first()
+    if author is not None:
+        cache.set(author_key(post_id), author, AUTHOR_TIMEOUT)
+    return author == username
+
+
+def forget_post(post_id):
+    cache.delete(author_key(post_id))
+
+
+def forget_author(user_id, batch_size=500):
+    """Сбрасывает автора у всех постов пользователя, сменившего имя."""
+    ids = Post.objects.filter(author_id=user_id).values_list(
+        'pk', flat=True
+    ).iterator()
+    while True:
+        batch = list(islice(ids, batch_size))
+        if not batch:
+            return
+        cache.delete_many([author_key(pk) for pk in batch])
+
+
+def write(comments):
+    """Сохраняет пачку комментариев; возвращает число записанных.
+
+    Комментарии к постам и от пользователей, удалённых, пока
+    комментарии ждали в буфере, отбрасываются.
+    """
+    rows = {
+        pk: (username, slug) for pk, username, slug in Post.objects.filter(
+            pk__in={comment.post_id for comment in comments}
+        ).values_list('pk', 'author__username', 'group__slug')
+    }
+    authors = set(get_user_model().objects.filter(
+        pk__in={comment.author_id for comment in comments}
+    ).values_list('pk', flat=True))
+    comments = [
+        comment for comment in comments
+        if comment.post_id in rows and comment.author_id in authors
+    ]
+    if not comments:
+        return 0
+    with transaction.atomic():
+        Comment.objects.bulk_create(comments)
+        added = Counter(comment.post_id for comment in comments)
+        for post_id, delta in added.items():
+            counters.comments_added(post_id, delta)
+    scopes = {INDEX}
+    for post_id in added:
+        username, slug = rows[post_id]
+        scopes.add(author_scope(username))
+        if slug:
+            scopes.add(group_scope(slug))
+    bump(*scopes)
+    return len(comments)
+
+
+class CommentBuffer:
+    def __init__(self):
+        self.lock = Lock()
+        self.pending = []
+        self.flusher_pid = None
+        self.wakeup = Event()
+
+    def add(self, comment):
+        with self.lock:
+            self.pending.append(comment)
+            full = len(self.pending) >= settings.COMMENT_BUFFER_SIZE
+            # После fork поток не наследуется: в каждом воркере свой.
+            if self.flusher_pid != os.getpid():
+                self.flusher_pid = os.getpid()
+                Thread(target=self.run, name='comment-flusher',
+                       daemon=True).start()
+        if full:
+            # Пишет всегда поток сброса, запрос только будит его.
+            self.wakeup.set()
+
+    def flush(self):
+        with self.lock:
+            batch, self.pending = self.pending, []
+        if not batch:
+            return 0
+        try:
+            return write(batch)
+        except OperationalError:
+            # База занята или недоступна: пачка подождёт следующего сброса.
+            self.requeue(batch)
+            raise
+        except IntegrityError:
+            return self.write_each(batch)
+
+    def write_each(self, batch):
+        """Пишет пачку по одному, отбрасывая то, что база не принимает.
+
+        Иначе одна плохая строка возвращала бы пачку в буфер снова и
+        снова, а за ней стояли бы все остальные комментарии.
+        """
+        written = 0
+        for index, comment in enumerate(batch):
+            try:
+                written += write([comment])
+            except IntegrityError:
+                logger.exception(
+                    'Комментарий к посту %s от пользователя %s отброшен',
+                    comment.post_id, comment.author_id
+                )
+            except OperationalError:
+                self.requeue(batch[index:])
+                raise
+        return written
+
+    def requeue(self, batch):
+        """Возвращает несохранённую пачку в начало очереди.
+
+        Пока база недоступна, в буфере держится не больше BACKLOG пачек;
+        самые новые комментарии сверх этого теряются.
+        """
+        limit = settings.COMMENT_BUFFER_SIZE * BACKLOG
+        with self.lock:
+            self.pending = batch + self.pending
+            lost = len(self.pending) - limit
+            if lost > 0:
+                del self.pending[limit:]
+        if lost > 0:
+            logger.error('Буфер комментариев переполнен, потеряно: %d', lost)
+
+    def run(self):
+        while True:
+            self.wakeup.wait(settings.COMMENT_FLUSH_INTERVAL)
+            self.wakeup.clear()
+            try:
+                self.flush()
+            except Exception:
+                logger.exception('Не удалось сохранить пачку комментариев')
+                # Повтор не раньше следующего интервала, даже если буфер
+                # снова полон.
+                time.sleep(settings.COMMENT_FLUSH_INTERVAL)
+            finally:
+                close_old_connections()
+
+
+buffer = CommentBuffer()
+atexit.register(buffer.flush)
+
+
+def save(comment):
+    """Сохраняет комментарий или ставит в буфер; True, если в буфер."""
+    if settings.COMMENT_BUFFER_SIZE <= 0:
+        comment.save()
+        return False
+    buffer.add(comment)
+    return True
@@ -0,0 +1,83 @@
+"""Денормализованные счётчики Post.comment_count и Profile.*_count.
+
+Все изменения — атомарные UPDATE ... SET x = x + n, без чтения строки.
+Расхождения, если они всё же накопятся, исправляет команда recount.
+"""
+from django.contrib.auth import get_user_model
+from django.db.models import Count, F, IntegerField, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+from .models import ArchivedPost, Comment, Follow, Post, Profile
+
+# (модель, счётчик, что считаем, поле связи, поле модели для связи).
+# Архивные посты остаются в счётчике постов профиля.
+COUNTERS = (
+    (Post, 'comment_count', (Comment,), 'post', 'pk'),
+    (Profile, 'post_count', (Post, ArchivedPost), 'author', 'user'),
+    (Profile, 'follower_count', (Follow,), 'author', 'user'),
+    (Profile, 'following_count', (Follow,), 'user', 'user'),
+)
+
+
+def change(queryset, field, delta):
+    if delta < 0:
+        # Счётчик не уходит в минус, даже если уже разошёлся с данными.
+        queryset = queryset.filter(**{f'{field}__gte': -delta})
+    queryset.update(**{field: F(field) + delta})
+
+
+def posts_added(author_id, delta=1):
+    change(Profile.objects.filter(user_id=author_id), 'post_count', delta)
+
+
+def comments_added(post_id, delta=1):
+    change(Post.objects.filter(pk=post_id), 'comment_count', delta)
+
+
+def follow_added(follow, delta=1):
+    change(
+        Profile.objects.filter(user_id=follow.author_id),
+        'follower_count', delta
+    )
+    change(
+        Profile.objects.filter(user_id=follow.user_id),
+        'following_count', delta
+    )
+
+
+def count_subquery(model, field, outer):
+    rows = model.objects.filter(
+        **{field: OuterRef(outer)}
+    ).order_by().values(field).annotate(count=Count('pk')).values('count')
+    return Coalesce(Subquery(rows, output_field=IntegerField()), 0)
+
+
+def recount(batch_size=10000):
+    """Пересчитывает все счётчики, возвращает {счётчик: исправлено строк}.
+
+    Работает диапазонами первичного ключа, чтобы не держать блокировку
+    на всю таблицу.
+    """
+    Profile.objects.bulk_create(
+        [
+            Profile(user_id=pk) for pk in get_user_model().objects.filter(
+                profile=None
+            ).values_list('pk', flat=True)
+        ],
+        ignore_conflicts=True,
+    )
+    fixed = {}
+    for model, counter, counted, field, outer in COUNTERS:
+        first, *rest = counted
+        actual = count_subquery(first, field, outer)
+        for extra in rest:
+            actual += count_subquery(extra, field, outer)
+        name = f'{model.__name__}.{counter}'
+        fixed[name] = 0
+        last = model.objects.order_by('-pk').values_list(
+            'pk', flat=True).first() or 0
+        for start in range(0, last + 1, batch_size):
+            fixed[name] += model.objects.filter(
+                pk__gte=start, pk__lt=start + batch_size
+            ).exclude(**{counter: actual}).update(**{counter: actual})
+    return fixed
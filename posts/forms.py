@@ -1,5 +1,8 @@
-from django.forms import ModelForm
+from django.core.files.uploadedfile import UploadedFile
+from django.forms import ModelForm, ValidationError
+from PIL import Image
 
+from . import images
 from .models import Post, Comment
 
 
@@ -8,6 +11,20 @@ class PostForm(ModelForm):
         model = Post
         fields = ['group', 'text', 'image']
 
+    def clean_image(self):
+        image = self.cleaned_data.get('image')
+        if isinstance(image, UploadedFile):
+            # Обрезанный файл проходит проверку ImageField: она читает
+            # только заголовок, а ошибка всплывает при декодировании.
+            try:
+                return images.prepare(image)
+            except (OSError, Image.DecompressionBombError):
+                raise ValidationError(
+                    'Не удалось прочитать картинку: файл повреждён '
+                    'или слишком велик.'
+                )
+        return image
+
 
 class CommentForm(ModelForm):
     class Meta:
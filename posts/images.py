@@ -0,0 +1,55 @@
+"""Нормализация загружаемых картинок.
+
+Загрузка уменьшается до POST_IMAGE_MAX_SIDE по длинной стороне,
+поворачивается по EXIF и перекодируется без метаданных: JPEG для
+непрозрачных картинок, PNG — для картинок с прозрачностью. Имя файла —
+SHA-256 результата, поэтому одинаковые картинки хранятся один раз.
+"""
+import hashlib
+from io import BytesIO
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from PIL import Image, ImageOps
+
+from .models import Post
+
+UPLOAD_TO = Post._meta.get_field('image').upload_to
+
+
+def has_alpha(image):
+    return image.mode in ('RGBA', 'LA') or (
+        image.mode == 'P' and 'transparency' in image.info
+    )
+
+
+def normalize(image_file):
+    """Возвращает (байты, расширение) перекодированной картинки."""
+    max_side = settings.POST_IMAGE_MAX_SIDE
+    with Image.open(image_file) as original:
+        # У анимаций остаётся первый кадр.
+        image = ImageOps.exif_transpose(original)
+        image.thumbnail((max_side, max_side), Image.LANCZOS)
+        out = BytesIO()
+        if has_alpha(image):
+            image.convert('RGBA').save(out, 'PNG', optimize=True)
+            return out.getvalue(), 'png'
+        image.convert('RGB').save(
+            out, 'JPEG', quality=settings.POST_IMAGE_QUALITY,
+            optimize=True, progressive=True,
+        )
+    return out.getvalue(), 'jpg'
+
+
+def prepare(image_file):
+    """Нормализует загрузку для сохранения в Post.image.
+
+    Если такая картинка уже есть в хранилище, возвращается имя имеющегося
+    файла, иначе — ContentFile, который запишет модель при сохранении.
+    """
+    content, extension = normalize(image_file)
+    name = f'{hashlib.sha256(content).hexdigest()}.{extension}'
+    if default_storage.exists(UPLOAD_TO + name):
+        return UPLOAD_TO + name
+    return ContentFile(content, name=name)
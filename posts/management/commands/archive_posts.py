@@ -0,0 +1,25 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from posts.archive import archive, cutoff
+
+
+class Command(BaseCommand):
+    help = (
+        'Переносит посты старше заданного возраста вместе с комментариями '
+        'в архивные таблицы.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--days', type=int, default=settings.ARCHIVE_AFTER_DAYS,
+            help='Возраст поста в днях, после которого он уходит в архив.'
+        )
+        parser.add_argument(
+            '--batch-size', type=int, default=500,
+            help='Сколько постов переносить одной транзакцией.'
+        )
+
+    def handle(self, *args, **options):
+        moved = archive(cutoff(options['days']), options['batch_size'])
+        self.stdout.write(f'Перенесено в архив: {moved}')
@@ -0,0 +1,27 @@
+from django.core.management.base import BaseCommand
+
+from posts.bench import comment_rate
+
+
+class Command(BaseCommand):
+    help = (
+        'Замеряет, сколько комментариев в секунду принимает один пост: '
+        'с записью каждого комментария сразу и через буфер.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--comments', type=int, default=2000)
+        parser.add_argument('--threads', type=int, default=8)
+        parser.add_argument(
+            '--buffer', type=int, default=100,
+            help='Размер буфера для второго замера.'
+        )
+
+    def handle(self, *args, **options):
+        for size in (0, options['buffer']):
+            row = comment_rate(options['comments'], options['threads'], size)
+            self.stdout.write(
+                f"буфер {row['buffer_size']:>4}  "
+                f"сохранено {row['saved']:>6}  ошибок {row['failed']:>4}  "
+                f"{row['seconds']:>7} с  {row['per_second']:>8} в секунду"
+            )
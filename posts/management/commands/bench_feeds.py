@@ -0,0 +1,43 @@
+import json
+import os
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from posts.bench import run
+
+
+class Command(BaseCommand):
+    help = (
+        'Замеряет страницы posts/urls.py тестовым клиентом: p50/p95/p99, '
+        'число запросов и размер ответа. Отчёт пишется в JSON.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--runs', type=int, default=20)
+        parser.add_argument(
+            '--cold', action='store_true',
+            help='Очищать кэш перед каждым запросом.'
+        )
+        parser.add_argument(
+            '--output',
+            help='Файл отчёта; по умолчанию bench/<дата и время>.json.'
+        )
+
+    def handle(self, *args, **options):
+        report = run(runs=options['runs'], cold=options['cold'])
+        output = options['output'] or os.path.join(
+            settings.BASE_DIR, 'bench',
+            timezone.now().strftime('%Y%m%d-%H%M%S.json')
+        )
+        os.makedirs(os.path.dirname(output) or '.', exist_ok=True)
+        with open(output, 'w', encoding='utf-8') as report_file:
+            json.dump(report, report_file, ensure_ascii=False, indent=2)
+        for row in report['results']:
+            self.stdout.write(
+                f"{row['name']:<14} p50 {row['p50_ms']:>8} мс  "
+                f"p95 {row['p95_ms']:>8} мс  p99 {row['p99_ms']:>8} мс  "
+                f"запросов {row['queries']:>3}  байт {row['bytes']}"
+            )
+        self.stdout.write(f'Отчёт: {output}')
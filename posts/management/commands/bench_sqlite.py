@@ -0,0 +1,26 @@
+from django.core.management.base import BaseCommand
+
+from posts.bench import sqlite_rate
+
+
+class Command(BaseCommand):
+    help = (
+        'Замеряет чтения и записи в секунду к файлу SQLite из нескольких '
+        'потоков: без настройки и с PRAGMA и постоянными соединениями.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--readers', type=int, default=4)
+        parser.add_argument('--writers', type=int, default=2)
+        parser.add_argument('--seconds', type=float, default=3.0)
+
+    def handle(self, *args, **options):
+        for tuned in (False, True):
+            row = sqlite_rate(tuned, options['readers'], options['writers'],
+                              options['seconds'])
+            self.stdout.write(
+                f"{'с настройкой' if row['tuned'] else 'без настройки':<14}"
+                f"чтений {row['reads_per_second']:>9} в секунду  "
+                f"записей {row['writes_per_second']:>8} в секунду  "
+                f"ошибок {row['failed']:>4}"
+            )
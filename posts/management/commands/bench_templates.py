@@ -0,0 +1,21 @@
+from django.core.management.base import BaseCommand
+
+from posts.bench import render_pages
+
+
+class Command(BaseCommand):
+    help = (
+        'Замеряет рендер ленты на 10 и 100 постов с кэширующим '
+        'загрузчиком шаблонов и без него.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--runs', type=int, default=50)
+        parser.add_argument('--sizes', type=int, nargs='+', default=[10, 100])
+
+    def handle(self, *args, **options):
+        for row in render_pages(options['sizes'], options['runs']):
+            self.stdout.write(
+                f"{row['loader']:<9} постов {row['posts']:>4}  "
+                f"p50 {row['p50_ms']:>8} мс  p95 {row['p95_ms']:>8} мс"
+            )
@@ -0,0 +1,85 @@
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.utils import timezone
+
+from posts.models import ArchivedPost, Group, Post
+from posts.paginator import CursorPaginator
+from posts.timeline import follow_feed
+
+
+def view_querysets():
+    """Запросы, которые выполняют ленты posts.views, по имени view."""
+    user = get_user_model()(pk=0)
+    group = Group(pk=0)
+    post = Post(pk=0)
+    return {
+        'index': Post.objects.for_feed(),
+        'group_post': group.group_post.for_feed(),
+        'profile': user.posts.for_feed(),
+        'follow_index': follow_feed(user),
+        'post_view': post.comments.all(),
+        'index:archive': ArchivedPost.objects.for_feed(),
+        'group_post:archive': group.archived_posts.for_feed(),
+        'profile:archive': user.archived_posts.for_feed(),
+        'post_view:archive': ArchivedPost(pk=0).comments.all(),
+    }
+
+
+def page_queries(name, queryset):
+    """Первая страница и страница по курсору ?after= для ленты."""
+    per_page = settings.PAGE_NUMBER
+    yield name, queryset[:per_page]
+    if queryset.model not in (Post, ArchivedPost):
+        return
+    paginator = CursorPaginator(queryset, per_page)
+    cursor = (timezone.now(), 0)
+    yield f'{name} ?after=', paginator.seek(
+        queryset, cursor, older=True
+    )[:per_page + 1]
+
+
+def explain(queryset):
+    sql, params = queryset.query.sql_with_params()
+    with connection.cursor() as cursor:
+        cursor.execute('EXPLAIN QUERY PLAN ' + sql, params)
+        return [row[-1] for row in cursor.fetchall()]
+
+
+def problems(plan):
+    """Полный просмотр таблицы или сортировка во временном B-дереве."""
+    found = []
+    for line in plan:
+        if line.startswith('SCAN ') and ' USING ' not in line:
+            found.append(line)
+        elif 'TEMP B-TREE' in line and 'ORDER BY' in line:
+            found.append(line)
+    return found
+
+
+class Command(BaseCommand):
+    help = (
+        'Проверяет EXPLAIN QUERY PLAN запросов лент: ни одна не должна '
+        'читать таблицу целиком и сортировать её во временном B-дереве.'
+    )
+
+    def handle(self, *args, **options):
+        if connection.vendor != 'sqlite':
+            raise CommandError('Проверка планов поддерживает только SQLite.')
+        failed = []
+        for view, queryset in view_querysets().items():
+            for name, query in page_queries(view, queryset):
+                plan = explain(query)
+                bad = problems(plan)
+                status = self.style.ERROR('FAIL') if bad else \
+                    self.style.SUCCESS('OK')
+                self.stdout.write(f'{status} {name}')
+                for line in plan:
+                    self.stdout.write(f'    {line}')
+                if bad:
+                    failed.append(name)
+        if failed:
+            raise CommandError(
+                'Запросы без подходящего индекса: ' + ', '.join(failed)
+            )
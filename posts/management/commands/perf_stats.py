@@ -0,0 +1,34 @@
+import json
+
+from django.core.management.base import BaseCommand
+
+from yatube.perf import report
+
+
+class Command(BaseCommand):
+    help = (
+        'Показывает скользящую статистику запросов по маршрутам, '
+        'собранную PerfMiddleware со всех воркеров.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--json', action='store_true', help='Вывести отчёт в JSON.'
+        )
+
+    def handle(self, *args, **options):
+        rows = report()
+        if options['json']:
+            self.stdout.write(json.dumps(rows, ensure_ascii=False, indent=2))
+            return
+        if not rows:
+            self.stdout.write('Замеров пока нет.')
+        for name, row in rows.items():
+            self.stdout.write(
+                f"{name:<24} n={row['requests']:<5} "
+                f"p50 {row['p50_ms']:>8} мс  p95 {row['p95_ms']:>8} мс  "
+                f"p99 {row['p99_ms']:>8} мс  SQL {row['sql_count']:>5} "
+                f"({row['sql_ms']} мс, повторов {row['sql_duplicates']})  "
+                f"шаблоны {row['template_ms']} мс  "
+                f"кэш {row['cache_hit_ratio']}"
+            )
@@ -0,0 +1,68 @@
+import io
+import os
+import pstats
+from collections import Counter, defaultdict
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from yatube.profiling import view_of
+
+
+class Command(BaseCommand):
+    help = (
+        'Сводит сохранённые профили запросов по представлениям: '
+        'стеки сэмплера — в <view>.collapsed для flamegraph.pl или '
+        'speedscope, профили cProfile — в <view>.pstats.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--output',
+            help='Каталог отчёта; по умолчанию PROFILE_DIR/report.'
+        )
+        parser.add_argument(
+            '--top', type=int, default=10,
+            help='Сколько функций cProfile показать для представления.'
+        )
+
+    def handle(self, *args, **options):
+        output = options['output'] or os.path.join(
+            settings.PROFILE_DIR, 'report'
+        )
+        os.makedirs(output, exist_ok=True)
+        files = defaultdict(list)
+        if os.path.isdir(settings.PROFILE_DIR):
+            for name in sorted(os.listdir(settings.PROFILE_DIR)):
+                extension = name.rsplit('.', 1)[-1]
+                if extension in ('collapsed', 'pstats'):
+                    path = os.path.join(settings.PROFILE_DIR, name)
+                    files[view_of(name), extension].append(path)
+        if not files:
+            self.stdout.write('Профилей нет.')
+        for (view, extension), paths in sorted(files.items()):
+            target = os.path.join(output, f'{view}.{extension}')
+            if extension == 'collapsed':
+                self.write_collapsed(paths, target)
+            else:
+                self.write_pstats(paths, target, options['top'])
+            self.stdout.write(f'{view}: профилей {len(paths)} -> {target}')
+
+    def write_collapsed(self, paths, target):
+        stacks = Counter()
+        for path in paths:
+            with open(path) as profile_file:
+                for line in profile_file:
+                    stack, _, count = line.rstrip('\n').rpartition(' ')
+                    stacks[stack] += int(count)
+        with open(target, 'w') as report_file:
+            report_file.writelines(
+                f'{stack} {count}\n' for stack, count in stacks.most_common()
+            )
+
+    def write_pstats(self, paths, target, top):
+        out = io.StringIO()
+        stats = pstats.Stats(*paths, stream=out)
+        stats.dump_stats(target)
+        stats.sort_stats('cumulative').print_stats(top)
+        self.stdout.write(out.getvalue())
@@ -0,0 +1,19 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from posts.search import rebuild
+
+
+class Command(BaseCommand):
+    help = 'Перестраивает полнотекстовый индекс постов пачками.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size', type=int, default=2000,
+            help='Сколько постов индексировать за раз.'
+        )
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            indexed = rebuild(options['batch_size'])
+        self.stdout.write(f'Проиндексировано постов: {indexed}')
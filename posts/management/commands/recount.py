@@ -0,0 +1,20 @@
+from django.core.management.base import BaseCommand
+
+from posts.counters import recount
+
+
+class Command(BaseCommand):
+    help = (
+        'Пересчитывает денормализованные счётчики постов и профилей '
+        'и исправляет расхождения.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size', type=int, default=10000,
+            help='Сколько строк обновлять одним запросом.'
+        )
+
+    def handle(self, *args, **options):
+        for counter, fixed in recount(options['batch_size']).items():
+            self.stdout.write(f'{counter}: исправлено {fixed}')
@@ -0,0 +1,37 @@
+import os
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+
+from django.core.management.base import BaseCommand
+
+from posts.models import Post
+from posts.thumbnails import generate_in_worker
+
+
+class Command(BaseCommand):
+    help = (
+        'Строит варианты картинок (ширины и форматы) для постов, '
+        'у которых их ещё нет, в несколько потоков.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--all', action='store_true',
+            help='Перекодировать картинки всех постов заново.'
+        )
+        parser.add_argument(
+            '--workers', type=int, default=os.cpu_count() or 1,
+            help='Число потоков.'
+        )
+
+    def handle(self, *args, **options):
+        posts = Post.objects.exclude(image='').exclude(image=None)
+        if not options['all']:
+            posts = posts.filter(image_variants='')
+        post_ids = list(posts.values_list('id', flat=True))
+        work = partial(generate_in_worker, force=options['all'])
+        with ThreadPoolExecutor(max_workers=options['workers']) as pool:
+            done = sum(1 for url in pool.map(work, post_ids) if url)
+        self.stdout.write(
+            f'Картинок обработано: {done}, с ошибками: {len(post_ids) - done}'
+        )
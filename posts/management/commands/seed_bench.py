@@ -0,0 +1,52 @@
+import random
+
+from django.core.management.base import BaseCommand
+
+from posts.bench import seed
+
+
+class Command(BaseCommand):
+    help = (
+        'Заливает синтетических пользователей, посты, подписки и '
+        'комментарии для нагрузочных замеров.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=1000)
+        parser.add_argument('--posts', type=int, default=20000)
+        parser.add_argument('--groups', type=int, default=20)
+        parser.add_argument(
+            '--follows', type=int, default=30,
+            help='Среднее число подписок на пользователя.'
+        )
+        parser.add_argument('--comments', type=int, default=20000)
+        parser.add_argument(
+            '--days', type=int, default=365,
+            help='За сколько дней разбросаны даты постов.'
+        )
+        parser.add_argument(
+            '--alpha', type=float, default=1.1,
+            help='Показатель степенного закона популярности авторов.'
+        )
+        parser.add_argument('--batch-size', type=int, default=5000)
+        parser.add_argument(
+            '--prefix', default='bench',
+            help='Префикс имён пользователей и адресов сообществ.'
+        )
+        parser.add_argument('--seed', type=int, help='Зерно random.')
+
+    def handle(self, *args, **options):
+        if options['seed'] is not None:
+            random.seed(options['seed'])
+        seed(
+            users=options['users'],
+            posts=options['posts'],
+            groups=options['groups'],
+            follows=options['follows'],
+            comments=options['comments'],
+            days=options['days'],
+            alpha=options['alpha'],
+            batch_size=options['batch_size'],
+            prefix=options['prefix'],
+            log=self.stdout.write,
+        )
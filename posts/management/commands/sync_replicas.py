@@ -0,0 +1,36 @@
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from yatube.replicas import replicate
+
+
+class Command(BaseCommand):
+    help = (
+        'Копирует основную базу SQLite в файлы реплик из '
+        'YATUBE_DB_REPLICAS — замена репликации для локального запуска.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--interval', type=float, default=0,
+            help='Повторять каждые столько секунд; 0 — скопировать один раз.'
+        )
+
+    def handle(self, *args, **options):
+        if not settings.DATABASE_REPLICAS:
+            self.stdout.write(
+                'Реплики не настроены: задайте YATUBE_DB_REPLICAS.'
+            )
+            return
+        source = settings.DATABASES['default']['NAME']
+        while True:
+            for alias in settings.DATABASE_REPLICAS:
+                replicate(source, settings.DATABASES[alias]['NAME'])
+            self.stdout.write(
+                f'Скопировано в реплики: {len(settings.DATABASE_REPLICAS)}'
+            )
+            if not options['interval']:
+                return
+            time.sleep(options['interval'])
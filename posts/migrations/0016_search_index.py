@@ -0,0 +1,42 @@
+from django.db import migrations
+
+SQLITE_CREATE = (
+    "CREATE VIRTUAL TABLE posts_post_fts USING fts5("
+    "text, tokenize = 'unicode61 remove_diacritics 2')",
+    'INSERT INTO posts_post_fts (rowid, text) SELECT id, text FROM posts_post',
+)
+SQLITE_DROP = ('DROP TABLE IF EXISTS posts_post_fts',)
+
+POSTGRES_CREATE = (
+    'CREATE TABLE posts_post_search ('
+    'post_id integer PRIMARY KEY '
+    'REFERENCES posts_post (id) '
+    'ON DELETE CASCADE DEFERRABLE INITIALLY DEFERRED, '
+    'document tsvector NOT NULL)',
+    'CREATE INDEX posts_post_search_document_idx '
+    'ON posts_post_search USING gin (document)',
+    "INSERT INTO posts_post_search (post_id, document) "
+    "SELECT id, to_tsvector('russian', text) FROM posts_post",
+)
+POSTGRES_DROP = ('DROP TABLE IF EXISTS posts_post_search',)
+
+
+def run(statements):
+    def operation(apps, schema_editor):
+        for statement in statements.get(schema_editor.connection.vendor, ()):
+            schema_editor.execute(statement)
+    return operation
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0015_post_image_variants'),
+    ]
+
+    operations = [
+        migrations.RunPython(
+            run({'sqlite': SQLITE_CREATE, 'postgresql': POSTGRES_CREATE}),
+            run({'sqlite': SQLITE_DROP, 'postgresql': POSTGRES_DROP}),
+        ),
+    ]
@@ -1,5 +1,8 @@
+import json
+
 from django.db import models
 from django.contrib.auth import get_user_model
+from django.utils.functional import cached_property
 
 User = get_user_model()
 
@@ -13,7 +16,44 @@ class Group(models.Model):
         return self.title
 
 
-class Post(models.Model):
+class PostQuerySet(models.QuerySet):
+    def for_feed(self):
+        """Всё, что нужно шаблону includes/post_item.html, одним запросом."""
+        return self.select_related('author', 'group').order_by(
+            '-pub_date', '-id'
+        )
+
+    def count(self):
+        # Аннотации ленты (например, поля ленты подписок) не влияют
+        # на число записей, а в COUNT(*) превращали бы запрос в подзапрос.
+        if self._result_cache is not None or not self.query.annotations:
+            return super().count()
+        query = self.query.chain()
+        for alias, annotation in list(query.annotations.items()):
+            if not annotation.contains_aggregate:
+                del query.annotations[alias]
+        return query.get_count(using=self.db)
+
+
+class PostImages:
+    """Картинка поста в разметке; общее у Post и ArchivedPost."""
+
+    @cached_property
+    def image_srcsets(self):
+        return json.loads(self.image_variants) if self.image_variants else {}
+
+    @property
+    def image_sources(self):
+        """Пары (mime, srcset) для <source>, кроме запасного JPEG."""
+        return [(mime, srcset) for mime, srcset in self.image_srcsets.items()
+                if mime != 'image/jpeg']
+
+    @property
+    def image_srcset(self):
+        return self.image_srcsets.get('image/jpeg', '')
+
+
+class Post(PostImages, models.Model):
     text = models.TextField(
         verbose_name='Текст',
         help_text='Поделитесь своими мыслями'
@@ -26,13 +66,15 @@ class Post(models.Model):
         User,
         on_delete=models.CASCADE,
         related_name='posts',
-        verbose_name='Автор'
+        verbose_name='Автор',
+        db_index=False
     )
     group = models.ForeignKey(
         Group,
         on_delete=models.SET_NULL,
         related_name='group_post',
         blank=True, null=True,
+        db_index=False,
         verbose_name='Сообщество',
         help_text='Выберите сообщество (необязательно)'
     )
@@ -43,9 +85,44 @@ class Post(models.Model):
         verbose_name='Прикрепить картинку',
         help_text='Если мысли не передать словами (необязательно)',
     )
+    # Адрес готовой миниатюры, заполняется фоновой задачей после сохранения.
+    thumbnail = models.CharField(
+        max_length=255,
+        blank=True,
+        editable=False,
+        verbose_name='Миниатюра',
+    )
+    # JSON {mime: srcset} с вариантами картинки разных ширин и форматов.
+    image_variants = models.TextField(
+        blank=True,
+        editable=False,
+        verbose_name='Варианты картинки',
+    )
+    comment_count = models.PositiveIntegerField(
+        default=0,
+        editable=False,
+        verbose_name='Комментариев'
+    )
+
+    objects = PostQuerySet.as_manager()
 
     class Meta:
         ordering = ('-pub_date',)
+        # Ленты сортируются по (-pub_date, -id). id входит в каждый индекс
+        # SQLite как rowid, поэтому обратный проход по возрастающему
+        # индексу отдаёт записи в нужном порядке без сортировки.
+        # Составные индексы заменяют индексы внешних ключей author и group.
+        indexes = [
+            models.Index(fields=['pub_date'], name='post_pub_date_idx'),
+            models.Index(
+                fields=['author', 'pub_date'], name='post_author_date_idx'
+            ),
+            models.Index(
+                fields=['group', 'pub_date'], name='post_group_date_idx'
+            ),
+        ]
+
+    archived = False
 
     def __str__(self):
         return self.text[:15]
@@ -56,6 +133,7 @@ class Comment(models.Model):
         Post,
         on_delete=models.CASCADE,
         related_name='comments',
+        db_index=False,
     )
     author = models.ForeignKey(
         User,
@@ -70,6 +148,11 @@ class Comment(models.Model):
 
     class Meta:
         ordering = ('-created',)
+        indexes = [
+            models.Index(
+                fields=['post', 'created'], name='comment_post_created_idx'
+            ),
+        ]
 
 
 class Follow(models.Model):
@@ -91,3 +174,160 @@ class Follow(models.Model):
                 fields=['user', 'author'], name='unique_sub'
             )
         ]
+
+
+class Profile(models.Model):
+    """Счётчики пользователя, которые иначе пришлось бы считать COUNT(*)."""
+    user = models.OneToOneField(
+        User,
+        on_delete=models.CASCADE,
+        related_name='profile'
+    )
+    post_count = models.PositiveIntegerField(
+        default=0, verbose_name='Записей'
+    )
+    follower_count = models.PositiveIntegerField(
+        default=0, verbose_name='Подписчиков'
+    )
+    following_count = models.PositiveIntegerField(
+        default=0, verbose_name='Подписок'
+    )
+
+    def __str__(self):
+        return str(self.user)
+
+
+class TimelineEntry(models.Model):
+    """Запись материализованной ленты подписок пользователя.
+
+    Заполняется при публикации поста (fan-out on write), дата публикации
+    продублирована, чтобы лента читалась диапазоном индекса
+    (user, -pub_date) без сортировки.
+    """
+    user = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='timeline',
+        db_index=False
+    )
+    post = models.ForeignKey(
+        Post,
+        on_delete=models.CASCADE,
+        related_name='timeline'
+    )
+    author = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='+',
+        db_index=False
+    )
+    pub_date = models.DateTimeField()
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=['user', 'post'], name='unique_timeline_post'
+            )
+        ]
+        indexes = [
+            models.Index(
+                fields=['user', '-pub_date', '-post'],
+                name='timeline_user_date_idx'
+            ),
+            models.Index(
+                fields=['user', 'author'], name='timeline_user_author_idx'
+            ),
+        ]
+
+
+class ArchivedPost(PostImages, models.Model):
+    """Пост старше ARCHIVE_AFTER_DAYS, перенесённый командой archive_posts.
+
+    id совпадает с id исходного поста, поэтому адреса не меняются.
+    Архив только для чтения: комментировать и править такие посты нельзя.
+    """
+    id = models.IntegerField(primary_key=True)
+    text = models.TextField(verbose_name='Текст')
+    pub_date = models.DateTimeField(verbose_name='Дата публикации')
+    author = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='archived_posts',
+        verbose_name='Автор',
+        db_index=False
+    )
+    group = models.ForeignKey(
+        Group,
+        on_delete=models.SET_NULL,
+        related_name='archived_posts',
+        blank=True, null=True,
+        db_index=False,
+        verbose_name='Сообщество'
+    )
+    image = models.ImageField(
+        upload_to='posts/',
+        blank=True,
+        null=True,
+        verbose_name='Картинка'
+    )
+    thumbnail = models.CharField(
+        max_length=255,
+        blank=True,
+        verbose_name='Миниатюра'
+    )
+    image_variants = models.TextField(
+        blank=True,
+        verbose_name='Варианты картинки'
+    )
+    comment_count = models.PositiveIntegerField(
+        default=0,
+        verbose_name='Комментариев'
+    )
+
+    objects = PostQuerySet.as_manager()
+
+    archived = True
+
+    class Meta:
+        ordering = ('-pub_date',)
+        indexes = [
+            models.Index(
+                fields=['pub_date'], name='archived_post_date_idx'
+            ),
+            models.Index(
+                fields=['author', 'pub_date'],
+                name='archived_post_author_idx'
+            ),
+            models.Index(
+                fields=['group', 'pub_date'], name='archived_post_group_idx'
+            ),
+        ]
+
+    def __str__(self):
+        return self.text[:15]
+
+
+class ArchivedComment(models.Model):
+    id = models.IntegerField(primary_key=True)
+    post = models.ForeignKey(
+        ArchivedPost,
+        on_delete=models.CASCADE,
+        related_name='comments',
+        db_index=False,
+    )
+    author = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='archived_comments'
+    )
+    text = models.TextField(verbose_name='Текст комментария')
+    created = models.DateTimeField(verbose_name='Дата публикации')
+
+    class Meta:
+        ordering = ('-created',)
+        indexes = [
+            models.Index(
+                fields=['post', 'created'],
+                name='archived_comment_post_idx'
+            ),
+        ]
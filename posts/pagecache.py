@@ -0,0 +1,148 @@
+"""Кэш целых страниц с «дырками» под данные пользователя.
+
+Страница рендерится один раз для всех зрителей: вместо кнопок и блоков,
+которые зависят от пользователя, тег {% punch %} оставляет в разметке
+метку. Готовое тело кэшируется по маршруту, параметрам запроса и
+поколениям областей страницы, а перед отдачей метки заменяются
+разметкой для текущего пользователя — каждая дырка это маленький
+шаблон и функция, которая собирает для него контекст.
+"""
+import hashlib
+import re
+from functools import wraps
+from urllib.parse import parse_qsl, urlencode
+
+from django.conf import settings
+from django.core.cache import cache
+from django.http import HttpResponse
+from django.template.loader import render_to_string
+
+from yatube.replicas import sticky
+
+from .cache import SITE, conditional_page, generations
+from .forms import CommentForm
+from .models import Follow
+
+HOLE_RE = re.compile(r'<!--punch:(\w+)\?(.*?)-->')
+
+# Имя дырки: (шаблон, функция контекста).
+HOLES = {}
+
+
+def hole(name, template):
+    """Регистрирует дырку; функция возвращает контекст или None.
+
+    None значит, что для этого зрителя дырка пустая и шаблон не нужен.
+    """
+    def decorator(func):
+        HOLES[name] = (template, func)
+        return func
+    return decorator
+
+
+@hole('nav', 'includes/nav_user.html')
+def nav_hole(request):
+    return {}
+
+
+@hole('menu', 'includes/menu.html')
+def menu_hole(request, **flags):
+    if not request.user.is_authenticated:
+        return None
+    return flags
+
+
+@hole('post_actions', 'includes/post_actions.html')
+def post_actions_hole(request, author, post_id):
+    if request.user.username != author:
+        return None
+    return {'author': author, 'post_id': post_id}
+
+
+@hole('follow_button', 'includes/follow_button.html')
+def follow_button_hole(request, author):
+    if request.user.username == author:
+        return None
+    following = request.user.is_authenticated and Follow.objects.filter(
+        user=request.user, author__username=author
+    ).exists()
+    return {'author': author, 'following': following}
+
+
+@hole('comment_form', 'includes/comment_form.html')
+def comment_form_hole(request, author, post_id):
+    if not request.user.is_authenticated:
+        return None
+    return {'author': author, 'post_id': post_id, 'form': CommentForm()}
+
+
+def render_hole(request, name, params):
+    template, func = HOLES[name]
+    context = func(request, **params)
+    if context is None:
+        return ''
+    return render_to_string(template, context, request=request)
+
+
+def marker(name, params):
+    return f'<!--punch:{name}?{urlencode(params)}-->'
+
+
+def fill(request, content):
+    """Заменяет метки разметкой для пользователя запроса."""
+    rendered = {}
+
+    def replace(match):
+        if match[0] not in rendered:
+            rendered[match[0]] = render_hole(
+                request, match[1], dict(parse_qsl(match[2]))
+            )
+        return rendered[match[0]]
+    return HOLE_RE.sub(replace, content)
+
+
+def cache_key(view, request, scopes, args, kwargs):
+    # Ключ по представлению, а не по пути: profile_follow отдаёт ту же
+    # страницу профиля, что и profile.
+    gens = generations(SITE, *scopes)
+    raw = '|'.join((
+        f'{view.__module__}.{view.__qualname__}', repr(args),
+        repr(sorted(kwargs.items())),
+        urlencode(sorted(request.GET.items())), *map(str, gens),
+    ))
+    return 'page:' + hashlib.md5(raw.encode()).hexdigest()
+
+
+def page_cache(scopes):
+    """Кэш страницы для всех зрителей плюс ETag из conditional_page().
+
+    scopes — как в conditional_page(). Кэшируются только ответы 200 на
+    GET и HEAD, которые не ставят cookies.
+    """
+    def decorator(view):
+        @wraps(view)
+        def wrapper(request, *args, **kwargs):
+            cacheable = request.method in ('GET', 'HEAD')
+            if cacheable:
+                key = cache_key(view, request,
+                                scopes(request, *args, **kwargs),
+                                args, kwargs)
+                # Только что писавший пользователь читает основную базу:
+                # страница в кэше могла быть собрана по отстающей реплике.
+                content = None if sticky(request) else cache.get(key)
+                if content is not None:
+                    return HttpResponse(fill(request, content))
+            request.punch_holes = True
+            try:
+                response = view(request, *args, **kwargs)
+            finally:
+                # Страницы ошибок рендерятся без меток.
+                request.punch_holes = False
+            content = response.content.decode(response.charset)
+            if (cacheable and response.status_code == 200
+                    and not response.cookies):
+                cache.set(key, content, settings.PAGE_CACHE_TIMEOUT)
+            response.content = fill(request, content)
+            return response
+        return conditional_page(scopes)(wrapper)
+    return decorator
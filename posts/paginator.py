@@ -0,0 +1,259 @@
+import base64
+import binascii
+import hashlib
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.paginator import Page, Paginator
+from django.db.models import Q
+from django.utils.dateparse import parse_datetime
+from django.utils.functional import cached_property
+
+DEFAULT_ORDERING = ('-pub_date', '-id')
+
+
+def encode_cursor(values):
+    raw = '|'.join(
+        value.isoformat() if hasattr(value, 'isoformat') else str(value)
+        for value in values
+    )
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip('=')
+
+
+def decode_cursor(token):
+    """Возвращает (дата, id) из токена или None, если токен испорчен."""
+    try:
+        padded = token + '=' * (-len(token) % 4)
+        raw = base64.urlsafe_b64decode(padded.encode()).decode()
+        date, pk = raw.split('|')
+        date = parse_datetime(date)
+        pk = int(pk)
+    except (ValueError, TypeError, binascii.Error, UnicodeDecodeError):
+        return None
+    if date is None:
+        return None
+    return date, pk
+
+
+class Chain:
+    """Несколько queryset подряд как одна лента.
+
+    Части идут от новых записей к старым и не пересекаются по (дата, id),
+    как основная таблица постов и архив. Следующая часть читается, только
+    когда страница выходит за конец предыдущей.
+    """
+
+    def __init__(self, *parts):
+        self.parts = parts
+
+    def count(self):
+        return sum(part.count() for part in self.parts)
+
+    def __len__(self):
+        return self.count()
+
+    def __getitem__(self, index):
+        if not isinstance(index, slice):
+            rows = self[index:index + 1]
+            if not rows:
+                raise IndexError(index)
+            return rows[0]
+        start, stop = index.start or 0, index.stop
+        rows = []
+        # Число записей во всех уже пройденных частях.
+        offset = 0
+        for number, part in enumerate(self.parts, 1):
+            skip = max(start - offset, 0)
+            found = list(part[skip:stop - offset])
+            rows += found
+            if len(rows) >= stop - start or number == len(self.parts):
+                break
+            # Часть кончилась раньше среза: её длина известна без COUNT(*),
+            # если из неё хоть что-то прочитано.
+            offset += skip + len(found) if found else part.count()
+        return rows
+
+
+class CursorPage:
+    """Страница курсорной пагинации, совместимая с шаблонами ленты."""
+    is_cursor = True
+
+    def __init__(self, object_list, paginator, has_next, has_previous):
+        self.object_list = object_list
+        self.paginator = paginator
+        self._has_next = has_next
+        self._has_previous = has_previous
+
+    def __repr__(self):
+        return f'<CursorPage of {len(self.object_list)} items>'
+
+    def __len__(self):
+        return len(self.object_list)
+
+    def __getitem__(self, index):
+        return self.object_list[index]
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def has_next(self):
+        return self._has_next
+
+    def has_previous(self):
+        return self._has_previous
+
+    def has_other_pages(self):
+        return self._has_next or self._has_previous
+
+    @property
+    def next_cursor(self):
+        if not (self._has_next and self.object_list):
+            return None
+        return self.paginator.cursor_for(self.object_list[-1])
+
+    @property
+    def previous_cursor(self):
+        if not (self._has_previous and self.object_list):
+            return None
+        return self.paginator.cursor_for(self.object_list[0])
+
+
+class CursorPaginator:
+    """Keyset-пагинация по паре (дата, id) без COUNT(*) и OFFSET.
+
+    Порядок берётся из order_by() переданного queryset: оба поля должны
+    сортироваться по убыванию и быть полями или аннотациями модели.
+    Стоимость любой страницы одинакова, так как она читается диапазоном
+    индекса от значения курсора. object_list может быть и Chain: курсор
+    сравнивается с каждой частью по очереди.
+    """
+
+    def __init__(self, object_list, per_page, ordering=None):
+        self.object_list = object_list
+        self.per_page = int(per_page)
+        ordering = (ordering or self.parts[0].query.order_by
+                    or DEFAULT_ORDERING)
+        self.ordering = tuple(field.lstrip('-') for field in ordering)
+
+    @property
+    def parts(self):
+        if isinstance(self.object_list, Chain):
+            return self.object_list.parts
+        return (self.object_list,)
+
+    @cached_property
+    def count(self):
+        return self.object_list.count()
+
+    def cursor_for(self, obj):
+        # obj — объект модели или словарь из values().
+        if isinstance(obj, dict):
+            return encode_cursor(obj[field] for field in self.ordering)
+        return encode_cursor(getattr(obj, field) for field in self.ordering)
+
+    def seek(self, content, cursor, older):
+        date_field, pk_field = self.ordering
+        date, pk = cursor
+        op = 'lt' if older else 'gt'
+        edge = 'lte' if older else 'gte'
+        # Первое условие даёт диапазон по индексу, второе разбивает
+        # записи с одинаковой датой.
+        return content.filter(
+            Q(**{f'{date_field}__{edge}': date}),
+            Q(**{f'{date_field}__{op}': date})
+            | Q(**{f'{pk_field}__{op}': pk}),
+        )
+
+    def read(self, parts, cursor, older, limit):
+        """До limit записей от курсора, часть за частью."""
+        if older:
+            order = tuple(f'-{field}' for field in self.ordering)
+        else:
+            order = self.ordering
+        rows = []
+        for content in parts:
+            if cursor:
+                content = self.seek(content, cursor, older)
+            rows += content.order_by(*order)[:limit - len(rows)]
+            if len(rows) == limit:
+                break
+        return rows
+
+    def get_page(self, after=None, before=None):
+        """Страница после курсора after (старее) или до before (новее).
+
+        Испорченный курсор трактуется как первая страница.
+        """
+        after = after and decode_cursor(after)
+        before = before and decode_cursor(before)
+        limit = self.per_page + 1
+        if before:
+            rows = self.read(self.parts[::-1], before, False, limit)
+            has_previous = len(rows) > self.per_page
+            rows = rows[:self.per_page][::-1]
+            return CursorPage(rows, self, True, has_previous)
+        rows = self.read(self.parts, after, True, limit)
+        has_next = len(rows) > self.per_page
+        return CursorPage(rows[:self.per_page], self, has_next, bool(after))
+
+
+def cached_count(queryset):
+    """COUNT(*) запроса, закэшированный на FEED_COUNT_TIMEOUT секунд.
+
+    У Chain считается только первая часть: это оценка снизу, и
+    feed_page() продлевает ленту в архив, когда до него долистают.
+    """
+    if isinstance(queryset, Chain):
+        return cached_count(queryset.parts[0])
+    sql, params = queryset.query.sql_with_params()
+    key = 'count:' + hashlib.sha1(
+        f'{sql}|{params!r}'.encode()
+    ).hexdigest()
+    return cache.get_or_set(
+        key, queryset.count, settings.FEED_COUNT_TIMEOUT
+    )
+
+
+def feed_page(paginator, number):
+    """Страница обычного Paginator без точного COUNT(*).
+
+    paginator.count должен быть уже задан: оценкой, счётчиком или кэшем.
+    Выборка берёт одну лишнюю строку, и по ней число записей уточняется
+    там, где это видно: на последней странице оно становится точным,
+    а при наличии следующей — не меньше прочитанного. Номер страницы
+    сверяется с выборкой, а не с num_pages, который может отставать.
+    """
+    try:
+        number = max(int(number), 1)
+    except (TypeError, ValueError):
+        number = 1
+    per_page = paginator.per_page
+    bottom = (number - 1) * per_page
+    rows = list(paginator.object_list[bottom:bottom + per_page + 1])
+    if not rows and number > 1:
+        fallback = paginator.num_pages if paginator.num_pages < number else 1
+        return feed_page(paginator, fallback)
+    if len(rows) > per_page:
+        paginator.count = max(paginator.count, bottom + len(rows))
+    else:
+        paginator.count = bottom + len(rows)
+    paginator.__dict__.pop('num_pages', None)
+    return Page(rows[:per_page], number, paginator)
+
+
+def paginate(request, content, per_page=None, count=None):
+    """Возвращает (page, paginator) для ленты.
+
+    Курсорный режим включается параметрами ?after=/?before= или
+    настройкой FEED_PAGINATION = 'cursor', иначе работает обычный
+    Paginator с ?page=N. count — известное заранее число записей.
+    """
+    per_page = per_page or settings.PAGE_NUMBER
+    after = request.GET.get('after')
+    before = request.GET.get('before')
+    if after or before or settings.FEED_PAGINATION == 'cursor':
+        paginator = CursorPaginator(content, per_page)
+        return paginator.get_page(after=after, before=before), paginator
+    paginator = Paginator(content, per_page)
+    paginator.count = count if count is not None else cached_count(content)
+    return feed_page(paginator, request.GET.get('page')), paginator
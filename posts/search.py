@@ -0,0 +1,185 @@
+"""Полнотекстовый поиск по постам.
+
+Индекс хранится в отдельной таблице той же базы: в SQLite это
+виртуальная таблица FTS5, в PostgreSQL — таблица с tsvector и индексом
+GIN. Бэкенд выбирается по connection.vendor через SEARCH_BACKENDS.
+Сигналы постов обновляют индекс по одной записи, команда
+rebuild_search_index перестраивает его целиком.
+"""
+import re
+
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+from django.db import connection
+from django.utils.module_loading import import_string
+
+from .models import Post
+
+WORD_RE = re.compile(r'\w+')
+
+
+def words(query):
+    return WORD_RE.findall(query.lower())
+
+
+class SqliteSearch:
+    table = 'posts_post_fts'
+
+    def index(self, rows):
+        """Добавляет или обновляет записи индекса по парам (id, text)."""
+        rows = list(rows)
+        with connection.cursor() as cursor:
+            cursor.executemany(
+                f'DELETE FROM {self.table} WHERE rowid = %s',
+                [(pk,) for pk, _ in rows]
+            )
+            cursor.executemany(
+                f'INSERT INTO {self.table} (rowid, text) VALUES (%s, %s)',
+                rows
+            )
+
+    def remove(self, ids):
+        with connection.cursor() as cursor:
+            cursor.executemany(
+                f'DELETE FROM {self.table} WHERE rowid = %s',
+                [(pk,) for pk in ids]
+            )
+
+    def clear(self):
+        with connection.cursor() as cursor:
+            cursor.execute(f'DELETE FROM {self.table}')
+
+    @staticmethod
+    def match(query):
+        # Каждое слово в кавычках: пользовательский ввод не должен
+        # разбираться как синтаксис запросов FTS5.
+        return ' '.join(f'"{word}"' for word in words(query))
+
+    def search(self, query, offset, limit):
+        """id найденных постов, от самых релевантных."""
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f'SELECT rowid FROM {self.table} WHERE {self.table} MATCH %s '
+                f'ORDER BY bm25({self.table}), rowid DESC LIMIT %s OFFSET %s',
+                [self.match(query), limit, offset]
+            )
+            return [row[0] for row in cursor.fetchall()]
+
+    def count(self, query):
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f'SELECT COUNT(*) FROM {self.table} '
+                f'WHERE {self.table} MATCH %s',
+                [self.match(query)]
+            )
+            return cursor.fetchone()[0]
+
+
+class PostgresSearch:
+    table = 'posts_post_search'
+    config = 'russian'
+
+    def index(self, rows):
+        with connection.cursor() as cursor:
+            cursor.executemany(
+                f'INSERT INTO {self.table} (post_id, document) '
+                f'VALUES (%s, to_tsvector(%s, %s)) '
+                f'ON CONFLICT (post_id) DO UPDATE '
+                f'SET document = EXCLUDED.document',
+                [(pk, self.config, text) for pk, text in rows]
+            )
+
+    def remove(self, ids):
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f'DELETE FROM {self.table} WHERE post_id = ANY(%s)',
+                [list(ids)]
+            )
+
+    def clear(self):
+        with connection.cursor() as cursor:
+            cursor.execute(f'TRUNCATE {self.table}')
+
+    def search(self, query, offset, limit):
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f'SELECT post_id FROM {self.table}, '
+                f'plainto_tsquery(%s, %s) AS query '
+                f'WHERE document @@ query '
+                f'ORDER BY ts_rank(document, query) DESC, post_id DESC '
+                f'LIMIT %s OFFSET %s',
+                [self.config, query, limit, offset]
+            )
+            return [row[0] for row in cursor.fetchall()]
+
+    def count(self, query):
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f'SELECT COUNT(*) FROM {self.table} '
+                f'WHERE document @@ plainto_tsquery(%s, %s)',
+                [self.config, query]
+            )
+            return cursor.fetchone()[0]
+
+
+def get_backend():
+    path = settings.SEARCH_BACKENDS.get(connection.vendor)
+    if path is None:
+        raise ImproperlyConfigured(
+            f'Нет бэкенда поиска для базы {connection.vendor}'
+        )
+    return import_string(path)()
+
+
+def index_posts(posts):
+    get_backend().index((post.pk, post.text) for post in posts)
+
+
+def remove_posts(ids):
+    get_backend().remove(ids)
+
+
+def rebuild(batch_size=2000):
+    """Перестраивает индекс целиком, читая посты пачками по id."""
+    backend = get_backend()
+    backend.clear()
+    indexed, last_id = 0, 0
+    while True:
+        rows = list(
+            Post.objects.filter(id__gt=last_id).order_by('id')
+            .values_list('id', 'text')[:batch_size]
+        )
+        if not rows:
+            return indexed
+        backend.index(rows)
+        indexed += len(rows)
+        last_id = rows[-1][0]
+
+
+class SearchResults:
+    """Результаты поиска в виде последовательности для Paginator.
+
+    Срез выполняет один запрос к индексу и один — за постами ленты.
+    """
+
+    def __init__(self, query, backend=None):
+        self.query = query
+        self.backend = backend or get_backend()
+
+    def count(self):
+        if not words(self.query):
+            return 0
+        return self.backend.count(self.query)
+
+    def __len__(self):
+        return self.count()
+
+    def __getitem__(self, index):
+        if not isinstance(index, slice):
+            return self[index:index + 1][0]
+        start, stop = index.start or 0, index.stop
+        if not words(self.query) or stop is None or stop <= start:
+            return []
+        ids = self.backend.search(self.query, start, stop - start)
+        posts = Post.objects.for_feed().in_bulk(ids)
+        return [posts[pk] for pk in ids if pk in posts]
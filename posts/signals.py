@@ -0,0 +1,136 @@
+from django.contrib.auth import get_user_model
+from django.db import transaction
+from django.db.models.signals import (post_delete, post_save, pre_delete,
+                                      pre_save)
+from django.dispatch import receiver
+
+from . import comment_buffer, counters, search, timeline
+from .cache import (INDEX, SITE, author_scope, bump, follow_scope,
+                    group_scope)
+from .models import Comment, Follow, Group, Post, Profile
+
+User = get_user_model()
+
+
+def invalidate(*scopes):
+    # Второй раз — после коммита: иначе параллельный запрос мог бы
+    # закэшировать ещё старые данные под уже новым поколением.
+    bump(*scopes)
+    transaction.on_commit(lambda: bump(*scopes))
+
+
+def post_scopes(post_id):
+    row = Post.objects.filter(pk=post_id).values_list(
+        'author__username', 'group__slug'
+    ).first()
+    if row is None:
+        return []
+    username, slug = row
+    scopes = [INDEX, author_scope(username)]
+    if slug:
+        scopes.append(group_scope(slug))
+    return scopes
+
+
+@receiver(pre_save, sender=User)
+def user_saving(sender, instance, raw=False, update_fields=None, **kwargs):
+    if instance.pk and not raw and (
+            update_fields is None or 'username' in update_fields):
+        instance._old_username = User.objects.filter(
+            pk=instance.pk
+        ).values_list('username', flat=True).first()
+
+
+@receiver(post_save, sender=User)
+def user_saved(sender, instance, created, raw=False, update_fields=None,
+               **kwargs):
+    if raw:
+        return
+    if created:
+        Profile.objects.get_or_create(user=instance)
+    elif update_fields is None or set(update_fields) != {'last_login'}:
+        invalidate(SITE)
+    old_username = vars(instance).pop('_old_username', None)
+    if old_username is not None and old_username != instance.username:
+        # Иначе add_comment принимал бы старый адрес поста, а не новый.
+        comment_buffer.forget_author(instance.pk)
+
+
+@receiver(post_save, sender=Group)
+@receiver(post_delete, sender=Group)
+def group_changed(sender, instance, **kwargs):
+    invalidate(SITE)
+
+
+@receiver(pre_save, sender=Post)
+def post_saving(sender, instance, raw=False, **kwargs):
+    if instance.pk and not raw:
+        instance._old_scopes = post_scopes(instance.pk)
+
+
+@receiver(post_save, sender=Post)
+def post_saved(sender, instance, created, raw=False, **kwargs):
+    if raw:
+        return
+    if created:
+        counters.posts_added(instance.author_id)
+        timeline.fan_out(instance)
+    search.index_posts([instance])
+    old_scopes = getattr(instance, '_old_scopes', [])
+    invalidate(*set(old_scopes + post_scopes(instance.pk)))
+
+
+@receiver(pre_delete, sender=Post)
+def post_deleting(sender, instance, **kwargs):
+    instance._old_scopes = post_scopes(instance.pk)
+
+
+@receiver(post_delete, sender=Post)
+def post_deleted(sender, instance, **kwargs):
+    counters.posts_added(instance.author_id, -1)
+    search.remove_posts([instance.pk])
+    comment_buffer.forget_post(instance.pk)
+    invalidate(*getattr(instance, '_old_scopes', []))
+
+
+@receiver(post_save, sender=Comment)
+def comment_saved(sender, instance, created, raw=False, **kwargs):
+    if created and not raw:
+        counters.comments_added(instance.post_id)
+        invalidate(*post_scopes(instance.post_id))
+
+
+@receiver(post_delete, sender=Comment)
+def comment_deleted(sender, instance, **kwargs):
+    counters.comments_added(instance.post_id, -1)
+    invalidate(*post_scopes(instance.post_id))
+
+
+def follow_scopes(follow):
+    names = dict(User.objects.filter(
+        pk__in=[follow.user_id, follow.author_id]
+    ).values_list('pk', 'username'))
+    scopes = []
+    if follow.user_id in names:
+        scopes += [
+            follow_scope(names[follow.user_id]),
+            author_scope(names[follow.user_id]),
+        ]
+    if follow.author_id in names:
+        scopes.append(author_scope(names[follow.author_id]))
+    return scopes
+
+
+@receiver(post_save, sender=Follow)
+def follow_saved(sender, instance, created, raw=False, **kwargs):
+    if created and not raw:
+        counters.follow_added(instance)
+        timeline.backfill(instance)
+        invalidate(*follow_scopes(instance))
+
+
+@receiver(post_delete, sender=Follow)
+def follow_deleted(sender, instance, **kwargs):
+    counters.follow_added(instance, -1)
+    timeline.prune(instance)
+    invalidate(*follow_scopes(instance))
@@ -0,0 +1,22 @@
+from django import template
+from django.utils.safestring import mark_safe
+
+from posts import cards
+from posts.pagecache import fill
+
+register = template.Library()
+
+
+@register.simple_tag(takes_context=True)
+def feed_items(context, posts):
+    """Карточки постов ленты, склеенные из кэша posts.cards."""
+    html = ''.join(cards.render(posts))
+    request = context.get('request')
+    if not getattr(request, 'punch_holes', False):
+        html = fill(request, html)
+    return mark_safe(html)
+
+
+@register.simple_tag(takes_context=True)
+def post_item(context, post):
+    return feed_items(context, [post])
@@ -0,0 +1,16 @@
+from django import template
+from django.utils.safestring import mark_safe
+
+from posts.pagecache import marker, render_hole
+
+register = template.Library()
+
+
+@register.simple_tag(takes_context=True)
+def punch(context, name, **params):
+    """Блок для конкретного зрителя: на кэшируемой странице — метка."""
+    params = {key: str(value) for key, value in params.items()}
+    request = context['request']
+    if getattr(request, 'punch_holes', False):
+        return mark_safe(marker(name, params))
+    return render_hole(request, name, params)
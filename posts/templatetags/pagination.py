@@ -0,0 +1,10 @@
+from django import template
+
+register = template.Library()
+
+
+@register.simple_tag
+def page_window(page, size=4):
+    """Номера страниц вокруг текущей: не больше 2 * size + 1 ссылок."""
+    return range(max(1, page.number - size),
+                 min(page.paginator.num_pages, page.number + size) + 1)
@@ -0,0 +1,113 @@
+import json
+
+from django.contrib.auth import get_user_model
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+
+from posts.models import Comment, Follow, Post
+
+
+@override_settings(PAGE_NUMBER=2)
+class ApiTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        User = get_user_model()
+        cls.author = User.objects.create_user(username='author')
+        cls.reader = User.objects.create_user(username='reader')
+        cls.posts = [
+            Post.objects.create(text=f'Пост {i}', author=cls.author)
+            for i in range(5)
+        ]
+
+    def setUp(self):
+        self.guest_client = Client()
+        self.reader_client = Client()
+        self.reader_client.force_login(self.reader)
+
+    def test_feed_pages_by_cursor(self):
+        url = reverse('posts:api_index')
+        seen = []
+        while url:
+            data = self.guest_client.get(url).json()
+            seen += [post['id'] for post in data['results']]
+            url = data['next']
+        self.assertEqual(seen, [post.id for post in self.posts[::-1]])
+
+    def test_fields(self):
+        response = self.guest_client.get(
+            reverse('posts:api_profile', kwargs={'username': 'author'}),
+            {'fields': 'text,author'}
+        )
+        self.assertEqual(response.json()['results'][0],
+                         {'text': 'Пост 4', 'author': 'author'})
+        response = self.guest_client.get(reverse('posts:api_index'),
+                                         {'fields': 'password'})
+        self.assertEqual(response.status_code, 400)
+
+    def test_etag(self):
+        url = reverse('posts:api_post', kwargs={'post_id': self.posts[0].id})
+        etag = self.guest_client.get(url)['ETag']
+        response = self.guest_client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+        Post.objects.filter(pk=self.posts[0].pk).update(text='Новый текст')
+        response = self.guest_client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+
+    def test_write_requires_login(self):
+        response = self.guest_client.post(
+            reverse('posts:api_index'), {'text': 'Гость'}
+        )
+        self.assertEqual(response.status_code, 401)
+        response = self.guest_client.get(reverse('posts:api_follow_index'))
+        self.assertEqual(response.status_code, 401)
+
+    def test_create_post_and_comment(self):
+        response = self.reader_client.post(
+            reverse('posts:api_index'),
+            json.dumps({'text': 'Из API'}),
+            content_type='application/json'
+        )
+        self.assertEqual(response.status_code, 201)
+        post_id = response.json()['id']
+        self.assertEqual(Post.objects.get(pk=post_id).author, self.reader)
+        url = reverse('posts:api_comments', kwargs={'post_id': post_id})
+        response = self.reader_client.post(url, {'text': 'Комментарий'})
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(response.json()['author'], 'reader')
+        data = self.guest_client.get(url).json()
+        self.assertEqual([comment['text'] for comment in data['results']],
+                         ['Комментарий'])
+        self.assertEqual(Comment.objects.filter(post_id=post_id).count(), 1)
+
+    def test_unknown_fields_create_nothing(self):
+        post = Post.objects.first()
+        urls = (reverse('posts:api_index'),
+                reverse('posts:api_comments', kwargs={'post_id': post.pk}))
+        posts, comments = Post.objects.count(), Comment.objects.count()
+        for url in urls:
+            with self.subTest(url=url):
+                response = self.reader_client.post(
+                    f'{url}?fields=nope', {'text': 'Дубль'}
+                )
+                self.assertEqual(response.status_code, 400)
+        self.assertEqual(Post.objects.count(), posts)
+        self.assertEqual(Comment.objects.count(), comments)
+
+    def test_non_object_body_is_400(self):
+        for body in ('[1, 2]', 'не JSON'):
+            with self.subTest(body=body):
+                response = self.reader_client.post(
+                    reverse('posts:api_index'), body,
+                    content_type='application/json'
+                )
+                self.assertEqual(response.status_code, 400)
+                self.assertIn('detail', response.json())
+
+    def test_follow(self):
+        url = reverse('posts:api_follow', kwargs={'username': 'author'})
+        self.assertEqual(self.reader_client.post(url).status_code, 201)
+        data = self.reader_client.get(reverse('posts:api_follow_index')).json()
+        self.assertEqual(len(data['results']), 2)
+        self.assertEqual(self.reader_client.delete(url).status_code, 200)
+        self.assertFalse(Follow.objects.filter(user=self.reader).exists())
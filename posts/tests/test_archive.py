@@ -0,0 +1,127 @@
+from datetime import timedelta
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import connection
+from django.test import Client, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+
+from posts import counters
+from posts.models import (ArchivedComment, ArchivedPost, Comment, Follow,
+                          Post, TimelineEntry)
+from posts.paginator import Chain, CursorPaginator
+from posts.search import SearchResults
+
+
+@override_settings(PAGE_NUMBER=2)
+class ArchiveTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        User = get_user_model()
+        self.author = User.objects.create_user(username='author')
+        self.reader = User.objects.create_user(username='reader')
+        Follow.objects.create(user=self.reader, author=self.author)
+        self.old = [
+            Post.objects.create(text=f'старый {i}', author=self.author)
+            for i in range(2)
+        ]
+        Comment.objects.create(post=self.old[0], author=self.reader,
+                               text='давний комментарий')
+        for days, post in zip((60, 61), self.old):
+            Post.objects.filter(pk=post.pk).update(
+                pub_date=timezone.now() - timedelta(days=days)
+            )
+        self.new = [
+            Post.objects.create(text=f'новый {i}', author=self.author)
+            for i in range(3)
+        ]
+        self.client = Client()
+        self.client.force_login(self.reader)
+
+    def archive(self):
+        out = StringIO()
+        call_command('archive_posts', days=30, stdout=out)
+        cache.clear()
+        return out.getvalue()
+
+    def post_url(self, post):
+        return reverse('posts:post', kwargs={
+            'username': 'author', 'post_id': post.id
+        })
+
+    def texts(self, page):
+        return [post.text for post in page]
+
+    def test_old_posts_moved_with_comments(self):
+        self.assertIn('Перенесено в архив: 2', self.archive())
+        ids = sorted(post.id for post in self.old)
+        self.assertEqual(
+            sorted(ArchivedPost.objects.values_list('id', flat=True)), ids
+        )
+        self.assertFalse(Post.objects.filter(id__in=ids).exists())
+        self.assertFalse(TimelineEntry.objects.filter(post_id__in=ids))
+        comment = ArchivedComment.objects.get()
+        self.assertEqual(comment.post_id, self.old[0].id)
+        self.assertEqual(ArchivedPost.objects.get(id=comment.post_id)
+                         .comment_count, 1)
+        self.assertEqual(SearchResults('старый').count(), 0)
+        self.author.profile.refresh_from_db()
+        self.assertEqual(self.author.profile.post_count, 5)
+        counters.recount()
+        self.author.profile.refresh_from_db()
+        self.assertEqual(self.author.profile.post_count, 5)
+
+    def test_post_page_reads_archive(self):
+        self.archive()
+        response = self.client.get(self.post_url(self.old[0]))
+        self.assertContains(response, 'старый 0')
+        self.assertContains(response, 'давний комментарий')
+        self.assertNotContains(response, 'Добавить комментарий:')
+        response = self.client.post(
+            reverse('posts:add_comment', kwargs={
+                'username': 'author', 'post_id': self.old[0].id
+            }), {'text': 'поздно'}
+        )
+        self.assertEqual(response.status_code, 404)
+
+    def test_feeds_continue_into_archive(self):
+        self.archive()
+        urls = (reverse('posts:index'), reverse('posts:follow_index'),
+                reverse('posts:profile', kwargs={'username': 'author'}))
+        for url in urls:
+            with self.subTest(url=url):
+                pages = [
+                    self.texts(self.client.get(url, {'page': number})
+                               .context['page'])
+                    for number in (1, 2, 3)
+                ]
+                self.assertEqual(pages, [['новый 2', 'новый 1'],
+                                         ['новый 0', 'старый 0'],
+                                         ['старый 1']])
+
+    def test_first_page_does_not_touch_archive(self):
+        self.archive()
+        with CaptureQueriesContext(connection) as queries:
+            self.client.get(reverse('posts:index'))
+        self.assertFalse(any('archivedpost' in query['sql']
+                             for query in queries))
+
+    def test_cursor_crosses_into_archive(self):
+        self.archive()
+        paginator = CursorPaginator(
+            Chain(Post.objects.for_feed(), ArchivedPost.objects.for_feed()),
+            2
+        )
+        page = paginator.get_page(
+            after=paginator.get_page().next_cursor
+        )
+        self.assertEqual(self.texts(page), ['новый 0', 'старый 0'])
+        last = paginator.get_page(after=page.next_cursor)
+        self.assertEqual(self.texts(last), ['старый 1'])
+        self.assertFalse(last.has_next())
+        back = paginator.get_page(before=last.previous_cursor)
+        self.assertEqual(self.texts(back), ['новый 0', 'старый 0'])
@@ -0,0 +1,46 @@
+import json
+import os
+import random
+import tempfile
+from io import StringIO
+
+from django.core.management import call_command
+from django.test import TestCase
+
+from posts.models import Follow, Post, Profile, TimelineEntry
+from posts.search import SearchResults
+
+
+class BenchTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        random.seed(1)
+        call_command(
+            'seed_bench', users=30, posts=300, groups=3, follows=5,
+            comments=100, stdout=StringIO()
+        )
+
+    def test_seed_rebuilds_derived_data(self):
+        self.assertEqual(Post.objects.count(), 300)
+        profile = Profile.objects.order_by('-post_count').first()
+        self.assertEqual(profile.post_count,
+                         Post.objects.filter(author=profile.user).count())
+        self.assertGreater(profile.post_count, 300 / 30)
+        self.assertTrue(TimelineEntry.objects.exists())
+        self.assertTrue(Follow.objects.exists())
+        self.assertGreater(SearchResults('кофе').count(), 0)
+
+    def test_bench_feeds_writes_report(self):
+        output = os.path.join(tempfile.mkdtemp(), 'report.json')
+        call_command('bench_feeds', runs=2, output=output,
+                     stdout=StringIO())
+        with open(output, encoding='utf-8') as report_file:
+            report = json.load(report_file)
+        names = {row['name'] for row in report['results']}
+        self.assertTrue({'index', 'follow_index', 'profile', 'post',
+                         'group', 'search'} <= names)
+        for row in report['results']:
+            with self.subTest(name=row['name']):
+                self.assertEqual(row['status'], 200)
+                self.assertLessEqual(row['p50_ms'], row['p99_ms'])
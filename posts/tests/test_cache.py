@@ -0,0 +1,210 @@
+import time
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+
+from posts.cache import INDEX, bump, generations, group_scope
+from posts.models import Comment, Follow, Group, Post
+
+
+@override_settings(PAGE_NUMBER=2)
+class FeedCacheTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        User = get_user_model()
+        cls.author = User.objects.create_user(username='author')
+        cls.reader = User.objects.create_user(username='reader')
+        cls.group = Group.objects.create(
+            title='Группа', slug='cache', description='Описание'
+        )
+        for i in range(3):
+            Post.objects.create(
+                text=f'пост {i}', author=cls.author, group=cls.group
+            )
+        cls.urls = (
+            reverse('posts:index'),
+            reverse('posts:group', kwargs={'slug': 'cache'}),
+            reverse('posts:profile', kwargs={'username': 'author'}),
+        )
+
+    def setUp(self):
+        cache.clear()
+        self.guest_client = Client()
+        self.author_client = Client()
+        self.author_client.force_login(self.author)
+
+    def test_pages_are_cached_separately(self):
+        for url in self.urls:
+            with self.subTest(url=url):
+                first = self.guest_client.get(url)
+                second = self.guest_client.get(url, {'page': 2})
+                self.assertContains(first, 'пост 2')
+                self.assertNotContains(second, 'пост 2')
+                self.assertContains(second, 'пост 0')
+
+    def test_viewers_are_cached_separately(self):
+        for url in self.urls:
+            with self.subTest(url=url):
+                self.guest_client.get(url)
+                response = self.author_client.get(url)
+                self.assertContains(response, 'Редактировать')
+
+    def test_new_post_is_visible_at_once(self):
+        for url in self.urls:
+            self.guest_client.get(url)
+        Post.objects.create(text='свежий', author=self.author,
+                            group=self.group)
+        for url in self.urls:
+            with self.subTest(url=url):
+                self.assertContains(self.guest_client.get(url), 'свежий')
+
+    def test_comment_and_edit_invalidate(self):
+        url = self.urls[1]
+        self.guest_client.get(url)
+        post = Post.objects.get(text='пост 2')
+        Comment.objects.create(post=post, author=self.reader, text='к')
+        self.assertContains(self.guest_client.get(url), 'Комментариев: 1')
+        post.group = None
+        post.save()
+        self.assertNotContains(self.guest_client.get(url), 'пост 2')
+
+    def test_follow_feed_invalidated_by_follow(self):
+        client = Client()
+        client.force_login(self.reader)
+        url = reverse('posts:follow_index')
+        self.assertNotContains(client.get(url), 'пост 2')
+        Follow.objects.create(user=self.reader, author=self.author)
+        self.assertContains(client.get(url), 'пост 2')
+
+    def test_bump_changes_generation(self):
+        before = generations(INDEX, group_scope('cache'))
+        bump(INDEX)
+        after = generations(INDEX, group_scope('cache'))
+        self.assertGreater(after[0], before[0])
+        self.assertEqual(after[1], before[1])
+
+    @override_settings(DATABASE_REPLICAS=['replica1'], REPLICA_MAX_LAG=5)
+    def test_bump_schedules_second_bump_after_lag(self):
+        bump(INDEX)
+        first = generations(INDEX)
+        self.assertEqual(generations(INDEX), first)
+        later = time.time() + 6
+        with mock.patch('posts.cache.time.time', return_value=later):
+            second = generations(INDEX)
+            self.assertGreater(second, first)
+            self.assertEqual(generations(INDEX), second)
+
+
+class ConditionalGetTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        User = get_user_model()
+        cls.author = User.objects.create_user(username='author')
+        cls.post = Post.objects.create(text='пост', author=cls.author)
+        cls.urls = (
+            reverse('posts:index'),
+            reverse('posts:profile', kwargs={'username': 'author'}),
+            reverse('posts:post', kwargs={'username': 'author',
+                                          'post_id': cls.post.id}),
+        )
+
+    def setUp(self):
+        cache.clear()
+        self.guest_client = Client()
+        self.author_client = Client()
+        self.author_client.force_login(self.author)
+
+    def test_unchanged_page_is_not_rendered(self):
+        for url in self.urls:
+            with self.subTest(url=url):
+                etag = self.guest_client.get(url)['ETag']
+                with self.assertNumQueries(0):
+                    response = self.guest_client.get(
+                        url, HTTP_IF_NONE_MATCH=etag
+                    )
+                self.assertEqual(response.status_code, 304)
+
+    def test_change_updates_etag(self):
+        etags = [self.guest_client.get(url)['ETag'] for url in self.urls]
+        Comment.objects.create(post=self.post, author=self.author,
+                               text='новый комментарий')
+        for url, etag in zip(self.urls[1:], etags[1:]):
+            with self.subTest(url=url):
+                response = self.guest_client.get(url,
+                                                 HTTP_IF_NONE_MATCH=etag)
+                self.assertEqual(response.status_code, 200)
+
+    def test_viewers_get_different_etags(self):
+        for url in self.urls:
+            with self.subTest(url=url):
+                etag = self.guest_client.get(url)['ETag']
+                response = self.author_client.get(url,
+                                                  HTTP_IF_NONE_MATCH=etag)
+                self.assertEqual(response.status_code, 200)
+
+    def test_cache_control(self):
+        url = self.urls[0]
+        self.assertIn('public', self.guest_client.get(url)['Cache-Control'])
+        self.assertIn('private', self.author_client.get(url)['Cache-Control'])
+
+
+class PageCacheTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        User = get_user_model()
+        cls.author = User.objects.create_user(username='author')
+        cls.reader = User.objects.create_user(username='reader')
+        cls.post = Post.objects.create(text='пост', author=cls.author)
+        cls.index = reverse('posts:index')
+        cls.profile = reverse('posts:profile', kwargs={'username': 'author'})
+        cls.post_url = reverse('posts:post', kwargs={
+            'username': 'author', 'post_id': cls.post.id
+        })
+
+    def setUp(self):
+        cache.clear()
+        self.guest_client = Client()
+        self.author_client = Client()
+        self.author_client.force_login(self.author)
+        self.reader_client = Client()
+        self.reader_client.force_login(self.reader)
+
+    def test_guest_hit_skips_database(self):
+        self.guest_client.get(self.index)
+        with self.assertNumQueries(0):
+            response = self.guest_client.get(self.index)
+        self.assertContains(response, 'пост')
+        self.assertContains(response, 'Войти')
+
+    def test_holes_are_filled_per_user(self):
+        self.guest_client.get(self.index)
+        response = self.author_client.get(self.index)
+        self.assertContains(response, 'Пользователь: author')
+        self.assertContains(response, 'Редактировать')
+        self.assertNotContains(response, '<!--punch')
+        response = self.reader_client.get(self.index)
+        self.assertContains(response, 'Пользователь: reader')
+        self.assertNotContains(response, 'Редактировать')
+
+    def test_follow_button(self):
+        Follow.objects.create(user=self.reader, author=self.author)
+        self.guest_client.get(self.profile)
+        self.assertContains(self.reader_client.get(self.profile),
+                            'Отписаться')
+        self.assertContains(self.guest_client.get(self.profile),
+                            'Подписаться')
+        self.assertNotContains(self.author_client.get(self.profile),
+                               'Подписаться')
+
+    def test_comment_form_has_csrf_token(self):
+        self.guest_client.get(self.post_url)
+        response = self.reader_client.get(self.post_url)
+        self.assertContains(response, 'csrfmiddlewaretoken')
+        self.assertNotContains(self.guest_client.get(self.post_url),
+                               'csrfmiddlewaretoken')
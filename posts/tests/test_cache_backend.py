@@ -0,0 +1,152 @@
+from django.core.cache import caches
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+
+from yatube.cache import RedisCache, TieredCache
+
+LOCMEM = {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+          'LOCATION': 'tiered-test'}
+DATABASE = {'BACKEND': 'django.core.cache.backends.db.DatabaseCache',
+            'LOCATION': 'tiered_test_cache'}
+
+
+class FakeRedis:
+    """Заглушка клиента Redis: хранит байты в словаре, TTL не считает."""
+
+    def __init__(self, url=None):
+        self.data = {}
+
+    def get(self, key):
+        return self.data.get(key)
+
+    def mget(self, keys):
+        return [self.data.get(key) for key in keys]
+
+    def set(self, key, value, px=None, nx=False):
+        if nx and key in self.data:
+            return None
+        self.data[key] = value
+        return True
+
+    def delete(self, *keys):
+        return sum(self.data.pop(key, None) is not None for key in keys)
+
+    def exists(self, key):
+        return int(key in self.data)
+
+    def eval(self, script, numkeys, key, delta):
+        # Единственный скрипт бэкенда — INCR_SCRIPT.
+        if key not in self.data:
+            return None
+        self.data[key] = str(int(self.data[key]) + delta).encode()
+        return int(self.data[key])
+
+    def persist(self, key):
+        return key in self.data
+
+    def pexpire(self, key, px):
+        return key in self.data
+
+    def flushdb(self):
+        self.data.clear()
+
+
+def tiered(shared, l1_timeout=0, shared_only=()):
+    return TieredCache('test', {'OPTIONS': {
+        'SHARED': shared, 'L1_TIMEOUT': l1_timeout, 'L1_MAX_ENTRIES': 10,
+        'SHARED_ONLY': shared_only,
+    }})
+
+
+@override_settings(CACHES={
+    'default': LOCMEM, 'tiered-locmem': LOCMEM, 'tiered-db': DATABASE,
+})
+class TieredCacheTest(TestCase):
+    def setUp(self):
+        call_command('createcachetable', 'tiered_test_cache')
+        for alias in ('tiered-locmem', 'tiered-db'):
+            caches[alias].clear()
+
+    def test_workers_share_writes_and_invalidation(self):
+        for alias in ('tiered-locmem', 'tiered-db'):
+            with self.subTest(shared=alias):
+                first, second = tiered(alias), tiered(alias)
+                first.set('gen', 10)
+                self.assertEqual(second.get('gen'), 10)
+                second.incr('gen')
+                self.assertEqual(first.get('gen'), 11)
+                self.assertEqual(first.get_many(['gen', 'нет']), {'gen': 11})
+                first.delete('gen')
+                self.assertIsNone(second.get('gen'))
+
+    def test_l1_serves_hot_keys(self):
+        cache = tiered('tiered-locmem', l1_timeout=5)
+        cache.set('hot', 'значение')
+        caches['tiered-locmem'].delete('hot')
+        self.assertEqual(cache.get('hot'), 'значение')
+        self.assertEqual(cache.get_many(['hot']), {'hot': 'значение'})
+
+    def test_own_writes_evict_l1(self):
+        cache = tiered('tiered-locmem', l1_timeout=5)
+        cache.set('gen', 1)
+        self.assertEqual(cache.get('gen'), 1)
+        self.assertEqual(cache.incr('gen'), 2)
+        self.assertEqual(cache.get('gen'), 2)
+        cache.delete('gen')
+        self.assertTrue(cache.add('gen', 7))
+        self.assertEqual(cache.get('gen'), 7)
+
+    def test_shared_only_keys_skip_l1(self):
+        cache = tiered('tiered-locmem', l1_timeout=5, shared_only=['gen:'])
+        cache.set('gen:site', 1)
+        cache.set('hot', 1)
+        self.assertEqual(cache.get_many(['gen:site', 'hot']),
+                         {'gen:site': 1, 'hot': 1})
+        self.assertEqual(cache.l1.get_many(['gen:site', 'hot']), {'hot': 1})
+        # Сдвиг из другого воркера: мимо L1 этого процесса.
+        caches['tiered-locmem'].incr('gen:site')
+        self.assertEqual(cache.get('gen:site'), 2)
+        self.assertEqual(cache.get_many(['gen:site']), {'gen:site': 2})
+
+    def test_l1_size_is_capped(self):
+        cache = tiered('tiered-locmem', l1_timeout=5)
+        for i in range(30):
+            cache.set(f'key{i}', i)
+        self.assertLessEqual(len(cache.l1._cache), 10)
+
+
+class RedisCacheTest(TestCase):
+    def setUp(self):
+        self.cache = RedisCache('redis://stand-in', {'OPTIONS': {
+            'CLIENT_FACTORY': 'posts.tests.test_cache_backend.FakeRedis',
+        }})
+
+    def test_values_round_trip(self):
+        self.cache.set('число', 5)
+        self.cache.set('объект', {'id': 1})
+        self.assertEqual(self.cache.get('число'), 5)
+        self.assertEqual(
+            self.cache.get_many(['число', 'объект', 'нет']),
+            {'число': 5, 'объект': {'id': 1}}
+        )
+
+    def test_incr_and_add(self):
+        with self.assertRaises(ValueError):
+            self.cache.incr('gen')
+        self.assertTrue(self.cache.add('gen', 1))
+        self.assertFalse(self.cache.add('gen', 100))
+        self.assertEqual(self.cache.incr('gen'), 2)
+        self.cache.delete('gen')
+        self.assertFalse(self.cache.has_key('gen'))
+
+    def test_generations_over_redis(self):
+        shared = {'BACKEND': 'yatube.cache.RedisCache',
+                  'LOCATION': 'redis://stand-in',
+                  'OPTIONS': {'CLIENT_FACTORY': FakeRedis.__module__
+                              + '.FakeRedis'}}
+        with override_settings(CACHES={'default': LOCMEM,
+                                       'tiered-redis': shared}):
+            cache = tiered('tiered-redis', l1_timeout=5)
+            self.assertTrue(cache.add('gen:site', 1))
+            cache.incr('gen:site')
+            self.assertEqual(cache.get_many(['gen:site']), {'gen:site': 2})
@@ -0,0 +1,71 @@
+import json
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.template.loader import render_to_string
+from django.test import RequestFactory, TestCase
+
+from posts import cards
+from posts.models import Comment, Group, Post
+
+
+class CardsTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = get_user_model().objects.create_user(
+            username='author.name+1'
+        )
+        cls.group = Group.objects.create(
+            title='Кошки & <собаки>', slug='pets', description='Описание'
+        )
+
+    def setUp(self):
+        cache.clear()
+        self.request = RequestFactory().get('/')
+        self.request.user = self.author
+        self.request.punch_holes = True
+
+    def template_card(self, post):
+        return render_to_string('includes/post_item.html',
+                                {'post': post, 'request': self.request})
+
+    def posts(self):
+        plain = Post.objects.create(
+            text='Строка <b>1</b>\nстрока "2" & \'3\'', author=self.author
+        )
+        with_group = Post.objects.create(text='в группе', author=self.author,
+                                         group=self.group)
+        Comment.objects.create(post=with_group, author=self.author, text='к')
+        image = Post.objects.create(text='картинка', author=self.author,
+                                    image='posts/photo.jpg')
+        thumbnail = Post.objects.create(
+            text='миниатюра', author=self.author, image='posts/photo.jpg',
+            thumbnail='/media/thumbnails/a_960x339.jpg',
+            image_variants=json.dumps({
+                'image/webp': '/media/a.webp 480w, /media/b.webp 960w',
+                'image/jpeg': '/media/a.jpg 480w, /media/b.jpg 960w',
+            }),
+        )
+        return Post.objects.for_feed().filter(pk__in=[
+            plain.pk, with_group.pk, image.pk, thumbnail.pk
+        ])
+
+    def test_markup_matches_template(self):
+        for post in self.posts():
+            with self.subTest(post=post.text):
+                self.assertEqual(cards.render_card(post),
+                                 self.template_card(post))
+
+    def test_cached_cards_follow_changes(self):
+        post = Post.objects.create(text='первый', author=self.author)
+        self.assertIn('первый', cards.render([post])[0])
+        self.assertEqual(cache.get(cards.card_key(post)),
+                         cards.render([post])[0])
+        post.text = 'исправленный'
+        post.save()
+        Comment.objects.create(post=post, author=self.author, text='к')
+        post = Post.objects.for_feed().get(pk=post.pk)
+        card = cards.render([post])[0]
+        self.assertIn('исправленный', card)
+        self.assertIn('Комментариев: 1', card)
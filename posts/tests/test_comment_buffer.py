@@ -0,0 +1,152 @@
+import os
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import IntegrityError, OperationalError
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+
+from posts import comment_buffer
+from posts.models import Comment, Post
+
+
+@override_settings(COMMENT_BUFFER_SIZE=3, COMMENT_FLUSH_INTERVAL=3600)
+class CommentBufferTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        User = get_user_model()
+        cls.author = User.objects.create_user(username='author')
+        cls.reader = User.objects.create_user(username='reader')
+
+    def setUp(self):
+        cache.clear()
+        # Свой буфер без потока сброса: тест сбрасывает его сам.
+        self.buffer = comment_buffer.CommentBuffer()
+        self.buffer.flusher_pid = os.getpid()
+        patcher = mock.patch.object(comment_buffer, 'buffer', self.buffer)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.post = Post.objects.create(text='пост', author=self.author)
+        self.client = Client()
+        self.client.force_login(self.reader)
+        self.url = self.comment_url('author', self.post.id)
+
+    def comment_url(self, username, post_id):
+        return reverse('posts:add_comment', kwargs={
+            'username': username, 'post_id': post_id
+        })
+
+    def comment(self, text, **extra):
+        return self.client.post(self.url, {'text': text}, **extra)
+
+    def test_full_buffer_wakes_flusher(self):
+        self.comment('первый')
+        self.comment('второй')
+        self.assertFalse(self.buffer.wakeup.is_set())
+        self.comment('третий')
+        self.assertTrue(self.buffer.wakeup.is_set())
+        self.assertFalse(Comment.objects.exists())
+        self.assertEqual(self.buffer.flush(), 3)
+        self.assertEqual(Comment.objects.filter(post=self.post).count(), 3)
+        self.post.refresh_from_db()
+        self.assertEqual(self.post.comment_count, 3)
+        self.assertEqual(self.buffer.pending, [])
+
+    def test_flush_writes_pending(self):
+        self.comment('первый')
+        self.assertEqual(self.buffer.flush(), 1)
+        self.assertTrue(Comment.objects.filter(text='первый').exists())
+
+    def test_failed_batch_requeued(self):
+        self.comment('первый')
+        self.comment('второй')
+        with mock.patch.object(comment_buffer, 'write',
+                               side_effect=OperationalError):
+            with self.assertRaises(OperationalError):
+                self.buffer.flush()
+        self.comment('третий')
+        self.assertEqual([comment.text for comment in self.buffer.pending],
+                         ['первый', 'второй', 'третий'])
+        self.assertEqual(self.buffer.flush(), 3)
+
+    def test_requeue_keeps_backlog_bound(self):
+        limit = 3 * comment_buffer.BACKLOG
+        for number in range(limit):
+            self.comment(str(number))
+        with mock.patch.object(comment_buffer, 'write',
+                               side_effect=OperationalError):
+            with self.assertRaises(OperationalError):
+                self.buffer.flush()
+            self.comment('лишний')
+            with self.assertRaises(OperationalError), \
+                    self.assertLogs(comment_buffer.logger, 'ERROR'):
+                self.buffer.flush()
+        self.assertEqual(len(self.buffer.pending), limit)
+        self.assertEqual(self.buffer.pending[0].text, '0')
+
+    def test_comment_from_deleted_author_dropped(self):
+        self.comment('первый')
+        guest = get_user_model().objects.create_user(username='guest')
+        guest_client = Client()
+        guest_client.force_login(guest)
+        guest_client.post(self.url, {'text': 'от удалённого'})
+        guest.delete()
+        self.assertEqual(self.buffer.flush(), 1)
+        self.assertEqual(list(Comment.objects.values_list('text', flat=True)),
+                         ['первый'])
+        self.assertEqual(self.buffer.pending, [])
+
+    def test_integrity_error_drops_only_bad_rows(self):
+        write = comment_buffer.write
+
+        def strict_write(comments):
+            if any(comment.text == 'плохой' for comment in comments):
+                raise IntegrityError
+            return write(comments)
+        for text in ('первый', 'плохой', 'третий'):
+            self.comment(text)
+        with mock.patch.object(comment_buffer, 'write', strict_write), \
+                self.assertLogs(comment_buffer.logger, 'ERROR'):
+            self.assertEqual(self.buffer.flush(), 2)
+        self.assertEqual(self.buffer.pending, [])
+        self.assertEqual(
+            set(Comment.objects.values_list('text', flat=True)),
+            {'первый', 'третий'}
+        )
+
+    def test_renamed_author_gets_new_url(self):
+        self.assertTrue(comment_buffer.is_post_of(self.post.id, 'author'))
+        self.author.username = 'renamed'
+        self.author.save()
+        self.addCleanup(setattr, self.author, 'username', 'author')
+        self.assertFalse(comment_buffer.is_post_of(self.post.id, 'author'))
+        self.assertTrue(comment_buffer.is_post_of(self.post.id, 'renamed'))
+
+    def test_comment_to_deleted_post_dropped(self):
+        self.comment('первый')
+        self.post.delete()
+        self.assertEqual(self.buffer.flush(), 0)
+        self.assertFalse(Comment.objects.exists())
+
+    def test_ajax_gets_accepted(self):
+        response = self.comment('первый',
+                                HTTP_X_REQUESTED_WITH='XMLHttpRequest')
+        self.assertEqual(response.status_code, 202)
+        self.assertEqual(response.json(), {'queued': True})
+
+    @override_settings(COMMENT_BUFFER_SIZE=0)
+    def test_ajax_without_buffer_gets_created(self):
+        response = self.comment('первый',
+                                HTTP_X_REQUESTED_WITH='XMLHttpRequest')
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(response.json(), {'queued': False})
+        self.assertTrue(Comment.objects.filter(text='первый').exists())
+
+    def test_unknown_post(self):
+        for url in (self.comment_url('reader', self.post.id),
+                    self.comment_url('author', self.post.id + 1)):
+            response = self.client.post(url, {'text': 'мимо'})
+            self.assertEqual(response.status_code, 404)
+        self.assertEqual(self.buffer.pending, [])
@@ -0,0 +1,74 @@
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import connection
+from django.test import Client, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from posts.models import Comment, Post
+
+
+@override_settings(COMMENTS_PAGE_SIZE=5)
+class CommentPagesTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        User = get_user_model()
+        cls.author = User.objects.create_user(username='author')
+        cls.readers = [User.objects.create_user(username=f'reader{i}')
+                       for i in range(3)]
+        cls.post = Post.objects.create(text='пост', author=cls.author)
+        cls.url = reverse('posts:post', kwargs={
+            'username': 'author', 'post_id': cls.post.id
+        })
+        cls.more_url = reverse('posts:post_comments', kwargs={
+            'username': 'author', 'post_id': cls.post.id
+        })
+
+    def setUp(self):
+        cache.clear()
+        self.client = Client()
+
+    def add_comments(self, number):
+        for i in range(number):
+            Comment.objects.create(post=self.post, text=f'комментарий {i}',
+                                   author=self.readers[i % 3])
+
+    def queries(self, url, params=None):
+        cache.clear()
+        with CaptureQueriesContext(connection) as captured:
+            response = self.client.get(url, params)
+        self.assertEqual(response.status_code, 200)
+        return len(captured)
+
+    def test_first_page_inline(self):
+        self.add_comments(7)
+        response = self.client.get(self.url)
+        self.assertEqual(len(response.context['comment_page']), 5)
+        self.assertContains(response, 'комментарий 6')
+        self.assertNotContains(response, 'комментарий 1<')
+        self.assertContains(response, 'data-more-comments')
+
+    def test_rest_load_by_cursor(self):
+        self.add_comments(7)
+        page = self.client.get(self.url).context['comment_page']
+        response = self.client.get(self.more_url,
+                                   {'after': page.next_cursor})
+        self.assertEqual(
+            [comment.text for comment in response.context['comments']],
+            ['комментарий 1', 'комментарий 0']
+        )
+        self.assertNotContains(response, 'data-more-comments')
+
+    def test_queries_do_not_grow_with_comments(self):
+        self.add_comments(2)
+        few = self.queries(self.url), self.queries(self.more_url)
+        self.add_comments(30)
+        self.assertEqual((self.queries(self.url),
+                          self.queries(self.more_url)), few)
+
+    def test_unknown_post(self):
+        response = self.client.get(reverse('posts:post_comments', kwargs={
+            'username': 'reader0', 'post_id': self.post.id
+        }))
+        self.assertEqual(response.status_code, 404)
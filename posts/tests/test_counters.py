@@ -0,0 +1,90 @@
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.test import Client, TestCase
+from django.urls import reverse
+
+from posts.models import Comment, Follow, Post, Profile
+
+
+class CountersTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        User = get_user_model()
+        cls.author = User.objects.create_user(username='author')
+        cls.reader = User.objects.create_user(username='reader')
+
+    def setUp(self):
+        self.client = Client()
+        self.client.force_login(self.reader)
+
+    def profile(self, user):
+        return Profile.objects.get(user=user)
+
+    def test_profile_created_with_user(self):
+        self.assertEqual(self.profile(self.author).post_count, 0)
+
+    def test_post_count(self):
+        post = Post.objects.create(text='текст', author=self.author)
+        self.assertEqual(self.profile(self.author).post_count, 1)
+        post.delete()
+        self.assertEqual(self.profile(self.author).post_count, 0)
+
+    def test_comment_count(self):
+        post = Post.objects.create(text='текст', author=self.author)
+        self.client.post(
+            reverse('posts:add_comment', kwargs={
+                'username': 'author', 'post_id': post.id
+            }),
+            data={'text': 'комментарий'}
+        )
+        post.refresh_from_db()
+        self.assertEqual(post.comment_count, 1)
+        Comment.objects.filter(post=post).delete()
+        post.refresh_from_db()
+        self.assertEqual(post.comment_count, 0)
+
+    def test_follow_counts(self):
+        self.client.get(
+            reverse('posts:profile_follow', kwargs={'username': 'author'})
+        )
+        self.assertEqual(self.profile(self.author).follower_count, 1)
+        self.assertEqual(self.profile(self.reader).following_count, 1)
+        response = self.client.get(
+            reverse('posts:profile_unfollow', kwargs={'username': 'author'})
+        )
+        self.assertEqual(self.profile(self.author).follower_count, 0)
+        self.assertEqual(self.profile(self.reader).following_count, 0)
+        self.assertContains(response, 'Подписчиков: 0')
+
+    def test_counter_never_negative(self):
+        Profile.objects.filter(user=self.author).update(post_count=0)
+        Post.objects.create(text='текст', author=self.author).delete()
+        Post.objects.create(text='текст', author=self.author).delete()
+        self.assertEqual(self.profile(self.author).post_count, 0)
+
+    def test_recount_repairs_drift(self):
+        post = Post.objects.create(text='текст', author=self.author)
+        Comment.objects.create(post=post, author=self.reader, text='к')
+        Follow.objects.create(user=self.reader, author=self.author)
+        Post.objects.update(comment_count=7)
+        Profile.objects.update(
+            post_count=5, follower_count=5, following_count=5
+        )
+        Profile.objects.filter(user=self.reader).delete()
+        out = StringIO()
+        call_command('recount', batch_size=1, stdout=out)
+        post.refresh_from_db()
+        self.assertEqual(post.comment_count, 1)
+        author, reader = self.profile(self.author), self.profile(self.reader)
+        self.assertEqual(
+            (author.post_count, author.follower_count, author.following_count),
+            (1, 1, 0)
+        )
+        self.assertEqual(
+            (reader.post_count, reader.follower_count, reader.following_count),
+            (0, 0, 1)
+        )
+        self.assertIn('Post.comment_count: исправлено 1', out.getvalue())
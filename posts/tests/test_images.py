@@ -0,0 +1,77 @@
+import shutil
+import tempfile
+from io import BytesIO
+
+from django.contrib.auth import get_user_model
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+from PIL import Image
+
+from posts.models import Post
+
+MEDIA_ROOT = tempfile.mkdtemp()
+
+
+def camera_upload(size=(3000, 1000), mode='RGB', format='JPEG',
+                  name='camera.jpg'):
+    content = BytesIO()
+    image = Image.new(mode, size, 'red')
+    exif = Image.Exif()
+    exif[0x010F] = 'Camera maker'
+    exif[0x0112] = 6
+    image.save(content, format, exif=exif)
+    return SimpleUploadedFile(name, content.getvalue(), 'image/jpeg')
+
+
+@override_settings(MEDIA_ROOT=MEDIA_ROOT, POST_IMAGE_MAX_SIDE=1200)
+class UploadNormalizationTest(TestCase):
+    @classmethod
+    def tearDownClass(cls):
+        shutil.rmtree(MEDIA_ROOT, ignore_errors=True)
+        super().tearDownClass()
+
+    def setUp(self):
+        self.author = get_user_model().objects.create_user(username='author')
+        self.client = Client()
+        self.client.force_login(self.author)
+
+    def upload(self, text, image):
+        self.client.post(
+            reverse('posts:new_post'), {'text': text, 'image': image}
+        )
+        return Post.objects.get(text=text)
+
+    def test_upload_is_downscaled_rotated_and_stripped(self):
+        post = self.upload('пост', camera_upload())
+        with post.image.open('rb') as image_file:
+            image = Image.open(image_file)
+            # EXIF-ориентация 6 — поворот на 90°.
+            self.assertEqual(image.size, (400, 1200))
+            self.assertEqual(image.format, 'JPEG')
+            self.assertFalse(image.getexif())
+
+    def test_identical_uploads_stored_once(self):
+        first = self.upload('первый', camera_upload(name='a.jpg'))
+        second = self.upload('второй', camera_upload(name='b.jpg'))
+        self.assertEqual(first.image.name, second.image.name)
+        self.assertRegex(first.image.name, r'^posts/[0-9a-f]{64}\.jpg$')
+        other = self.upload('третий', camera_upload(size=(300, 200)))
+        self.assertNotEqual(other.image.name, first.image.name)
+
+    def test_transparent_upload_stays_png(self):
+        upload = camera_upload(mode='RGBA', format='PNG', name='logo.png')
+        post = self.upload('пост', upload)
+        self.assertTrue(post.image.name.endswith('.png'))
+
+    def test_truncated_upload_is_form_error(self):
+        upload = camera_upload()
+        truncated = SimpleUploadedFile(
+            'broken.jpg', upload.read()[:2000], 'image/jpeg'
+        )
+        response = self.client.post(
+            reverse('posts:new_post'), {'text': 'битый', 'image': truncated}
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('image', response.context['form'].errors)
+        self.assertFalse(Post.objects.filter(text='битый').exists())
@@ -0,0 +1,136 @@
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import connection
+from django.core.paginator import Page, Paginator
+from django.test import Client, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from posts.models import Post
+from posts.paginator import (CursorPaginator, decode_cursor, encode_cursor,
+                             feed_page)
+
+
+class CursorPaginatorTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = get_user_model().objects.create_user(username='test')
+        for i in range(25):
+            Post.objects.create(text=f'пост {i}', author=cls.user)
+        # Записи с одинаковой датой должны различаться по id.
+        first = Post.objects.order_by('id').first()
+        Post.objects.filter(id__lte=first.id + 4).update(
+            pub_date=first.pub_date
+        )
+
+    def setUp(self):
+        self.guest_client = Client()
+        cache.clear()
+
+    def walk(self):
+        paginator = CursorPaginator(Post.objects.for_feed(), 10)
+        page = paginator.get_page()
+        pages = [page]
+        while page.has_next():
+            page = paginator.get_page(after=page.next_cursor)
+            pages.append(page)
+        return paginator, pages
+
+    def test_pages_cover_feed_once_in_order(self):
+        paginator, pages = self.walk()
+        ids = [post.id for page in pages for post in page]
+        expected = list(
+            Post.objects.order_by('-pub_date', '-id').values_list(
+                'id', flat=True)
+        )
+        self.assertEqual(ids, expected)
+        self.assertEqual([len(page) for page in pages], [10, 10, 5])
+
+    def test_before_returns_previous_page(self):
+        paginator, pages = self.walk()
+        previous = paginator.get_page(before=pages[2].previous_cursor)
+        self.assertEqual(list(previous), list(pages[1]))
+        first = paginator.get_page(before=pages[1].previous_cursor)
+        self.assertEqual(list(first), list(pages[0]))
+        self.assertFalse(first.has_previous())
+
+    def test_deep_page_costs_one_query(self):
+        paginator, pages = self.walk()
+        with CaptureQueriesContext(connection) as queries:
+            list(paginator.get_page(after=pages[1].next_cursor))
+        self.assertEqual(len(queries), 1)
+        self.assertNotIn('COUNT(*)', queries[0]['sql'])
+        self.assertNotIn('OFFSET', queries[0]['sql'])
+
+    def test_broken_cursor_is_first_page(self):
+        self.assertIsNone(decode_cursor('не-курсор'))
+        paginator = CursorPaginator(Post.objects.for_feed(), 10)
+        page = paginator.get_page(after='не-курсор')
+        self.assertFalse(page.has_previous())
+        self.assertEqual(len(page), 10)
+
+    def test_cursor_round_trip(self):
+        post = Post.objects.first()
+        self.assertEqual(
+            decode_cursor(encode_cursor((post.pub_date, post.id))),
+            (post.pub_date, post.id)
+        )
+
+    def test_views_accept_cursor(self):
+        response = self.guest_client.get(reverse('posts:index'))
+        last = response.context['page'][9]
+        cursor = encode_cursor((last.pub_date, last.id))
+        urls = (
+            reverse('posts:index'),
+            reverse('posts:profile', kwargs={'username': 'test'}),
+        )
+        for url in urls:
+            with self.subTest(url=url):
+                response = self.guest_client.get(url, {'after': cursor})
+                page = response.context['page']
+                self.assertEqual(len(page), 10)
+                self.assertContains(response, f'?before={page.previous_cursor}')
+                self.assertContains(response, f'?after={page.next_cursor}')
+
+
+@override_settings(PAGE_NUMBER=2)
+class FeedPaginatorTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = get_user_model().objects.create_user(username='test')
+        for i in range(41):
+            Post.objects.create(text=f'пост {i}', author=cls.user)
+
+    def setUp(self):
+        self.guest_client = Client()
+        cache.clear()
+
+    def test_page_window_is_bounded(self):
+        response = self.guest_client.get(reverse('posts:index'), {'page': 10})
+        self.assertIs(type(response.context['page']), Page)
+        self.assertIs(type(response.context['paginator']), Paginator)
+        # Окно 6..14 без текущей, первая страница, «назад» и «вперёд».
+        self.assertEqual(response.content.decode().count('?page='), 11)
+
+    def test_count_is_cached(self):
+        url = reverse('posts:index')
+        self.guest_client.get(url)
+        with CaptureQueriesContext(connection) as queries:
+            self.guest_client.get(url, {'page': 3})
+        self.assertFalse(
+            any('COUNT(' in query['sql'] for query in queries)
+        )
+
+    def test_stale_count_is_corrected_by_extra_row(self):
+        paginator = Paginator(Post.objects.for_feed(), 10)
+        paginator.count = 0
+        page = feed_page(paginator, 4)
+        self.assertTrue(page.has_next())
+        paginator.count = 0
+        last = feed_page(paginator, 5)
+        self.assertFalse(last.has_next())
+        self.assertEqual(len(last), 1)
+        self.assertEqual(paginator.count, 41)
+        self.assertEqual(feed_page(paginator, 9).number, 5)
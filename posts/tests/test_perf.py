@@ -0,0 +1,75 @@
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.management import call_command
+from django.http import HttpResponse
+from django.shortcuts import render
+from django.test import Client, RequestFactory, TestCase, override_settings
+from django.urls import reverse
+
+from posts.models import Post
+from yatube.perf import PerfMiddleware, aggregate, report
+
+
+class PerfMiddlewareTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        User = get_user_model()
+        cls.author = User.objects.create_user(username='author')
+        cls.staff = User.objects.create_user(username='staff', is_staff=True)
+        Post.objects.create(text='пост', author=cls.author)
+
+    def setUp(self):
+        cache.clear()
+        aggregate.clear()
+        self.guest_client = Client()
+
+    @override_settings(PERF_SERVER_TIMING=True)
+    def test_server_timing_header(self):
+        response = self.guest_client.get(reverse('posts:index'))
+        timing = response['Server-Timing']
+        for metric in ('total;dur=', 'sql;dur=', 'tpl;dur=', 'cache;desc='):
+            with self.subTest(metric=metric):
+                self.assertIn(metric, timing)
+
+    def test_server_timing_off_by_default(self):
+        response = self.guest_client.get(reverse('posts:index'))
+        self.assertFalse(response.has_header('Server-Timing'))
+
+    @override_settings(PERF_SERVER_TIMING=True)
+    def test_duplicate_queries_are_counted(self):
+        def view(request):
+            for _ in range(3):
+                list(Post.objects.filter(pk=1))
+            return HttpResponse()
+        response = PerfMiddleware(view)(RequestFactory().get('/'))
+        self.assertIn('3 queries, 2 duplicates', response['Server-Timing'])
+
+    def test_template_time_is_counted(self):
+        def view(request):
+            return render(request, 'misc/perf.html', {'report': {}})
+        PerfMiddleware(view)(RequestFactory().get('/'))
+        row = report()['unresolved']
+        self.assertGreater(row['template_ms'], 0)
+
+    def test_rolling_aggregate_per_url_name(self):
+        url = reverse('posts:index')
+        self.guest_client.get(url)
+        self.guest_client.get(url)
+        row = report()['posts:index']
+        self.assertEqual(row['requests'], 2)
+        self.assertGreater(row['cache_hit_ratio'], 0)
+        out = StringIO()
+        call_command('perf_stats', stdout=out)
+        self.assertIn('posts:index', out.getvalue())
+
+    def test_dashboard_is_staff_only(self):
+        url = reverse('perf')
+        self.assertEqual(self.guest_client.get(url).status_code, 302)
+        staff_client = Client()
+        staff_client.force_login(self.staff)
+        self.guest_client.get(reverse('posts:index'))
+        response = staff_client.get(url)
+        self.assertContains(response, 'posts:index')
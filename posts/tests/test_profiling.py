@@ -0,0 +1,69 @@
+import os
+import shutil
+import tempfile
+import time
+from io import StringIO
+from threading import get_ident
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+
+from posts.models import Post
+from yatube.profiling import StackSampler
+
+PROFILE_DIR = tempfile.mkdtemp()
+
+
+@override_settings(PROFILE_DIR=PROFILE_DIR, PROFILE_SLOW_MS=0,
+                   PROFILE_SAMPLE_RATE=1.0, PROFILE_KEEP=3)
+class ProfilingTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        author = get_user_model().objects.create_user(username='author')
+        Post.objects.create(text='пост', author=author)
+
+    @classmethod
+    def tearDownClass(cls):
+        shutil.rmtree(PROFILE_DIR, ignore_errors=True)
+        super().tearDownClass()
+
+    def setUp(self):
+        shutil.rmtree(PROFILE_DIR, ignore_errors=True)
+
+    def test_disabled_by_default(self):
+        with override_settings(PROFILE_MODE=''):
+            Client().get(reverse('posts:index'))
+        self.assertFalse(os.path.exists(PROFILE_DIR))
+
+    def test_cprofile_ring_and_report(self):
+        with override_settings(PROFILE_MODE='cprofile'):
+            client = Client()
+            for _ in range(5):
+                client.get(reverse('posts:index'))
+        names = os.listdir(PROFILE_DIR)
+        self.assertEqual(len(names), 3)
+        self.assertTrue(all('posts.index' in name for name in names))
+        output = tempfile.mkdtemp(dir=PROFILE_DIR)
+        out = StringIO()
+        call_command('profile_report', output=output, stdout=out)
+        self.assertIn('posts.index: профилей 3', out.getvalue())
+        self.assertTrue(
+            os.path.exists(os.path.join(output, 'posts.index.pstats'))
+        )
+
+    def test_sampler_collects_collapsed_stacks(self):
+        sampler = StackSampler(0.001)
+        sampler.start()
+        sampler.start_thread(get_ident())
+        deadline = time.perf_counter() + 0.05
+        while time.perf_counter() < deadline:
+            pass
+        stacks = sampler.stop_thread(get_ident())
+        self.assertTrue(stacks)
+        self.assertTrue(any(
+            stack.endswith('test_sampler_collects_collapsed_stacks')
+            for stack in stacks
+        ))
@@ -0,0 +1,86 @@
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import connection
+from django.test import Client, TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from posts.models import Comment, Follow, Group, Post
+
+
+class QueryBudgetMixin:
+    """Число запросов ленты не должно зависеть от размера страницы."""
+
+    def count_queries(self, client, url):
+        cache.clear()
+        with CaptureQueriesContext(connection) as queries:
+            response = client.get(url)
+        self.assertEqual(response.status_code, 200)
+        return len(queries)
+
+    def assertQueryBudget(self, client, url, budget):
+        used = self.count_queries(client, url)
+        self.assertLessEqual(
+            used, budget,
+            f'{url}: {used} запросов при бюджете {budget}'
+        )
+        return used
+
+
+class FeedQueryBudgetTest(QueryBudgetMixin, TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        User = get_user_model()
+        cls.author = User.objects.create_user(username='author')
+        cls.reader = User.objects.create_user(username='reader')
+        cls.group = Group.objects.create(
+            title='Группа', slug='budget', description='Описание'
+        )
+        Follow.objects.create(user=cls.reader, author=cls.author)
+        cls.urls = {
+            reverse('posts:index'): 4,
+            reverse('posts:group', kwargs={'slug': 'budget'}): 5,
+            reverse('posts:profile', kwargs={'username': 'author'}): 6,
+            reverse('posts:follow_index'): 5,
+        }
+
+    def setUp(self):
+        self.client = Client()
+        self.client.force_login(self.reader)
+
+    def add_posts(self, number):
+        for i in range(number):
+            post = Post.objects.create(
+                text=f'пост {i}', author=self.author, group=self.group
+            )
+            Comment.objects.create(post=post, author=self.reader, text='к')
+
+    def test_feeds_within_budget(self):
+        self.add_posts(15)
+        for url, budget in self.urls.items():
+            with self.subTest(url=url):
+                self.assertQueryBudget(self.client, url, budget)
+
+    def test_feeds_do_not_grow_with_page_size(self):
+        self.add_posts(1)
+        # Лента короче страницы дочитывается из архива одним запросом.
+        small = {url: self.count_queries(self.client, url) - 1
+                 for url in self.urls}
+        self.add_posts(14)
+        for url, expected in small.items():
+            with self.subTest(url=url):
+                self.assertEqual(
+                    self.count_queries(self.client, url), expected
+                )
+
+
+class QueryPlanTest(TestCase):
+    def test_feeds_use_indexes(self):
+        out = StringIO()
+        call_command('check_query_plans', stdout=out)
+        self.assertNotIn('FAIL', out.getvalue())
+        self.assertIn('post_pub_date_idx', out.getvalue())
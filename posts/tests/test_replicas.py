@@ -0,0 +1,98 @@
+import os
+import shutil
+import sqlite3
+import tempfile
+from contextlib import closing
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.cache.backends.db import DatabaseCache
+from django.http import HttpResponse
+from django.test import (Client, RequestFactory, SimpleTestCase, TestCase,
+                         override_settings)
+
+from posts.models import Post
+from yatube.replicas import (STICKY_COOKIE, ReplicaMiddleware,
+                             ReplicaRouter, replicate)
+
+CacheEntry = DatabaseCache('cache_table', {}).cache_model_class
+
+
+@override_settings(DATABASE_REPLICAS=['replica1'], REPLICA_MAX_LAG=5)
+class ReplicaRouterTest(SimpleTestCase):
+    def setUp(self):
+        self.router = ReplicaRouter()
+        self.factory = RequestFactory()
+
+    def call(self, request, write=False, model=Post):
+        used = []
+
+        def view(request):
+            used.append(self.router.db_for_read(model))
+            if write:
+                self.router.db_for_write(model)
+                used.append(self.router.db_for_read(model))
+            return HttpResponse()
+        response = ReplicaMiddleware(view)(request)
+        return used, response
+
+    def test_get_reads_replica(self):
+        used, response = self.call(self.factory.get('/'))
+        self.assertEqual(used, ['replica1'])
+        self.assertNotIn(STICKY_COOKIE, response.cookies)
+
+    def test_write_sticks_to_primary(self):
+        used, response = self.call(self.factory.get('/'), write=True)
+        self.assertEqual(used, ['replica1', 'default'])
+        self.assertEqual(response.cookies[STICKY_COOKIE]['max-age'], 5)
+        request = self.factory.get('/')
+        request.COOKIES[STICKY_COOKIE] = '1'
+        self.assertEqual(self.call(request)[0], ['default'])
+
+    def test_post_reads_primary(self):
+        self.assertEqual(self.call(self.factory.post('/'))[0], ['default'])
+
+    def test_outside_request_reads_primary(self):
+        self.assertEqual(self.router.db_for_read(Post), 'default')
+
+    def test_database_cache_stays_on_primary(self):
+        used, response = self.call(self.factory.get('/'), write=True,
+                                   model=CacheEntry)
+        self.assertEqual(used, ['default', 'default'])
+        self.assertNotIn(STICKY_COOKIE, response.cookies)
+
+    @override_settings(DATABASE_REPLICAS=[])
+    def test_without_replicas(self):
+        used, response = self.call(self.factory.get('/'), write=True)
+        self.assertEqual(used, ['default', 'default'])
+        self.assertNotIn(STICKY_COOKIE, response.cookies)
+
+    def test_replicate(self):
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory)
+        source = os.path.join(directory, 'source.sqlite3')
+        target = os.path.join(directory, 'target.sqlite3')
+        with closing(sqlite3.connect(source)) as db:
+            db.execute('CREATE TABLE item (text TEXT)')
+            db.execute("INSERT INTO item VALUES ('пост')")
+            db.commit()
+        replicate(source, target)
+        with closing(sqlite3.connect(target)) as db:
+            self.assertEqual(db.execute('SELECT text FROM item').fetchall(),
+                             [('пост',)])
+
+
+class StickyPageCacheTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.author = get_user_model().objects.create_user(username='author')
+
+    def test_sticky_reader_skips_page_cache(self):
+        self.client.get('/')
+        # bulk_create не шлёт сигналов: поколение не меняется, как при
+        # записи, которая ещё не дошла до реплики.
+        Post.objects.bulk_create([Post(text='свежий', author=self.author)])
+        self.assertNotContains(self.client.get('/'), 'свежий')
+        sticky = Client()
+        sticky.cookies[STICKY_COOKIE] = '1'
+        self.assertContains(sticky.get('/'), 'свежий')
@@ -0,0 +1,91 @@
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.db import connection
+from django.test import Client, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from posts.models import Post
+from posts.search import SearchResults
+
+
+@override_settings(PAGE_NUMBER=2)
+class SearchTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = get_user_model().objects.create_user(username='author')
+        cls.posts = [
+            Post.objects.create(text=text, author=cls.author)
+            for text in (
+                'Кошка спит на диване',
+                'Кошка, кошка и ещё раз кошка',
+                'Собака гуляет во дворе',
+                'Кошка и собака дружат',
+            )
+        ]
+
+    def setUp(self):
+        self.guest_client = Client()
+
+    def ids(self, query):
+        return [post.id for post in SearchResults(query)[0:10]]
+
+    def test_ranked_results(self):
+        self.assertEqual(self.ids('кошка')[0], self.posts[1].id)
+        self.assertCountEqual(
+            self.ids('кошка'),
+            [self.posts[0].id, self.posts[1].id, self.posts[3].id]
+        )
+        self.assertEqual(self.ids('кошка собака'), [self.posts[3].id])
+
+    def test_index_follows_saves_and_deletes(self):
+        post = self.posts[2]
+        post.text = 'Попугай говорит'
+        post.save()
+        self.assertEqual(self.ids('попугай'), [post.id])
+        self.assertEqual(self.ids('собака'), [self.posts[3].id])
+        post.delete()
+        self.assertEqual(self.ids('попугай'), [])
+
+    def test_query_syntax_is_not_interpreted(self):
+        for query in ('"', 'кошка OR', 'NEAR(', '*', ''):
+            with self.subTest(query=query):
+                self.assertIsInstance(self.ids(query), list)
+
+    def test_search_page_is_paginated(self):
+        url = reverse('posts:search')
+        with CaptureQueriesContext(connection) as queries:
+            response = self.guest_client.get(url, {'q': 'кошка'})
+        self.assertEqual(len(response.context['page']), 2)
+        self.assertEqual(response.context['paginator'].count, 3)
+        self.assertContains(response, '?q=%D0%BA%D0%BE%D1%88%D0%BA%D0%B0'
+                                      '&amp;page=2')
+        self.assertFalse(any(
+            'LIKE' in query['sql'] for query in queries
+        ))
+        second = self.guest_client.get(url, {'q': 'кошка', 'page': 2})
+        self.assertEqual(len(second.context['page']), 1)
+
+    def test_api(self):
+        response = self.guest_client.get(
+            reverse('posts:search_api'), {'q': 'собака'}
+        )
+        data = response.json()
+        self.assertEqual(data['count'], 2)
+        self.assertEqual(
+            {item['id'] for item in data['results']},
+            {self.posts[2].id, self.posts[3].id}
+        )
+
+    def test_rebuild_command(self):
+        Post.objects.bulk_create([
+            Post(text='Слон в посудной лавке', author=self.author)
+        ])
+        self.assertEqual(self.ids('слон'), [])
+        out = StringIO()
+        call_command('rebuild_search_index', batch_size=2, stdout=out)
+        self.assertIn('Проиндексировано постов: 5', out.getvalue())
+        self.assertEqual(len(self.ids('слон')), 1)
@@ -0,0 +1,55 @@
+import os
+import shutil
+import tempfile
+
+from django.db import connection
+from django.test import SimpleTestCase
+
+from posts.bench import sqlite_rate
+from yatube.sqlite.base import DatabaseWrapper
+
+
+class SQLiteBackendTest(SimpleTestCase):
+    # Соединения свои, к файлу во временном каталоге, но pytest-django
+    # без этого запрещает классу открывать любые соединения.
+    databases = {'default'}
+
+    def setUp(self):
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory)
+        self.db = DatabaseWrapper({
+            **connection.settings_dict,
+            'NAME': os.path.join(directory, 'test.sqlite3'),
+            'CONN_MAX_AGE': None,
+        }, alias='file')
+        self.addCleanup(self.db.close)
+
+    def pragma(self, name):
+        with self.db.cursor() as cursor:
+            cursor.execute(f'PRAGMA {name}')
+            return cursor.fetchone()[0]
+
+    def test_pragmas_applied(self):
+        self.assertEqual(self.pragma('journal_mode'), 'wal')
+        # NORMAL
+        self.assertEqual(self.pragma('synchronous'), 1)
+        self.assertEqual(self.pragma('busy_timeout'), 5000)
+        self.assertEqual(self.pragma('cache_size'), -20000)
+
+    def test_persistent_connection_reused(self):
+        self.db.ensure_connection()
+        raw = self.db.connection
+        self.db.close_if_unusable_or_obsolete()
+        self.assertIs(self.db.connection, raw)
+
+    def test_broken_connection_closed(self):
+        self.db.ensure_connection()
+        self.db.connection.close()
+        self.db.close_if_unusable_or_obsolete()
+        self.assertIsNone(self.db.connection)
+
+    def test_bench_counts_reads_and_writes(self):
+        row = sqlite_rate(readers=1, writers=1, seconds=0.2, rows=100)
+        self.assertGreater(row['reads_per_second'], 0)
+        self.assertGreater(row['writes_per_second'], 0)
+        self.assertEqual(row['failed'], 0)
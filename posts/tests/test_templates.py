@@ -0,0 +1,27 @@
+import os
+from io import StringIO
+
+from django.conf import settings
+from django.core.management import call_command
+from django.test import SimpleTestCase
+
+from yatube.templates import precompile
+
+
+class TemplatesTest(SimpleTestCase):
+    def test_precompile_loads_project_templates(self):
+        expected = sum(
+            len([name for name in files if name.endswith('.html')])
+            for app in ('', 'posts', 'about', 'users')
+            for _, _, files in os.walk(
+                os.path.join(settings.BASE_DIR, app, 'templates')
+            )
+        )
+        self.assertEqual(precompile(), expected)
+
+    def test_bench_templates(self):
+        out = StringIO()
+        call_command('bench_templates', runs=2, sizes=[3], stdout=out)
+        lines = out.getvalue().splitlines()
+        self.assertEqual(len(lines), 2)
+        self.assertTrue(all('постов    3' in line for line in lines))
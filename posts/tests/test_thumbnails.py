@@ -0,0 +1,164 @@
+import os
+import shutil
+import tempfile
+from concurrent.futures import Executor, Future
+from io import BytesIO, StringIO
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.core.files.storage import default_storage
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.test import (Client, TestCase, TransactionTestCase,
+                         override_settings)
+from django.urls import reverse
+from PIL import Image
+
+from posts.models import Post
+from posts.thumbnails import (THUMBNAIL_SIZE, VARIANT_WIDTHS, build_variants,
+                              generate)
+
+MEDIA_ROOT = tempfile.mkdtemp()
+
+
+def image_upload(name='photo.png', size=(400, 300)):
+    content = BytesIO()
+    Image.new('RGB', size, 'red').save(content, 'PNG')
+    return SimpleUploadedFile(name, content.getvalue(), 'image/png')
+
+
+class InlineExecutor(Executor):
+    """Пул, который выполняет задачи сразу в вызывающем потоке.
+
+    Тестовая база SQLite в памяти не ждёт блокировку записи, а сразу
+    падает с «table is locked», так что потоки с запросами тут не нужны.
+    """
+
+    def __init__(self, max_workers=None):
+        self.max_workers = max_workers
+
+    def submit(self, fn, *args, **kwargs):
+        future = Future()
+        try:
+            future.set_result(fn(*args, **kwargs))
+        except BaseException as exception:
+            future.set_exception(exception)
+        return future
+
+
+@override_settings(MEDIA_ROOT=MEDIA_ROOT)
+class ThumbnailTest(TestCase):
+    @classmethod
+    def tearDownClass(cls):
+        shutil.rmtree(MEDIA_ROOT, ignore_errors=True)
+        super().tearDownClass()
+
+    def setUp(self):
+        self.author = get_user_model().objects.create_user(username='author')
+        self.post = Post.objects.create(
+            text='пост', author=self.author, image=image_upload()
+        )
+
+    def test_generate_stores_url(self):
+        url = generate(self.post.id)
+        self.post.refresh_from_db()
+        self.assertEqual(self.post.thumbnail, url)
+        name = url[len(default_storage.base_url):]
+        with default_storage.open(name) as thumbnail:
+            self.assertEqual(Image.open(thumbnail).size, THUMBNAIL_SIZE)
+
+    def test_feed_shows_stored_thumbnail(self):
+        url = generate(self.post.id)
+        response = Client().get(reverse('posts:index'))
+        self.assertContains(response, f'src="{url}"')
+        self.assertContains(response, '<picture>')
+
+    def test_variants_cover_widths_and_formats(self):
+        generate(self.post.id)
+        self.post.refresh_from_db()
+        srcsets = self.post.image_srcsets
+        self.assertIn('image/webp', srcsets)
+        for mime, srcset in srcsets.items():
+            with self.subTest(mime=mime):
+                widths = [int(entry.rsplit(' ', 1)[1][:-1])
+                          for entry in srcset.split(', ')]
+                self.assertEqual(tuple(widths), VARIANT_WIDTHS)
+        self.assertNotIn('image/jpeg', dict(self.post.image_sources))
+        response = Client().get(reverse('posts:index'))
+        self.assertContains(
+            response, f'srcset="{srcsets["image/webp"]}"'
+        )
+
+    def test_post_without_image(self):
+        post = Post.objects.create(text='без картинки', author=self.author)
+        self.assertEqual(generate(post.id), '')
+
+    def test_parallel_build_leaves_no_duplicates(self):
+        names = build_variants(self.post.image.name)
+        exists = default_storage.exists
+        checked = set()
+
+        def not_yet_built(name):
+            # Вторая сборка проверила файлы до того, как их сохранила
+            # первая; дальше хранилище видит их как есть.
+            if name in checked:
+                return exists(name)
+            checked.add(name)
+            return False
+        with mock.patch.object(default_storage, 'exists', not_yet_built):
+            self.assertEqual(build_variants(self.post.image.name), names)
+        expected = {os.path.basename(name) for name in names.values()}
+        prefix = next(iter(expected)).split('_')[0]
+        _, files = default_storage.listdir('thumbnails')
+        self.assertEqual({name for name in files if name.startswith(prefix)},
+                         expected)
+
+
+@override_settings(THUMBNAIL_WORKERS=0)
+class ThumbnailOnSaveTest(TransactionTestCase):
+    def setUp(self):
+        media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media_root, ignore_errors=True)
+        media = override_settings(MEDIA_ROOT=media_root)
+        media.enable()
+        self.addCleanup(media.disable)
+        self.author = get_user_model().objects.create_user(username='author')
+        self.client = Client()
+        self.client.force_login(self.author)
+
+    def test_new_and_edited_posts_get_thumbnails(self):
+        self.client.post(
+            reverse('posts:new_post'),
+            {'text': 'новый пост', 'image': image_upload()},
+        )
+        post = Post.objects.get(text='новый пост')
+        self.assertTrue(post.thumbnail)
+        first = post.thumbnail
+        self.client.post(
+            reverse('posts:post_edit', kwargs={
+                'username': 'author', 'post_id': post.id
+            }),
+            {'text': 'новый пост',
+             'image': image_upload('other.png', size=(500, 300))},
+        )
+        post.refresh_from_db()
+        self.assertTrue(post.thumbnail)
+        self.assertNotEqual(post.thumbnail, first)
+
+    def test_regenerate_images_processes_backlog(self):
+        posts = [
+            Post.objects.create(
+                text=f'пост {i}', author=self.author, image=image_upload()
+            )
+            for i in range(3)
+        ]
+        out = StringIO()
+        with mock.patch(
+            'posts.management.commands.regenerate_images.ThreadPoolExecutor',
+            InlineExecutor
+        ):
+            call_command('regenerate_images', workers=2, stdout=out)
+        self.assertIn('обработано: 3', out.getvalue())
+        for post in posts:
+            post.refresh_from_db()
+            self.assertTrue(post.image_variants)
@@ -0,0 +1,106 @@
+from django.contrib.auth import get_user_model
+from django.test import TestCase, override_settings
+
+from posts.models import Follow, Post, TimelineEntry
+from posts.paginator import CursorPaginator
+from posts.timeline import follow_feed, rebuild
+
+
+class TimelineTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        User = get_user_model()
+        cls.reader = User.objects.create_user(username='reader')
+        cls.other = User.objects.create_user(username='other')
+        cls.author = User.objects.create_user(username='author')
+        cls.star = User.objects.create_user(username='star')
+
+    def feed_texts(self, user):
+        return [post.text for post in follow_feed(user)]
+
+    def test_new_post_fans_out_to_followers(self):
+        Follow.objects.create(user=self.reader, author=self.author)
+        post = Post.objects.create(text='новый', author=self.author)
+        self.assertTrue(TimelineEntry.objects.filter(
+            user=self.reader, post=post, pub_date=post.pub_date
+        ).exists())
+        self.assertFalse(TimelineEntry.objects.filter(
+            user=self.other).exists())
+
+    def test_follow_backfills_and_unfollow_prunes(self):
+        for i in range(3):
+            Post.objects.create(text=f'старый {i}', author=self.author)
+        follow = Follow.objects.create(user=self.reader, author=self.author)
+        self.assertEqual(
+            self.feed_texts(self.reader), ['старый 2', 'старый 1', 'старый 0']
+        )
+        follow.delete()
+        self.assertEqual(self.feed_texts(self.reader), [])
+        self.assertFalse(TimelineEntry.objects.exists())
+
+    def test_rebuild_matches_fan_out(self):
+        for i in range(3):
+            Post.objects.create(text=f'пост {i}', author=self.author)
+        Follow.objects.create(user=self.reader, author=self.author)
+        Follow.objects.create(user=self.other, author=self.author)
+        fields = ('user_id', 'post_id', 'author_id', 'pub_date')
+        built = set(TimelineEntry.objects.values_list(*fields))
+        self.assertEqual(rebuild(), 6)
+        self.assertEqual(
+            set(TimelineEntry.objects.values_list(*fields)), built
+        )
+
+    @override_settings(TIMELINE_FANOUT_LIMIT=1)
+    def test_celebrity_posts_merged_on_read(self):
+        Follow.objects.create(user=self.reader, author=self.author)
+        Follow.objects.create(user=self.reader, author=self.star)
+        Follow.objects.create(user=self.other, author=self.star)
+        Post.objects.create(text='автор', author=self.author)
+        Post.objects.create(text='звезда', author=self.star)
+        self.assertFalse(
+            TimelineEntry.objects.filter(author=self.star).exists()
+        )
+        self.assertEqual(self.feed_texts(self.reader), ['звезда', 'автор'])
+        self.assertEqual(self.feed_texts(self.other), ['звезда'])
+
+    @override_settings(TIMELINE_FANOUT_LIMIT=1)
+    def test_author_leaving_celebrities_is_fanned_out(self):
+        Follow.objects.create(user=self.reader, author=self.star)
+        follow = Follow.objects.create(user=self.other, author=self.star)
+        Post.objects.create(text='звезда', author=self.star)
+        self.assertFalse(TimelineEntry.objects.exists())
+        follow.delete()
+        self.assertTrue(TimelineEntry.objects.filter(
+            user=self.reader, author=self.star
+        ).exists())
+        self.assertEqual(self.feed_texts(self.reader), ['звезда'])
+
+    @override_settings(TIMELINE_FANOUT_LIMIT=1)
+    def test_author_becoming_celebrity_is_merged_on_read(self):
+        Follow.objects.create(user=self.reader, author=self.author)
+        Post.objects.create(text='автор', author=self.author)
+        Follow.objects.create(user=self.other, author=self.author)
+        self.assertFalse(TimelineEntry.objects.exists())
+        self.assertEqual(self.feed_texts(self.reader), ['автор'])
+        self.assertEqual(self.feed_texts(self.other), ['автор'])
+
+    def test_feed_reads_timeline_index(self):
+        Follow.objects.create(user=self.reader, author=self.author)
+        sql = str(follow_feed(self.reader).query)
+        self.assertIn('posts_timelineentry', sql)
+        self.assertNotIn('posts_follow', sql.split('FROM', 1)[1].split(
+            'WHERE')[0])
+
+    def test_feed_pages_with_cursor(self):
+        Follow.objects.create(user=self.reader, author=self.author)
+        for i in range(5):
+            Post.objects.create(text=f'пост {i}', author=self.author)
+        paginator = CursorPaginator(follow_feed(self.reader), 2)
+        page = paginator.get_page()
+        texts = [post.text for post in page]
+        while page.has_next():
+            page = paginator.get_page(after=page.next_cursor)
+            texts += [post.text for post in page]
+        self.assertEqual(texts, [f'пост {i}' for i in range(4, -1, -1)])
+        self.assertEqual(paginator.count, 5)
@@ -2,6 +2,7 @@ import shutil
 import tempfile
 from django.conf import settings
 from django.contrib.auth import get_user_model
+from django.core.cache import cache
 from django.test import Client, TestCase
 from django.urls import reverse
 from django.core.files.uploadedfile import SimpleUploadedFile
@@ -15,6 +16,7 @@ class PostViewsTest(TestCase):
     @classmethod
     def setUpClass(cls):
         super().setUpClass()
+        cls.media_root = settings.MEDIA_ROOT
         settings.MEDIA_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
         cls.user = get_user_model().objects.create_user(username='test')
         cls.user1 = get_user_model().objects.create_user(username='test1')
@@ -146,9 +148,13 @@ class PostViewsTest(TestCase):
     @classmethod
     def tearDownClass(cls):
         shutil.rmtree(settings.MEDIA_ROOT, ignore_errors=True)
+        settings.MEDIA_ROOT = cls.media_root
         super().tearDownClass()
 
     def setUp(self):
+        # Страницы кэшируются целиком, а откат транзакции теста не меняет
+        # поколений кэша.
+        cache.clear()
         self.guest_client = Client()
         self.authorized_client = Client()
         self.authorized_client.force_login(self.user)
@@ -246,7 +252,7 @@ class PostViewsTest(TestCase):
                     'username': expected_context.author.username
                 })
         )
-        post_author = response.context.get('post').author
+        post_author = response.context.get('page')[0].author
         post_image = response.context.get('page')[0].image
         post_number = response.context.get('count')
         post_pub_date = response.context.get('page')[0].pub_date.strftime(
@@ -308,7 +314,7 @@ class PostViewsTest(TestCase):
         test_post = Post.objects.create(author=self.user1, text='aaaa')
         test_follow = Follow.objects.create(user=self.user, author=self.user1)
         response = self.authorized_client.get(reverse('posts:follow_index'))
-        post_text = response.context.get('post').text
+        post_text = response.context.get('page')[0].text
         self.assertEqual(post_text, test_post.text)
-        post_author = response.context.get('post').author
+        post_author = response.context.get('page')[0].author
         self.assertEqual(post_author, test_post.author)
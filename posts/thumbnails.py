@@ -0,0 +1,171 @@
+"""Миниатюры картинок постов.
+
+Из картинки один раз после сохранения поста строится набор вариантов:
+несколько ширин кадра 960x339 в JPEG, WebP и AVIF (если Pillow собран
+с его поддержкой). Работа идёт в пуле потоков — Pillow отпускает GIL
+на декодировании, ресайзе и кодировании. Адрес основной миниатюры
+пишется в Post.thumbnail, готовые srcset всех форматов — в
+Post.image_variants, так что шаблоны ленты только выводят строки.
+"""
+import hashlib
+import json
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from io import BytesIO
+from threading import Lock
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.db import connections, transaction
+from PIL import Image, ImageOps, features
+
+from .models import Post
+
+logger = logging.getLogger(__name__)
+
+THUMBNAIL_SIZE = (960, 339)
+VARIANT_WIDTHS = (480, 960, 1440)
+
+# MIME-тип: (формат Pillow, расширение, параметры кодирования).
+# Порядок важен: браузер берёт первый подходящий <source>.
+FORMATS = {
+    'image/avif': ('AVIF', 'avif', {'quality': 60}),
+    'image/webp': ('WEBP', 'webp', {'quality': 80, 'method': 4}),
+    'image/jpeg': ('JPEG', 'jpg',
+                   {'quality': 85, 'optimize': True, 'progressive': True}),
+}
+
+_executor = None
+_executor_lock = Lock()
+
+
+def get_executor():
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(
+                max_workers=settings.THUMBNAIL_WORKERS,
+                thread_name_prefix='thumbnail',
+            )
+    return _executor
+
+
+def supported_formats():
+    formats = dict(FORMATS)
+    if not features.check('avif'):
+        formats.pop('image/avif')
+    if not features.check('webp'):
+        formats.pop('image/webp')
+    return formats
+
+
+def variant_size(width):
+    base_width, base_height = THUMBNAIL_SIZE
+    return width, round(width * base_height / base_width)
+
+
+def render(image, size, mime='image/jpeg'):
+    """Байты кадра size (обрезка по центру, с увеличением) в формате mime."""
+    pillow_format, _, options = FORMATS[mime]
+    frame = ImageOps.fit(image, size, Image.LANCZOS)
+    out = BytesIO()
+    frame.save(out, pillow_format, **options)
+    return out.getvalue()
+
+
+def variant_name(image_name, size, mime='image/jpeg'):
+    digest = hashlib.sha1(image_name.encode()).hexdigest()[:16]
+    extension = FORMATS[mime][1]
+    return f'thumbnails/{digest}_{size[0]}x{size[1]}.{extension}'
+
+
+def build_variants(image_name, force=False):
+    """Строит все варианты картинки, возвращает {(mime, ширина): имя файла}.
+
+    Уже лежащие в хранилище файлы не перекодируются, если не задан force.
+    Имена зависят только от картинки, поэтому файл, который успела
+    сохранить параллельная сборка той же картинки, не дублируется.
+    """
+    names = {
+        (mime, width): variant_name(image_name, variant_size(width), mime)
+        for mime in supported_formats() for width in VARIANT_WIDTHS
+    }
+    missing = {
+        key: name for key, name in names.items()
+        if force or not default_storage.exists(name)
+    }
+    if missing:
+        with default_storage.open(image_name, 'rb') as image_file:
+            with Image.open(image_file) as original:
+                image = ImageOps.exif_transpose(original).convert('RGB')
+        for (mime, width), name in missing.items():
+            content = render(image, variant_size(width), mime)
+            if force and default_storage.exists(name):
+                default_storage.delete(name)
+            saved = default_storage.save(name, ContentFile(content))
+            if saved != name:
+                # Хранилище добавило суффикс: name уже занят таким же
+                # файлом из параллельной сборки.
+                default_storage.delete(saved)
+    return names
+
+
+def srcsets(names):
+    result = {}
+    for (mime, width), name in names.items():
+        entry = f'{default_storage.url(name)} {width}w'
+        result[mime] = f'{result[mime]}, {entry}' if mime in result else entry
+    return result
+
+
+def generate(post_id, force=False):
+    """Строит варианты картинки поста и сохраняет их адреса.
+
+    Возвращает адрес основной миниатюры или пустую строку.
+    """
+    # Импорт здесь: signals сам импортирует модули приложения.
+    from .signals import invalidate, post_scopes
+    post = Post.objects.filter(pk=post_id).only('image').first()
+    if post is None or not post.image:
+        return ''
+    names = build_variants(post.image.name, force=force)
+    url = default_storage.url(names['image/jpeg', THUMBNAIL_SIZE[0]])
+    # Условие по image: пока варианты строились, картинку могли сменить.
+    updated = Post.objects.filter(
+        pk=post_id, image=post.image.name
+    ).update(thumbnail=url, image_variants=json.dumps(srcsets(names)))
+    if updated:
+        invalidate(*post_scopes(post_id))
+    return url
+
+
+def _generate_logged(post_id, force=False):
+    try:
+        return generate(post_id, force=force)
+    except Exception:
+        logger.exception('Не удалось построить миниатюру поста %s', post_id)
+        return ''
+
+
+def generate_in_worker(post_id, force=False):
+    """generate() для фонового потока: ошибки пишутся в лог."""
+    try:
+        return _generate_logged(post_id, force=force)
+    finally:
+        connections.close_all()
+
+
+def schedule(post):
+    """Ставит построение миниатюр в очередь после коммита транзакции.
+
+    При THUMBNAIL_WORKERS = 0 миниатюры строятся сразу в этом процессе.
+    """
+    if not post.image:
+        return
+    if settings.THUMBNAIL_WORKERS:
+        transaction.on_commit(
+            lambda: get_executor().submit(generate_in_worker, post.pk)
+        )
+    else:
+        transaction.on_commit(lambda: _generate_logged(post.pk))
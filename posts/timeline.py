@@ -0,0 +1,151 @@
+"""Материализованная лента подписок (fan-out on write).
+
+Новый пост раскладывается в TimelineEntry всех подписчиков автора, так
+что follow_index читает готовый диапазон индекса (user, -pub_date).
+Посты «знаменитостей» — авторов, у которых подписчиков больше
+TIMELINE_FANOUT_LIMIT, — не раскладываются, а подмешиваются при чтении.
+Когда автор переходит порог в любую сторону, его посты убираются из
+лент или раскладываются по ним целиком, так что ни один пост не
+выпадает из ленты.
+"""
+from django.conf import settings
+from django.db import connection
+from django.db.models import F, Q
+
+from .models import ArchivedPost, Follow, Post, Profile, TimelineEntry
+
+
+def is_celebrity(author_id):
+    return Profile.objects.filter(
+        user_id=author_id,
+        follower_count__gt=settings.TIMELINE_FANOUT_LIMIT
+    ).exists()
+
+
+def celebrity_ids(user):
+    """id знаменитостей среди авторов, на которых подписан user."""
+    return list(
+        Follow.objects.filter(
+            user=user,
+            author__profile__follower_count__gt=settings.TIMELINE_FANOUT_LIMIT
+        ).values_list('author_id', flat=True)
+    )
+
+
+def fan_out(post):
+    if is_celebrity(post.author_id):
+        return
+    followers = Follow.objects.filter(
+        author_id=post.author_id
+    ).values_list('user_id', flat=True)
+    TimelineEntry.objects.bulk_create(
+        [
+            TimelineEntry(
+                user_id=user_id,
+                post_id=post.pk,
+                author_id=post.author_id,
+                pub_date=post.pub_date,
+            )
+            for user_id in followers.iterator()
+        ],
+        batch_size=settings.TIMELINE_BATCH_SIZE,
+        ignore_conflicts=True,
+    )
+
+
+def follower_count(author_id):
+    return Profile.objects.filter(user_id=author_id).values_list(
+        'follower_count', flat=True
+    ).first() or 0
+
+
+def fill(author_id, user_id=None):
+    """Раскладывает посты автора в ленты его подписчиков (или одного).
+
+    Один INSERT ... SELECT, так что строки не проходят через Python;
+    уже разложенные посты пропускаются. Берутся все посты из горячей
+    таблицы: архивные лента подписок читает из архива сама.
+    """
+    sql = (
+        f'INSERT OR IGNORE INTO {TimelineEntry._meta.db_table} '
+        f'(user_id, post_id, author_id, pub_date) '
+        f'SELECT follow.user_id, post.id, post.author_id, post.pub_date '
+        f'FROM {Follow._meta.db_table} AS follow '
+        f'JOIN {Post._meta.db_table} AS post '
+        f'ON post.author_id = follow.author_id '
+        f'WHERE follow.author_id = %s'
+    )
+    params = [author_id]
+    if user_id is not None:
+        sql += ' AND follow.user_id = %s'
+        params.append(user_id)
+    with connection.cursor() as cursor:
+        cursor.execute(sql, params)
+        return cursor.rowcount
+
+
+def backfill(follow):
+    """Добавляет в ленту подписчика посты нового автора.
+
+    Если этой подпиской автор перешёл порог знаменитости, его посты
+    дальше подмешиваются при чтении, а разложенные удаляются.
+    """
+    count = follower_count(follow.author_id)
+    if count <= settings.TIMELINE_FANOUT_LIMIT:
+        fill(follow.author_id, follow.user_id)
+    elif count == settings.TIMELINE_FANOUT_LIMIT + 1:
+        TimelineEntry.objects.filter(
+            user_id__in=Follow.objects.filter(
+                author_id=follow.author_id
+            ).values('user_id'),
+            author_id=follow.author_id,
+        ).delete()
+
+
+def rebuild():
+    """Заново раскладывает ленты всех подписчиков.
+
+    Нужен после массовой загрузки, которая обходит сигналы.
+    Профили со счётчиками подписчиков должны быть уже пересчитаны.
+    """
+    TimelineEntry.objects.all().delete()
+    authors = Profile.objects.filter(
+        follower_count__gt=0,
+        follower_count__lte=settings.TIMELINE_FANOUT_LIMIT,
+    ).values_list('user_id', flat=True)
+    return sum(fill(author_id) for author_id in authors.iterator())
+
+
+def prune(follow):
+    """Убирает автора из ленты отписавшегося.
+
+    Если автор при этом опустился до порога, его посты, которые до сих
+    пор подмешивались при чтении, раскладываются всем подписчикам.
+    """
+    TimelineEntry.objects.filter(
+        user_id=follow.user_id, author_id=follow.author_id
+    ).delete()
+    if follower_count(follow.author_id) == settings.TIMELINE_FANOUT_LIMIT:
+        fill(follow.author_id)
+
+
+def follow_feed(user):
+    """Посты авторов, на которых подписан user, новые первыми."""
+    posts = Post.objects.for_feed()
+    celebrities = celebrity_ids(user)
+    if not celebrities:
+        # Аннотации, а не timeline__..., чтобы фильтры курсора и
+        # сортировка шли по тому же JOIN и индексу (user, -pub_date, -post).
+        return posts.filter(timeline__user=user).annotate(
+            timeline_date=F('timeline__pub_date'),
+            timeline_post=F('timeline__post'),
+        ).order_by('-timeline_date', '-timeline_post')
+    entries = TimelineEntry.objects.filter(user=user).values('post_id')
+    return posts.filter(Q(id__in=entries) | Q(author_id__in=celebrities))
+
+
+def archived_follow_feed(user):
+    """Продолжение follow_feed() в архиве, с теми же полями курсора."""
+    return ArchivedPost.objects.for_feed().filter(
+        author__following__user=user
+    ).annotate(timeline_date=F('pub_date'), timeline_post=F('id'))
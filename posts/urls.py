@@ -1,6 +1,6 @@
 from django.urls import path
 
-from . import views
+from . import api, views
 
 app_name = 'posts'
 
@@ -8,6 +8,16 @@ urlpatterns = [
     path('', views.index, name='index'),
     path('follow/', views.follow_index, name='follow_index'),
     path('new/', views.new_post, name='new_post'),
+    path('search/', views.search, name='search'),
+    path('api/search/', views.search_api, name='search_api'),
+    path('api/posts/', api.index, name='api_index'),
+    path('api/posts/<int:post_id>/', api.post, name='api_post'),
+    path('api/posts/<int:post_id>/comments/', api.comments,
+         name='api_comments'),
+    path('api/follow/', api.follow_index, name='api_follow_index'),
+    path('api/group/<slug:slug>/', api.group, name='api_group'),
+    path('api/users/<str:username>/posts/', api.profile, name='api_profile'),
+    path('api/users/<str:username>/follow/', api.follow, name='api_follow'),
     path(
         '<str:username>/<int:post_id>/comment',
         views.add_comment,
@@ -19,6 +29,8 @@ urlpatterns = [
          name='profile_follow'),
     path('<str:username>/', views.profile, name='profile'),
     path('<str:username>/<int:post_id>/', views.post_view, name='post'),
+    path('<str:username>/<int:post_id>/comments/', views.post_comments,
+         name='post_comments'),
     path(
         '<str:username>/<int:post_id>/edit/',
         views.post_edit,
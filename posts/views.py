@@ -1,30 +1,43 @@
-from django.shortcuts import render, get_object_or_404, redirect
+from urllib.parse import urlencode
+
+from django.conf import settings
 from django.core.paginator import Paginator
+from django.http import Http404, JsonResponse
+from django.shortcuts import render, get_object_or_404, redirect
 from django.contrib.auth import get_user_model
 from django.contrib.auth.decorators import login_required
+from django.urls import reverse
 
-from .models import Post, Group, Follow
+from .models import ArchivedPost, Post, Group, Follow
 from .forms import PostForm, CommentForm
-from yatube.settings import PAGE_NUMBER
+from .cache import (INDEX, author_scope, conditional_page, feed_cache,
+                    follow_scope, group_scope)
+from .pagecache import page_cache
+from .paginator import Chain, CursorPaginator, feed_page, paginate
+from .search import SearchResults
+from .timeline import archived_follow_feed, follow_feed
+from . import comment_buffer, thumbnails
 
 user = get_user_model()
 
 
+@page_cache(lambda request: [INDEX])
 def index(request):
-    content = Post.objects.select_related('group')
-    paginator = Paginator(content, PAGE_NUMBER)
-    page_number = request.GET.get('page')
-    page = paginator.get_page(page_number)
-    context = {'page': page, 'paginator': paginator}
+    content = Chain(Post.objects.for_feed(), ArchivedPost.objects.for_feed())
+    page, paginator = paginate(request, content)
+    context = {
+        'page': page,
+        'paginator': paginator,
+    }
     return render(request, 'index.html', context)
 
 
+@page_cache(lambda request, slug: [group_scope(slug)])
 def group_post(request, slug):
     group = get_object_or_404(Group, slug=slug)
-    content = group.group_post.all()
-    paginator = Paginator(content, PAGE_NUMBER)
-    page_number = request.GET.get('page')
-    page = paginator.get_page(page_number)
+    content = Chain(group.group_post.for_feed(),
+                    group.archived_posts.for_feed())
+    page, paginator = paginate(request, content)
     context = {
         'page': page,
         'group': group,
@@ -42,54 +55,88 @@ def new_post(request):
             'posts/new_post.html',
             {'form': form}
         )
-    form = PostForm(request.POST)
+    form = PostForm(request.POST, files=request.FILES or None)
     if form.is_valid():
         post = form.save(commit=False)
         post.author = request.user
         post.save()
+        thumbnails.schedule(post)
         return redirect('posts:index')
     return render(request, 'posts/new_post.html', {'form': form})
 
 
+@page_cache(lambda request, username: [author_scope(username)])
 def profile(request, username):
-    author = get_object_or_404(user, username=username)
-    author_content = Post.objects.filter(author=author)
-    following = request.user.is_authenticated and Follow.objects.filter(
-        user=request.user, author=author).exists()
-    paginator = Paginator(author_content, PAGE_NUMBER)
-    page_number = request.GET.get('page')
-    page = paginator.get_page(page_number)
+    author = get_object_or_404(
+        user.objects.select_related('profile'),
+        username=username
+    )
+    author_content = Chain(author.posts.for_feed(),
+                           author.archived_posts.for_feed())
+    page, paginator = paginate(
+        request, author_content, count=author.profile.post_count
+    )
     context = {
         'author': author,
-        'count': paginator.count,
+        'count': author.profile.post_count,
         'page': page,
         'paginator': paginator,
-        'following': following,
     }
     return render(request, 'posts/profile.html', context)
 
 
+def find_post(username, post_id, *related):
+    """Пост автора из основной таблицы, а если его там нет, из архива."""
+    for model in (Post, ArchivedPost):
+        found = model.objects.for_feed().select_related(*related).filter(
+            id=post_id, author__username=username
+        ).first()
+        if found is not None:
+            return found
+    raise Http404
+
+
+@page_cache(lambda request, username, post_id: [author_scope(username)])
 def post_view(request, username, post_id):
-    current_post = get_object_or_404(
-        Post,
-        id=post_id,
-        author__username=username)
-    count = current_post.author.posts.count()
-    following = request.user.is_authenticated and Follow.objects.filter(
-        user=request.user, author__username=username).exists()
-    form = CommentForm(request.POST or None)
-    comments = current_post.comments.all()
+    current_post = find_post(username, post_id, 'author__profile')
+    count = current_post.author.profile.post_count
+    page = comment_page(request, current_post)
     context = {
         'author': current_post.author,
         'count': count,
         'post': current_post,
-        'comments': comments,
-        'form': form,
-        'following': following,
+        'comment_page': page,
+        # Шаблон их не читает: форму рисует дырка comment_form, список —
+        # comment_page. Пустая форма и ленивый QuerySet без запросов
+        # остаются в контексте ради совместимости с тестами в tests/.
+        'form': CommentForm(),
+        'comments': page.paginator.object_list,
     }
     return render(request, 'posts/post.html', context)
 
 
+def comment_page(request, post):
+    """Страница комментариев поста после курсора ?after=."""
+    comments = post.comments.select_related('author').order_by(
+        '-created', '-id'
+    )
+    paginator = CursorPaginator(comments, settings.COMMENTS_PAGE_SIZE)
+    return paginator.get_page(after=request.GET.get('after'))
+
+
+@conditional_page(
+    lambda request, username, post_id: [author_scope(username)]
+)
+def post_comments(request, username, post_id):
+    """Следующая страница комментариев фрагментом HTML."""
+    page = comment_page(request, find_post(username, post_id))
+    return render(request, 'includes/comment_list.html', {
+        'comments': page,
+        'username': username,
+        'post_id': post_id,
+    })
+
+
 def post_edit(request, username, post_id):
     current_user = request.user
     current_post = get_object_or_404(Post, id=post_id)
@@ -102,7 +149,11 @@ def post_edit(request, username, post_id):
     )
     if form.is_valid():
         current_post = form.save(commit=False)
+        if 'image' in form.changed_data:
+            current_post.thumbnail = ''
         current_post.save()
+        if 'image' in form.changed_data:
+            thumbnails.schedule(current_post)
         return redirect('posts:post', post_id=post_id, username=username)
     return render(
         request,
@@ -113,30 +164,33 @@ def post_edit(request, username, post_id):
 
 @login_required
 def add_comment(request, post_id, username):
-    current_post = get_object_or_404(
-        Post,
-        id=post_id,
-        author__username=username
-    )
+    if not comment_buffer.is_post_of(post_id, username):
+        raise Http404
     form = CommentForm(request.POST or None)
     if form.is_valid():
         new_comment = form.save(commit=False)
-        new_comment.post = current_post
+        new_comment.post_id = post_id
         new_comment.author = request.user
-        new_comment.save()
+        queued = comment_buffer.save(new_comment)
+        if request.is_ajax():
+            return JsonResponse({'queued': queued},
+                                status=202 if queued else 201)
     return redirect('posts:post', username=username, post_id=post_id)
 
 
 @login_required
+@conditional_page(
+    lambda request: [INDEX, follow_scope(request.user.username)]
+)
 def follow_index(request):
     current_user = request.user
-    content = Post.objects.filter(author__following__user=current_user)
-    paginator = Paginator(content, PAGE_NUMBER)
-    page_number = request.GET.get('page')
-    page = paginator.get_page(page_number)
+    content = Chain(follow_feed(current_user),
+                    archived_follow_feed(current_user))
+    page, paginator = paginate(request, content)
     context = {
         'page': page,
         'paginator': paginator,
+        **feed_cache(request, INDEX, follow_scope(current_user.username)),
     }
     return render(request, 'follow.html', context)
 
@@ -161,6 +215,46 @@ def profile_unfollow(request, username):
     return profile(request, username)
 
 
+def search_page(request):
+    query = request.GET.get('q', '').strip()
+    paginator = Paginator(SearchResults(query), settings.PAGE_NUMBER)
+    return query, feed_page(paginator, request.GET.get('page')), paginator
+
+
+def search(request):
+    query, page, paginator = search_page(request)
+    context = {
+        'query': query,
+        'page': page,
+        'paginator': paginator,
+        'page_query': urlencode({'q': query}),
+    }
+    return render(request, 'search.html', context)
+
+
+def search_api(request):
+    query, page, paginator = search_page(request)
+    return JsonResponse({
+        'query': query,
+        'count': paginator.count,
+        'page': page.number,
+        'has_next': page.has_next(),
+        'results': [
+            {
+                'id': post.id,
+                'text': post.text,
+                'author': post.author.username,
+                'group': post.group.slug if post.group else None,
+                'pub_date': post.pub_date,
+                'url': reverse('posts:post', kwargs={
+                    'username': post.author.username, 'post_id': post.id,
+                }),
+            }
+            for post in page
+        ],
+    }, json_dumps_params={'ensure_ascii': False})
+
+
 def page_not_found(request, exception):
     return render(
         request,
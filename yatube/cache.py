@@ -0,0 +1,263 @@
+"""Кэш, общий для всех воркеров gunicorn.
+
+TieredCache — бэкенд для CACHES['default']: все записи уходят в общий
+кэш (база данных, файлы или Redis), а самые горячие ключи дополнительно
+живут несколько секунд в маленьком кэше процесса (L1). Инвалидация из
+другого воркера доходит до процесса не позже, чем через L1_TIMEOUT.
+Ключи с префиксами из OPTIONS['SHARED_ONLY'] (счётчики поколений) в L1
+не попадают: их сдвиг в одном воркере сразу виден остальным.
+
+RedisCache — минимальный бэкенд поверх клиента redis-py (или любого
+совместимого по API клиента) для Django 2.2, где своего бэкенда нет.
+"""
+import pickle
+
+from django.core.cache import caches
+from django.core.cache.backends.base import DEFAULT_TIMEOUT, BaseCache
+from django.core.cache.backends.locmem import LocMemCache
+from django.core.exceptions import ImproperlyConfigured
+from django.utils.module_loading import import_string
+
+from . import perf
+
+_MISSING = object()
+
+
+class TieredCache(BaseCache):
+    def __init__(self, location, params):
+        super().__init__(params)
+        options = params.get('OPTIONS', {})
+        self.shared_alias = options.get('SHARED', 'shared')
+        self.l1_timeout = options.get('L1_TIMEOUT', 0)
+        self.shared_only = tuple(options.get('SHARED_ONLY', ()))
+        self.l1 = None
+        if self.l1_timeout:
+            self.l1 = LocMemCache(f'l1-{location}', {
+                'TIMEOUT': self.l1_timeout,
+                'OPTIONS': {
+                    'MAX_ENTRIES': options.get('L1_MAX_ENTRIES', 1000),
+                    'CULL_FREQUENCY': 3,
+                },
+            })
+
+    @property
+    def shared(self):
+        return caches[self.shared_alias]
+
+    def _l1_timeout(self, timeout):
+        timeout = self.shared.get_backend_timeout(timeout)
+        if timeout is None:
+            return self.l1_timeout
+        return min(timeout, self.l1_timeout)
+
+    def _cached(self, key):
+        """Может ли ключ жить в L1."""
+        return self.l1 is not None and not key.startswith(self.shared_only)
+
+    def _forget(self, key, version):
+        if self.l1 is not None:
+            self.l1.delete(key, version=version)
+
+    def record(self, hit):
+        perf.cache_event(hit)
+
+    def get(self, key, default=None, version=None):
+        if self._cached(key):
+            value = self.l1.get(key, _MISSING, version=version)
+            if value is not _MISSING:
+                self.record(True)
+                return value
+        value = self.shared.get(key, _MISSING, version=version)
+        self.record(value is not _MISSING)
+        if value is _MISSING:
+            return default
+        if self._cached(key):
+            self.l1.set(key, value, self.l1_timeout, version=version)
+        return value
+
+    def get_many(self, keys, version=None):
+        found = {}
+        local = [key for key in keys if self._cached(key)]
+        if local:
+            found = self.l1.get_many(local, version=version)
+        rest = [key for key in keys if key not in found]
+        for _ in found:
+            self.record(True)
+        if rest:
+            shared = self.shared.get_many(rest, version=version)
+            for key in rest:
+                self.record(key in shared)
+            local = {
+                key: value for key, value in shared.items()
+                if self._cached(key)
+            }
+            if local:
+                self.l1.set_many(local, self.l1_timeout, version=version)
+            found.update(shared)
+        return found
+
+    def set(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        self.shared.set(key, value, timeout, version=version)
+        if self._cached(key):
+            self.l1.set(key, value, self._l1_timeout(timeout),
+                        version=version)
+
+    def set_many(self, data, timeout=DEFAULT_TIMEOUT, version=None):
+        failed = self.shared.set_many(data, timeout, version=version)
+        local = {
+            key: value for key, value in data.items() if self._cached(key)
+        }
+        if local:
+            self.l1.set_many(local, self._l1_timeout(timeout),
+                             version=version)
+        return failed
+
+    def add(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        self._forget(key, version)
+        return self.shared.add(key, value, timeout, version=version)
+
+    def touch(self, key, timeout=DEFAULT_TIMEOUT, version=None):
+        return self.shared.touch(key, timeout, version=version)
+
+    def delete(self, key, version=None):
+        self._forget(key, version)
+        self.shared.delete(key, version=version)
+
+    def delete_many(self, keys, version=None):
+        for key in keys:
+            self._forget(key, version)
+        self.shared.delete_many(keys, version=version)
+
+    def has_key(self, key, version=None):
+        return self.get(key, _MISSING, version=version) is not _MISSING
+
+    def incr(self, key, delta=1, version=None):
+        self._forget(key, version)
+        return self.shared.incr(key, delta, version=version)
+
+    def decr(self, key, delta=1, version=None):
+        self._forget(key, version)
+        return self.shared.decr(key, delta, version=version)
+
+    def clear(self):
+        if self.l1 is not None:
+            self.l1.clear()
+        self.shared.clear()
+
+    def close(self, **kwargs):
+        self.shared.close(**kwargs)
+
+
+class RedisCache(BaseCache):
+    """Бэкенд Redis. Клиент создаётся OPTIONS['CLIENT_FACTORY'](LOCATION).
+
+    По умолчанию это redis.Redis.from_url: пакет redis — необязательная
+    зависимость, нужная только при YATUBE_CACHE=redis. Целые числа
+    хранятся как есть, чтобы incr() выполнялся атомарным INCRBY.
+    """
+
+    # Проверка ключа и INCRBY одной командой: между ними ключ не
+    # истечёт и не будет создан заново другим воркером.
+    INCR_SCRIPT = (
+        "if redis.call('exists', KEYS[1]) == 0 then return nil end "
+        "return redis.call('incrby', KEYS[1], ARGV[1])"
+    )
+
+    def __init__(self, location, params):
+        super().__init__(params)
+        options = params.get('OPTIONS', {})
+        self.location = location
+        self.client_factory = options.get(
+            'CLIENT_FACTORY', 'redis.Redis.from_url'
+        )
+        self._client = None
+
+    @property
+    def client(self):
+        if self._client is None:
+            try:
+                factory = import_string(self.client_factory)
+            except ImportError as error:
+                raise ImproperlyConfigured(
+                    f'Для RedisCache нужен {self.client_factory}: {error}'
+                )
+            self._client = factory(self.location)
+        return self._client
+
+    @staticmethod
+    def dumps(value):
+        if isinstance(value, int) and not isinstance(value, bool):
+            return str(value).encode()
+        return pickle.dumps(value, pickle.HIGHEST_PROTOCOL)
+
+    @staticmethod
+    def loads(raw):
+        try:
+            return int(raw)
+        except ValueError:
+            return pickle.loads(raw)
+
+    def _px(self, timeout):
+        timeout = self.get_backend_timeout(timeout)
+        if timeout is None:
+            return None
+        return max(int(timeout * 1000), 1)
+
+    def _key(self, key, version):
+        key = self.make_key(key, version=version)
+        self.validate_key(key)
+        return key
+
+    def get(self, key, default=None, version=None):
+        raw = self.client.get(self._key(key, version))
+        return default if raw is None else self.loads(raw)
+
+    def get_many(self, keys, version=None):
+        keys = list(keys)
+        made = [self._key(key, version) for key in keys]
+        return {
+            key: self.loads(raw)
+            for key, raw in zip(keys, self.client.mget(made))
+            if raw is not None
+        }
+
+    def set(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        key = self._key(key, version)
+        if self.get_backend_timeout(timeout) == 0:
+            self.client.delete(key)
+            return
+        self.client.set(key, self.dumps(value), px=self._px(timeout))
+
+    def add(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        key = self._key(key, version)
+        return bool(self.client.set(
+            key, self.dumps(value), px=self._px(timeout), nx=True
+        ))
+
+    def touch(self, key, timeout=DEFAULT_TIMEOUT, version=None):
+        key = self._key(key, version)
+        px = self._px(timeout)
+        if px is None:
+            return bool(self.client.persist(key))
+        return bool(self.client.pexpire(key, px))
+
+    def delete(self, key, version=None):
+        self.client.delete(self._key(key, version))
+
+    def delete_many(self, keys, version=None):
+        keys = [self._key(key, version) for key in keys]
+        if keys:
+            self.client.delete(*keys)
+
+    def has_key(self, key, version=None):
+        return bool(self.client.exists(self._key(key, version)))
+
+    def incr(self, key, delta=1, version=None):
+        key = self._key(key, version)
+        value = self.client.eval(self.INCR_SCRIPT, 1, key, delta)
+        if value is None:
+            raise ValueError(f"Key '{key}' not found")
+        return value
+
+    def clear(self):
+        self.client.flushdb()
@@ -0,0 +1,242 @@
+"""Замеры производительности запросов.
+
+PerfMiddleware считает для каждого запроса общее время, число и время
+SQL-запросов, повторы одинаковых запросов, время рендера шаблонов и
+попадания в кэш. Результат уходит в лог yatube.perf, в скользящую
+статистику по имени маршрута и, если PERF_SERVER_TIMING включён, в
+заголовок Server-Timing.
+
+Статистика живёт в процессе, но раз в PERF_PUBLISH_INTERVAL секунд
+воркер публикует свои последние замеры в общий кэш. Команда perf_stats
+и страница /dashboard/perf/ собирают их со всех воркеров.
+"""
+import json
+import logging
+import os
+import statistics
+import time
+from collections import Counter, defaultdict, deque
+from contextlib import ExitStack
+from threading import Lock, local
+
+from django.conf import settings
+from django.contrib.admin.views.decorators import staff_member_required
+from django.core.cache import cache
+from django.db import connections
+from django.shortcuts import render
+from django.template.backends.django import DjangoTemplates, Template
+
+logger = logging.getLogger('yatube.perf')
+
+# Поля одного замера в скользящем окне.
+FIELDS = ('total_ms', 'sql_count', 'sql_ms', 'sql_duplicates',
+          'template_ms', 'cache_hits', 'cache_misses')
+
+WORKERS_KEY = 'perf:workers'
+
+_state = local()
+
+
+class RequestStats:
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.sql_ms = 0.0
+        self.queries = Counter()
+        self.template_ms = 0.0
+        self.template_depth = 0
+        self.cache_hits = 0
+        self.cache_misses = 0
+
+    @property
+    def sql_count(self):
+        return sum(self.queries.values())
+
+    @property
+    def sql_duplicates(self):
+        return self.sql_count - len(self.queries)
+
+    def sample(self, total_ms):
+        return (round(total_ms, 2), self.sql_count, round(self.sql_ms, 2),
+                self.sql_duplicates, round(self.template_ms, 2),
+                self.cache_hits, self.cache_misses)
+
+
+def current():
+    """Статистика запроса, который обрабатывает этот поток, или None."""
+    return getattr(_state, 'stats', None)
+
+
+def cache_event(hit):
+    stats = current()
+    if stats is not None:
+        if hit:
+            stats.cache_hits += 1
+        else:
+            stats.cache_misses += 1
+
+
+def sql_wrapper(execute, sql, params, many, context):
+    stats = current()
+    started = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        if stats is not None:
+            stats.sql_ms += (time.perf_counter() - started) * 1000
+            stats.queries[sql, repr(params)] += 1
+
+
+class TimedTemplate(Template):
+    def render(self, context=None, request=None):
+        stats = current()
+        if stats is None:
+            return super().render(context, request)
+        # Вложенные шаблоны уже входят во время внешнего.
+        stats.template_depth += 1
+        started = time.perf_counter()
+        try:
+            return super().render(context, request)
+        finally:
+            stats.template_depth -= 1
+            if not stats.template_depth:
+                stats.template_ms += (time.perf_counter() - started) * 1000
+
+
+class TimedTemplates(DjangoTemplates):
+    """Бэкенд шаблонов Django, который отдаёт время рендера PerfMiddleware."""
+
+    def from_string(self, template_code):
+        return TimedTemplate(self.engine.from_string(template_code), self)
+
+    def get_template(self, template_name):
+        template = super().get_template(template_name)
+        return TimedTemplate(template.template, self)
+
+
+class Aggregate:
+    """Последние PERF_WINDOW замеров каждого маршрута в этом процессе."""
+
+    def __init__(self):
+        self.lock = Lock()
+        self.samples = defaultdict(
+            lambda: deque(maxlen=settings.PERF_WINDOW)
+        )
+        self.published = 0.0
+
+    def add(self, name, sample):
+        with self.lock:
+            self.samples[name].append(sample)
+        if time.monotonic() - self.published > settings.PERF_PUBLISH_INTERVAL:
+            self.publish()
+
+    def snapshot(self):
+        with self.lock:
+            return {name: list(rows) for name, rows in self.samples.items()}
+
+    def publish(self):
+        self.published = time.monotonic()
+        key = f'perf:worker:{os.getpid()}'
+        timeout = settings.PERF_PUBLISH_INTERVAL * 6
+        cache.set(key, self.snapshot(), timeout)
+        workers = cache.get(WORKERS_KEY) or []
+        if key not in workers:
+            cache.set(WORKERS_KEY, (workers + [key])[-64:], None)
+
+    def clear(self):
+        with self.lock:
+            self.samples.clear()
+
+
+aggregate = Aggregate()
+
+
+def collected():
+    """Замеры всех воркеров, опубликованные в кэш, по маршрутам."""
+    aggregate.publish()
+    merged = defaultdict(list)
+    workers = cache.get(WORKERS_KEY) or []
+    for snapshot in cache.get_many(workers).values():
+        for name, rows in snapshot.items():
+            merged[name].extend(rows)
+    return merged
+
+
+def percentile(values, q):
+    if len(values) == 1:
+        return values[0]
+    return statistics.quantiles(values, n=100, method='inclusive')[q - 1]
+
+
+def summarize(rows):
+    columns = dict(zip(FIELDS, zip(*rows)))
+    totals = columns['total_ms']
+    hits = sum(columns['cache_hits'])
+    lookups = hits + sum(columns['cache_misses'])
+    return {
+        'requests': len(rows),
+        'p50_ms': round(percentile(totals, 50), 2),
+        'p95_ms': round(percentile(totals, 95), 2),
+        'p99_ms': round(percentile(totals, 99), 2),
+        'sql_count': round(statistics.mean(columns['sql_count']), 1),
+        'sql_ms': round(statistics.mean(columns['sql_ms']), 2),
+        'sql_duplicates': round(
+            statistics.mean(columns['sql_duplicates']), 1
+        ),
+        'template_ms': round(statistics.mean(columns['template_ms']), 2),
+        'cache_hit_ratio': round(hits / lookups, 3) if lookups else None,
+    }
+
+
+def report():
+    return {
+        name: summarize(rows)
+        for name, rows in sorted(collected().items()) if rows
+    }
+
+
+def server_timing(stats, total_ms):
+    return ', '.join((
+        f'total;dur={total_ms:.1f}',
+        f'sql;dur={stats.sql_ms:.1f};desc="{stats.sql_count} queries, '
+        f'{stats.sql_duplicates} duplicates"',
+        f'tpl;dur={stats.template_ms:.1f}',
+        f'cache;desc="{stats.cache_hits} hits, '
+        f'{stats.cache_misses} misses"',
+    ))
+
+
+class PerfMiddleware:
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        _state.stats = stats = RequestStats()
+        try:
+            with ExitStack() as stack:
+                for connection in connections.all():
+                    stack.enter_context(
+                        connection.execute_wrapper(sql_wrapper)
+                    )
+                response = self.get_response(request)
+        finally:
+            _state.stats = None
+        total_ms = (time.perf_counter() - stats.started) * 1000
+        match = request.resolver_match
+        name = match.view_name if match else 'unresolved'
+        sample = stats.sample(total_ms)
+        aggregate.add(name, sample)
+        if settings.PERF_SERVER_TIMING:
+            response['Server-Timing'] = server_timing(stats, total_ms)
+        level = (logging.WARNING if total_ms > settings.PERF_SLOW_REQUEST_MS
+                 else logging.INFO)
+        if logger.isEnabledFor(level):
+            record = dict(zip(FIELDS, sample))
+            record.update(view=name, method=request.method,
+                          path=request.path, status=response.status_code)
+            logger.log(level, json.dumps(record, ensure_ascii=False))
+        return response
+
+
+@staff_member_required
+def perf_view(request):
+    return render(request, 'misc/perf.html', {'report': report()})
@@ -0,0 +1,143 @@
+"""Профилирование медленных запросов.
+
+Включается переменной YATUBE_PROFILE:
+
+* sampler — фоновый поток раз в PROFILE_INTERVAL секунд снимает стеки
+  потоков, занятых запросами. Накладные расходы малы, поэтому режим
+  можно держать включённым на всех запросах;
+* cprofile — запрос выполняется под cProfile: точнее, но заметно
+  медленнее, поэтому стоит понизить PROFILE_SAMPLE_RATE.
+
+Профилируется доля PROFILE_SAMPLE_RATE запросов, а на диск попадают те,
+что шли дольше PROFILE_SLOW_MS (0 — все). Файлы .collapsed (строки
+«кадр;кадр;кадр число», формат flamegraph.pl и speedscope) и .pstats
+лежат в PROFILE_DIR; старые удаляются, когда файлов больше
+PROFILE_KEEP. Команда profile_report сводит их по представлениям.
+"""
+import cProfile
+import os
+import random
+import re
+import sys
+import time
+from collections import Counter
+from threading import Lock, Thread, get_ident
+
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+
+EXTENSIONS = {'sampler': 'collapsed', 'cprofile': 'pstats'}
+
+
+def frame_name(frame):
+    module = frame.f_globals.get('__name__', '?')
+    return f'{module}.{frame.f_code.co_name}'
+
+
+def collapse(frame):
+    """Стек кадра в виде «корень;...;лист»."""
+    names = []
+    while frame is not None:
+        names.append(frame_name(frame))
+        frame = frame.f_back
+    return ';'.join(reversed(names))
+
+
+class StackSampler(Thread):
+    def __init__(self, interval):
+        super().__init__(name='stack-sampler', daemon=True)
+        self.interval = interval
+        self.lock = Lock()
+        self.active = {}
+
+    def start_thread(self, thread_id):
+        with self.lock:
+            self.active[thread_id] = Counter()
+
+    def stop_thread(self, thread_id):
+        with self.lock:
+            return self.active.pop(thread_id, Counter())
+
+    def run(self):
+        while True:
+            time.sleep(self.interval)
+            frames = sys._current_frames()
+            with self.lock:
+                for thread_id, stacks in self.active.items():
+                    frame = frames.get(thread_id)
+                    if frame is not None:
+                        stacks[collapse(frame)] += 1
+
+
+def profile_path(view_name, total_ms, extension):
+    safe_name = re.sub(r'[^\w.]', '.', view_name)
+    return os.path.join(settings.PROFILE_DIR, (
+        f'{time.time() * 1000:.0f}-{os.getpid()}-'
+        f'{safe_name}-{total_ms:.0f}ms.{extension}'
+    ))
+
+
+def view_of(filename):
+    """Имя представления из имени файла профиля."""
+    return filename.split('-', 2)[2].rsplit('-', 1)[0]
+
+
+def trim_ring():
+    names = sorted(
+        name for name in os.listdir(settings.PROFILE_DIR)
+        if name.rsplit('.', 1)[-1] in EXTENSIONS.values()
+    )
+    for name in names[:-settings.PROFILE_KEEP or None]:
+        try:
+            os.remove(os.path.join(settings.PROFILE_DIR, name))
+        except FileNotFoundError:
+            pass
+
+
+class ProfilingMiddleware:
+    def __init__(self, get_response):
+        if settings.PROFILE_MODE not in EXTENSIONS:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        self.mode = settings.PROFILE_MODE
+        self.sampler = None
+        self.sampler_pid = None
+
+    def get_sampler(self):
+        # После fork потоки не наследуются: в каждом воркере свой сэмплер.
+        if self.sampler_pid != os.getpid():
+            self.sampler = StackSampler(settings.PROFILE_INTERVAL)
+            self.sampler.start()
+            self.sampler_pid = os.getpid()
+        return self.sampler
+
+    def __call__(self, request):
+        if random.random() >= settings.PROFILE_SAMPLE_RATE:
+            return self.get_response(request)
+        started = time.perf_counter()
+        if self.mode == 'cprofile':
+            profiler = cProfile.Profile()
+            response = profiler.runcall(self.get_response, request)
+        else:
+            sampler = self.get_sampler()
+            sampler.start_thread(get_ident())
+            try:
+                response = self.get_response(request)
+            finally:
+                stacks = sampler.stop_thread(get_ident())
+        total_ms = (time.perf_counter() - started) * 1000
+        if total_ms < settings.PROFILE_SLOW_MS:
+            return response
+        match = request.resolver_match
+        path = profile_path(match.view_name if match else 'unresolved',
+                            total_ms, EXTENSIONS[self.mode])
+        os.makedirs(settings.PROFILE_DIR, exist_ok=True)
+        if self.mode == 'cprofile':
+            profiler.dump_stats(path)
+        elif stacks:
+            with open(path, 'w') as profile_file:
+                profile_file.writelines(
+                    f'{stack} {count}\n' for stack, count in stacks.items()
+                )
+        trim_ring()
+        return response
@@ -0,0 +1,91 @@
+"""Чтение с реплик базы данных.
+
+ReplicaRouter отправляет все записи в default, а чтения — на одну из
+реплик DATABASE_REPLICAS, но только внутри GET- и HEAD-запросов, которые
+пропустила ReplicaMiddleware. Команды, фоновые потоки и запросы,
+меняющие данные, читают с основной базы.
+
+Реплика отстаёт не больше чем на REPLICA_MAX_LAG секунд. Пользователь,
+который только что что-то записал, получает cookie и всё это время
+читает с основной базы и мимо кэша страниц, так что свои изменения
+видит сразу. Запись внутри GET-запроса (подписка по ссылке) переводит
+на основную базу и остаток этого запроса. Остальные зрители могут
+видеть старые данные до REPLICA_MAX_LAG секунд: posts.cache.bump()
+назначает повторный сдвиг поколений через это время, первое чтение
+поколений после срока его выполняет, и страницы, собранные по
+отстающей реплике, перестают читаться.
+
+replicate() копирует основную базу в файл реплики через backup API
+SQLite. Это замена настоящей репликации для локального запуска, её
+выполняет команда sync_replicas.
+"""
+import random
+import sqlite3
+from contextlib import closing
+from threading import local
+
+from django.conf import settings
+
+PRIMARY = 'default'
+STICKY_COOKIE = 'read_primary'
+# Таблица DatabaseCache: поколения кэша с отстающей реплики читать нельзя,
+# а запись в кэш — не изменение данных пользователем.
+PRIMARY_ONLY_APPS = {'django_cache'}
+
+_state = local()
+
+
+def sticky(request):
+    """Читает ли пользователь запроса с основной базы после своей записи."""
+    return STICKY_COOKIE in request.COOKIES
+
+
+class ReplicaRouter:
+    def db_for_read(self, model, **hints):
+        if (not settings.DATABASE_REPLICAS
+                or model._meta.app_label in PRIMARY_ONLY_APPS
+                or not getattr(_state, 'replica_allowed', False)):
+            return PRIMARY
+        return random.choice(settings.DATABASE_REPLICAS)
+
+    def db_for_write(self, model, **hints):
+        if model._meta.app_label not in PRIMARY_ONLY_APPS:
+            _state.replica_allowed = False
+            _state.wrote = True
+        return PRIMARY
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Реплики — копии основной базы.
+        return True
+
+    def allow_migrate(self, db, app_label, **hints):
+        return db == PRIMARY
+
+
+class ReplicaMiddleware:
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        _state.replica_allowed = (
+            request.method in ('GET', 'HEAD')
+            and not sticky(request)
+        )
+        _state.wrote = False
+        try:
+            response = self.get_response(request)
+        finally:
+            wrote = _state.wrote
+            _state.replica_allowed = _state.wrote = False
+        if wrote and settings.DATABASE_REPLICAS:
+            response.set_cookie(STICKY_COOKIE, '1',
+                                max_age=settings.REPLICA_MAX_LAG,
+                                httponly=True)
+        return response
+
+
+def replicate(source, target):
+    """Согласованная копия файла SQLite source в target."""
+    with closing(sqlite3.connect(source)) as src, \
+            closing(sqlite3.connect(target)) as dst:
+        src.backup(dst)
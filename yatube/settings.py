@@ -22,7 +22,7 @@ BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
 SECRET_KEY = '+_7lyn$sypvqtj=y+8g6rt(m)xh0_!=6vivdf34b6mxkp#&$4-'
 
 # SECURITY WARNING: don't run with debug turned on in production!
-DEBUG = True
+DEBUG = os.environ.get('YATUBE_DEBUG', '1') == '1'
 
 ALLOWED_HOSTS = [
     "localhost",
@@ -51,6 +51,9 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'yatube.perf.PerfMiddleware',
+    'yatube.profiling.ProfilingMiddleware',
+    'yatube.replicas.ReplicaMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -63,11 +66,15 @@ MIDDLEWARE = [
 ROOT_URLCONF = 'yatube.urls'
 
 TEMPLATES_DIR = os.path.join(BASE_DIR, 'templates')
+TEMPLATE_LOADERS = [
+    'django.template.loaders.filesystem.Loader',
+    'django.template.loaders.app_directories.Loader',
+]
 TEMPLATES = [
     {
-        'BACKEND': 'django.template.backends.django.DjangoTemplates',
+        # Тот же DjangoTemplates, но с замером времени рендера для perf.
+        'BACKEND': 'yatube.perf.TimedTemplates',
         'DIRS': [TEMPLATES_DIR],
-        'APP_DIRS': True,
         'OPTIONS': {
             'context_processors': [
                 'yatube.context.year',
@@ -76,6 +83,11 @@ TEMPLATES = [
                 'django.contrib.auth.context_processors.auth',
                 'django.contrib.messages.context_processors.messages',
             ],
+            # Без DEBUG шаблоны компилируются один раз на процесс, а
+            # wsgi.py компилирует их все при старте воркера.
+            'loaders': TEMPLATE_LOADERS if DEBUG else [
+                ('django.template.loaders.cached.Loader', TEMPLATE_LOADERS),
+            ],
         },
     },
 ]
@@ -85,13 +97,53 @@ WSGI_APPLICATION = 'yatube.wsgi.application'
 # Database
 # https://docs.djangoproject.com/en/2.2/ref/settings/#databases
 
+# Соединение живёт YATUBE_DB_CONN_MAX_AGE секунд и переиспользуется
+# запросами воркера; PRAGMA выполняются при каждом новом соединении
+# (yatube/sqlite/base.py). WAL позволяет читать во время записи,
+# а писатель ждёт блокировку до busy_timeout миллисекунд.
 DATABASES = {
     'default': {
-        'ENGINE': 'django.db.backends.sqlite3',
+        'ENGINE': 'yatube.sqlite',
         'NAME': os.path.join(BASE_DIR, 'db.sqlite3'),
+        'CONN_MAX_AGE': int(os.environ.get('YATUBE_DB_CONN_MAX_AGE', 600)),
+        'OPTIONS': {
+            'pragmas': {
+                'journal_mode': 'WAL',
+                'synchronous': 'NORMAL',
+                'busy_timeout': int(
+                    os.environ.get('YATUBE_DB_BUSY_TIMEOUT', 5000)
+                ),
+                'mmap_size': 256 * 1024 * 1024,
+                # Отрицательное значение — размер в килобайтах.
+                'cache_size': -20000,
+            },
+        },
     }
 }
 
+# Реплики для чтения (yatube/replicas.py): пути к файлам через запятую
+# в YATUBE_DB_REPLICAS. Локально их наполняет команда sync_replicas.
+# Тесты запускаются без реплик; MIRROR лишь не даёт создавать для них
+# тестовые базы.
+for number, path in enumerate(
+        filter(None, os.environ.get('YATUBE_DB_REPLICAS', '').split(',')),
+        start=1):
+    DATABASES[f'replica{number}'] = {
+        **DATABASES['default'],
+        'NAME': path,
+        'OPTIONS': {'pragmas': {
+            **DATABASES['default']['OPTIONS']['pragmas'],
+            'query_only': 'ON',
+        }},
+        'TEST': {'MIRROR': 'default'},
+    }
+DATABASE_REPLICAS = [alias for alias in DATABASES if alias != 'default']
+DATABASE_ROUTERS = ['yatube.replicas.ReplicaRouter']
+# На сколько секунд реплика может отставать (sync_replicas --interval
+# должен быть меньше): столько после записи пользователь читает
+# с основной базы, а через столько поколения кэша сдвигаются повторно.
+REPLICA_MAX_LAG = int(os.environ.get('YATUBE_DB_REPLICA_MAX_LAG', 5))
+
 # Password validation
 # https://docs.djangoproject.com/en/2.2/ref/settings/#auth-password-validators
 
@@ -131,15 +183,135 @@ STATIC_ROOT = os.path.join(BASE_DIR, 'static')
 MEDIA_URL = '/media/'
 MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
 
+# Загрузки пишутся во временный файл, а не держатся в памяти.
+FILE_UPLOAD_HANDLERS = [
+    'django.core.files.uploadhandler.TemporaryFileUploadHandler',
+]
+# Картинки постов уменьшаются до этого размера по длинной стороне.
+POST_IMAGE_MAX_SIDE = 2048
+POST_IMAGE_QUALITY = 85
+
 # Login
 LOGIN_URL = "/auth/login/"
 LOGIN_REDIRECT_URL = "index"
 # LOGOUT_REDIRECT_URL = "index"
 
 PAGE_NUMBER = 10
+# 'page' — ?page=N с COUNT(*), 'cursor' — keyset-пагинация ?after=/?before=
+FEED_PAGINATION = 'page'
+# Сколько секунд кэшируется число записей ленты для окна номеров страниц.
+FEED_COUNT_TIMEOUT = 60
+# Посты старше стольких дней команда archive_posts переносит в архив.
+ARCHIVE_AFTER_DAYS = int(os.environ.get('YATUBE_ARCHIVE_AFTER_DAYS', 365))
+# Сколько секунд живёт страница в кэше целых страниц; при изменениях
+# она устаревает сразу, через поколения областей.
+PAGE_CACHE_TIMEOUT = 60 * 15
+# Сколько секунд прокси и браузер могут отдавать страницу гостю без
+# перепроверки ETag.
+PAGE_CACHE_MAX_AGE = int(os.environ.get('YATUBE_PAGE_CACHE_MAX_AGE', 10))
+# Буфер записи комментариев (posts/comment_buffer.py): 0 — писать сразу,
+# иначе сбрасывать пачками такого размера или раз в интервал, секунд.
+COMMENT_BUFFER_SIZE = int(os.environ.get('YATUBE_COMMENT_BUFFER_SIZE', 0))
+COMMENT_FLUSH_INTERVAL = float(
+    os.environ.get('YATUBE_COMMENT_FLUSH_INTERVAL', 0.5)
+)
+# Сколько комментариев на странице поста и в каждой догрузке.
+COMMENTS_PAGE_SIZE = 20
+# Наибольшее значение ?limit= в JSON API.
+API_MAX_PAGE_SIZE = 100
+
+# Лента подписок: авторам с большим числом подписчиков посты
+# не раскладываются по лентам, а подмешиваются при чтении.
+TIMELINE_FANOUT_LIMIT = 1000
+TIMELINE_BATCH_SIZE = 500
+
+# Замеры запросов (yatube.perf): окно замеров на маршрут, как часто
+# воркер публикует их в общий кэш, порог медленного запроса.
+PERF_WINDOW = 500
+PERF_PUBLISH_INTERVAL = 10
+PERF_SLOW_REQUEST_MS = 500
+# Заголовок Server-Timing раскрывает любому зрителю число и время
+# SQL-запросов, поэтому он выключен; сводка /dashboard/perf/ — для staff.
+PERF_SERVER_TIMING = os.environ.get('YATUBE_PERF_SERVER_TIMING') == '1'
+
+# Профилирование запросов (yatube.profiling): YATUBE_PROFILE=sampler
+# или cprofile. Профилируется доля PROFILE_SAMPLE_RATE запросов,
+# сохраняются шедшие дольше PROFILE_SLOW_MS, не больше PROFILE_KEEP файлов.
+PROFILE_MODE = os.environ.get('YATUBE_PROFILE', '')
+PROFILE_SAMPLE_RATE = float(os.environ.get('YATUBE_PROFILE_RATE', 1.0))
+PROFILE_SLOW_MS = int(os.environ.get('YATUBE_PROFILE_SLOW_MS', 1000))
+PROFILE_INTERVAL = 0.005
+PROFILE_DIR = os.path.join(BASE_DIR, 'profiles')
+PROFILE_KEEP = 200
+
+# Каждый запрос пишется в лог yatube.perf на уровне INFO, медленные —
+# на WARNING. YATUBE_PERF_LOG_LEVEL=INFO включает вывод всех запросов.
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'handlers': {
+        'console': {'class': 'logging.StreamHandler'},
+    },
+    'loggers': {
+        'yatube.perf': {
+            'handlers': ['console'],
+            'level': os.environ.get('YATUBE_PERF_LOG_LEVEL', 'WARNING'),
+            'propagate': False,
+        },
+    },
+}
+
+# Бэкенды полнотекстового поиска по connection.vendor.
+SEARCH_BACKENDS = {
+    'sqlite': 'posts.search.SqliteSearch',
+    'postgresql': 'posts.search.PostgresSearch',
+}
+
+# Потоки для построения миниатюр; 0 — строить сразу после коммита.
+THUMBNAIL_WORKERS = int(os.environ.get('YATUBE_THUMBNAIL_WORKERS', 2))
+
+# Фрагменты лент инвалидируются сигналами, срок — лишь страховка.
+FEED_CACHE_TIMEOUT = 60 * 15
+# Ключ карточки поста меняется вместе с её содержимым, так что срок
+# только освобождает место от старых версий.
+CARD_CACHE_TIMEOUT = 60 * 60 * 24
+
+# Общий для всех воркеров кэш выбирается переменной YATUBE_CACHE:
+# locmem (только для разработки), db (нужен manage.py createcachetable),
+# file или redis. Перед ним может стоять кэш процесса (L1): ключи живут
+# в нём не дольше YATUBE_CACHE_L1_TIMEOUT секунд, 0 отключает L1.
+SHARED_CACHES = {
+    'locmem': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    },
+    'db': {
+        'BACKEND': 'django.core.cache.backends.db.DatabaseCache',
+        'LOCATION': 'yatube_cache',
+    },
+    'file': {
+        'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+        'LOCATION': os.path.join(BASE_DIR, 'cache'),
+    },
+    'redis': {
+        'BACKEND': 'yatube.cache.RedisCache',
+        'LOCATION': os.environ.get(
+            'YATUBE_REDIS_URL', 'redis://127.0.0.1:6379/0'
+        ),
+    },
+}
 
 CACHES = {
     'default': {
-        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
-    }
+        'BACKEND': 'yatube.cache.TieredCache',
+        'OPTIONS': {
+            'SHARED': 'shared',
+            'L1_TIMEOUT': int(os.environ.get('YATUBE_CACHE_L1_TIMEOUT', 0)),
+            'L1_MAX_ENTRIES': int(
+                os.environ.get('YATUBE_CACHE_L1_MAX_ENTRIES', 1000)
+            ),
+            # Поколения (posts/cache.py) читаются только из общего кэша.
+            'SHARED_ONLY': ['gen:', 'rebump:'],
+        },
+    },
+    'shared': SHARED_CACHES[os.environ.get('YATUBE_CACHE', 'locmem')],
 }
\ No newline at end of file
@@ -0,0 +1,42 @@
+"""Бэкенд SQLite для продакшена.
+
+Отличается от django.db.backends.sqlite3 двумя вещами:
+
+- каждое новое соединение выполняет PRAGMA из OPTIONS['pragmas']: WAL,
+  чтобы читатели не ждали писателя, synchronous, mmap_size, cache_size
+  и busy_timeout;
+- постоянное соединение (CONN_MAX_AGE) проверяется запросом SELECT 1
+  в начале и в конце каждого запроса и закрывается, если не отвечает.
+  В Django 2.2 своей проверки здоровья соединений нет, а у SQLite
+  is_usable() всегда возвращает True.
+"""
+from django.db.backends.sqlite3 import base
+
+Database = base.Database
+
+
+class DatabaseWrapper(base.DatabaseWrapper):
+    def get_connection_params(self):
+        params = super().get_connection_params()
+        params.pop('pragmas', None)
+        return params
+
+    def get_new_connection(self, conn_params):
+        conn = super().get_new_connection(conn_params)
+        pragmas = self.settings_dict['OPTIONS'].get('pragmas', {})
+        for name, value in pragmas.items():
+            conn.execute(f'PRAGMA {name} = {value}')
+        return conn
+
+    def is_usable(self):
+        try:
+            self.connection.execute('SELECT 1')
+        except Database.Error:
+            return False
+        return True
+
+    def close_if_unusable_or_obsolete(self):
+        super().close_if_unusable_or_obsolete()
+        if (self.connection is not None and not self.in_atomic_block
+                and not self.is_usable()):
+            self.close()
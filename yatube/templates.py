@@ -0,0 +1,44 @@
+"""Компиляция шаблонов проекта при старте воркера.
+
+С кэширующим загрузчиком шаблон разбирается при первом обращении, и
+первые запросы каждого воркера платят за это. precompile() заранее
+загружает все шаблоны из папок проекта: templates/ и templates/
+приложений. Шаблоны Django и сторонних пакетов остаются ленивыми.
+"""
+import os
+
+from django.conf import settings
+from django.template import engines
+from django.template.utils import get_app_template_dirs
+
+
+def project_dirs(engine):
+    dirs = list(engine.dirs) + list(get_app_template_dirs('templates'))
+    root = os.path.join(settings.BASE_DIR, '')
+    return [path for path in dirs if path.startswith(root)]
+
+
+def template_names(directory):
+    for root, _, files in os.walk(directory):
+        for name in sorted(files):
+            if name.endswith(('.html', '.txt')):
+                path = os.path.join(root, name)
+                yield os.path.relpath(path, directory).replace(os.sep, '/')
+
+
+def precompile():
+    """Загружает шаблоны проекта во все движки; возвращает их число.
+
+    Ошибка синтаксиса в шаблоне останавливает старт, а не всплывает
+    на первом запросе к странице.
+    """
+    compiled = 0
+    for backend in engines.all():
+        engine = getattr(backend, 'engine', None)
+        if engine is None:
+            continue
+        for directory in project_dirs(engine):
+            for name in template_names(directory):
+                engine.get_template(name)
+                compiled += 1
+    return compiled